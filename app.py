@@ -1,49 +1,59 @@
-import io
+import time
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import streamlit as st
-from src.data_loader import DataLoader
-from src.product_classifier import ProductClassifier
+from src.commission import CommissionCalculator
+from src.data_loader import DataLoader, OUTPUT_FORMATS, OUTPUT_MIME_TYPES, SETTLEMENT_PRODUCT_TYPES
+from src.product_classifier import PRODUCT_TYPE_DTYPE, ProductClassifier
+from src.llm_budget import LLMBudget
 from src.llm_client import LLMClient
-from src.config import INPUT_DIR, OUTPUT_DIR, DEFAULT_API_PROVIDER, DEFAULT_API_KEY
+from src.metrics import RunMetrics
+
+# 进度条最短刷新间隔（秒）
+PROGRESS_INTERVAL = 0.2
+# 分块分类的每块行数：每块完成后刷新部分结果
+PARTIAL_CHUNK_ROWS = 2000
 
 st.set_page_config(page_title="产品&价格类型自动分类系统", layout="wide")
 st.title("产品&价格类型自动分类系统")
 
-data_loader = DataLoader()
+
+@st.cache_resource
+def get_classifier(use_llm: bool) -> ProductClassifier:
+    """分类器（含 LLM 连接池和分类缓存）在页面重跑和会话之间复用；每次运行通过 for_run 使用独立的运行指标"""
+    llm_client = LLMClient() if use_llm else None
+    return ProductClassifier(llm_client)
+
+
+def throttled_progress(prog):
+    """进度回调：只在百分比变化且距上次刷新超过 PROGRESS_INTERVAL 时更新进度条"""
+    state = {"percent": -1, "time": 0.0}
+
+    def callback(done: int, total: int) -> None:
+        percent = int(done * 100 / total) if total else 100
+        now = time.monotonic()
+        if percent == state["percent"] or (percent < 100 and now - state["time"] < PROGRESS_INTERVAL):
+            return
+        state["percent"], state["time"] = percent, now
+        prog.progress(percent)
+
+    return callback
+
 
 uploaded = st.file_uploader("上传 Excel 文件", type=["xlsx"])
 use_llm = st.checkbox("启用 LLM 生鲜判断", value=True)
+compute_commission = st.checkbox("核算销售提成", value=False, help="费率见 config.COMMISSION_RATES")
+output_format = st.selectbox("结果文件格式", OUTPUT_FORMATS, help="csv / parquet 生成更快、文件更小，适合导入其他系统")
 run_btn = st.button("开始分类")
 
-def normalize_price_type(val):
-    if pd.isna(val):
-        return val
-    s = str(val)
-    lower = s.lower()
-    if "vp" in lower:
-        return "按vp价结算"
-    if "总监" in s:
-        return "按总监价结算"
-    if "核心" in s:
-        return "按核心价结算"
-    if "优惠" in s:
-        return "按优惠价结算"
-    if "常规" in s:
-        return "按常规价结算"
-    return s
-
-pass
-
 if run_btn:
     if uploaded is None:
         st.error("请先上传 Excel 文件")
         st.stop()
-    input_path = INPUT_DIR / uploaded.name
-    input_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(input_path, "wb") as f:
-        f.write(uploaded.getbuffer())
-    df = data_loader.load_sales_data(uploaded.name)
+    metrics = RunMetrics()
+    data_loader = DataLoader(metrics)
+    df = data_loader.load_sales_buffer(uploaded.getvalue())
     if "礼包名称" not in df.columns:
         st.error("缺少“礼包名称”列")
         st.stop()
@@ -51,26 +61,54 @@ if run_btn:
         st.error("缺少“销售单类型”列")
         st.stop()
     gift_col = "礼包名称"
-    sales_types = df["销售单类型"].astype(str).tolist()
-    llm_client = LLMClient() if use_llm else None
-    classifier = ProductClassifier(llm_client)
-    names = df[gift_col].tolist()
-    total = len(names)
-    product_types = []
-    import math
-    with st.spinner("执行中"):
+    # 缓存和连接池在会话之间共用，运行指标和 LLM 预算按本次运行计算（不修改共用的分类器）
+    classifier = get_classifier(use_llm).for_run(metrics)
+    llm_budget = LLMBudget.from_config()
+    with st.spinner("执行中"), metrics.stage("classify"):
         prog = st.progress(0)
-        for i, name in enumerate(names, 1):
-            s_type = sales_types[i-1] if sales_types else None
-            product_types.append(classifier.classify_product_type(name, s_type))
-            ratio = int(i * 100 / total)
-            prog.progress(min(100, max(0, ratio)))
+        progress = throttled_progress(prog)
+        partial = st.empty()
+        chunks = []
+        counts = pd.Series(0, index=PRODUCT_TYPE_DTYPE.categories)
+        # 每块分类完成后立即展示已完成部分的统计和最新一块的预览
+        for start, chunk_types in classifier.classify_iter(
+            df[gift_col],
+            sales_order_types=df["销售单类型"],
+            chunk_size=PARTIAL_CHUNK_ROWS,
+            llm_budget=llm_budget,
+        ):
+            chunks.append(chunk_types.codes)
+            done = start + len(chunk_types)
+            counts += pd.Series(chunk_types).value_counts(sort=False)
+            progress(done, len(df))
+            with partial.container():
+                st.caption(f"已分类 {done}/{len(df)} 行")
+                st.write({k: int(v) for k, v in counts[counts > 0].items()})
+                preview = df.iloc[start:done].head(10).copy()
+                preview["产品类型"] = chunk_types[:10]
+                st.dataframe(preview, use_container_width=True)
+        partial.empty()
+        codes = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int8)
+        product_types = pd.Categorical.from_codes(codes, dtype=PRODUCT_TYPE_DTYPE)
     df = data_loader.add_product_type_column(df, product_types)
+    uncovered_rows = metrics.counters.get("llm_budget_uncovered_rows", 0)
+    if uncovered_rows:
+        st.warning(f"LLM 预算用尽（{llm_budget.reason}）：{uncovered_rows} 行未判断，记为待确认")
     if "价格类型" not in df.columns:
         st.error("缺少“价格类型”列")
         st.stop()
-    mask = df["产品类型"].isin(["常规册", "生鲜专卡"])
-    df.loc[mask, "价格类型"] = df.loc[mask, "价格类型"].apply(normalize_price_type)
+    with metrics.stage("normalize"):
+        df = data_loader.normalize_price_type_column(df)
+    commission_summary = None
+    if compute_commission:
+        calculator = CommissionCalculator(metrics=metrics)
+        try:
+            df = calculator.compute(df, gift_col)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        commission_summary = calculator.summarize(df)
+    mask = df["产品类型"].isin(SETTLEMENT_PRODUCT_TYPES)
     from collections import Counter
     stats = Counter(df["产品类型"].tolist())
     st.subheader("分类统计")
@@ -79,18 +117,42 @@ if run_btn:
     st.dataframe(df.head(10), use_container_width=True)
     st.subheader("价格类型分布（仅常规册/生鲜专卡）")
     vc = df.loc[mask, "价格类型"].value_counts(dropna=False)
+    vc = vc[vc > 0]
     st.write(vc)
-    output_name = f"result_{Path(uploaded.name).stem}.xlsx"
-    output_path = OUTPUT_DIR / output_name
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    data_loader.save_results(df, output_name)
+    if commission_summary is not None:
+        st.subheader("提成汇总（按提成归属人）")
+        st.dataframe(commission_summary, use_container_width=True)
+    output_name = f"result_{Path(uploaded.name).stem}.{output_format}"
+    try:
+        output_path, output_data = data_loader.export_results(df, output_name, output_format)
+    except Exception as e:
+        st.error(f"保存结果失败: {e}")
+        st.stop()
+    metrics.write_json(RunMetrics.sidecar_path(output_path))
     st.success(f"已保存至: {output_path}")
-    bio = io.BytesIO()
-    with pd.ExcelWriter(bio, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False)
+    report = metrics.to_dict()
+    st.subheader("运行指标")
+    stage_cols = st.columns(len(report["stages"]) or 1)
+    for col, (name, stage) in zip(stage_cols, report["stages"].items()):
+        col.metric(name, f"{stage['wall_seconds']:.2f}s", f"CPU {stage['cpu_seconds']:.2f}s", delta_color="off")
+    ratio_cols = st.columns(3)
+    ratio_cols[0].metric("规则命中率", f"{report['ratios']['rule_hit_ratio']:.1%}")
+    ratio_cols[1].metric("持久化缓存命中率", f"{report['ratios']['persistent_cache_hit_ratio']:.1%}")
+    ratio_cols[2].metric("LLM 请求次数", int(report["counters"].get("llm_requests", 0)))
+    with st.expander("详细指标"):
+        st.json(report)
     st.download_button(
-        label="下载结果 Excel",
-        data=bio.getvalue(),
+        label=f"下载结果（{output_format}）",
+        data=output_data,
         file_name=output_name,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        mime=OUTPUT_MIME_TYPES[output_format],
     )
+    if commission_summary is not None:
+        commission_name = f"{Path(output_name).stem}_commission.{output_format}"
+        _, commission_data = data_loader.export_results(commission_summary.reset_index(), commission_name, output_format)
+        st.download_button(
+            label=f"下载提成汇总（{output_format}）",
+            data=commission_data,
+            file_name=commission_name,
+            mime=OUTPUT_MIME_TYPES[output_format],
+        )
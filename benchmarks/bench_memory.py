@@ -0,0 +1,89 @@
+"""
+结果列内存基准测试：object 字符串列 + 整表深拷贝 与 Categorical 列 + 浅拷贝 的对比
+
+旧实现：产品类型为逐行的 object 数组，add_product_type_column 先 df.copy() 复制整表再添加列，
+销售单类型 / 价格类型保持 object 列。新实现：产品类型为固定类别的 Categorical（int8 编码），
+浅拷贝添加列，销售单类型 / 价格类型加载后转换为 Categorical。
+
+分别统计添加产品类型列并规整价格类型期间的内存峰值（tracemalloc）和结果表各列的内存占用。
+
+用法:
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+import argparse
+import contextlib
+import io
+import tracemalloc
+from typing import Callable, Tuple
+import numpy as np
+import pandas as pd
+from src.data_loader import SETTLEMENT_PRODUCT_TYPES, DataLoader, compact_columns, normalize_price_types
+from src.product_classifier import ProductClassifier
+from .generate_workbook import generate_sales_frame
+
+RESULT_COLUMNS = ["销售单类型", "价格类型", "产品类型"]
+
+
+def legacy_attach(df: pd.DataFrame, product_types: np.ndarray) -> pd.DataFrame:
+    """旧实现：整表深拷贝后添加 object 产品类型列，原地规整价格类型"""
+    df = df.copy()
+    df["产品类型"] = product_types
+    mask = df["产品类型"].isin(SETTLEMENT_PRODUCT_TYPES)
+    df.loc[mask, "价格类型"] = normalize_price_types(df.loc[mask, "价格类型"])
+    return df
+
+
+def measure_peak(func: Callable, *args) -> Tuple[object, int]:
+    """运行 func 并返回 (结果, 运行期间新增内存的峰值字节数)"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = func(*args)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return result, peak
+
+
+def column_bytes(df: pd.DataFrame) -> int:
+    """结果相关列的内存占用（含字符串对象本身）"""
+    return int(df[RESULT_COLUMNS].memory_usage(deep=True, index=False).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="结果列内存基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="行数")
+    parser.add_argument("--distinct-names", type=int, default=3000, help="不同礼包名称数量")
+    args = parser.parse_args()
+
+    source = generate_sales_frame(args.rows, args.distinct_names, unknown_rate=0.0)
+    for column in ("礼包名称", "销售单类型", "价格类型"):
+        source[column] = source[column].astype(object)
+    compact_source = compact_columns(source.copy())
+
+    classifier = ProductClassifier()
+    with contextlib.redirect_stdout(io.StringIO()):
+        categorical = classifier.classify_batch(compact_source["礼包名称"], compact_source["销售单类型"])
+    legacy_types = np.asarray(categorical, dtype=object)
+
+    data_loader = DataLoader()
+    legacy, legacy_peak = measure_peak(legacy_attach, source, legacy_types)
+    compact, compact_peak = measure_peak(
+        lambda df, types: data_loader.normalize_price_type_column(data_loader.add_product_type_column(df, types)),
+        compact_source,
+        categorical,
+    )
+    # 两种实现的结果一致
+    pd.testing.assert_frame_equal(legacy[RESULT_COLUMNS].astype(object), compact[RESULT_COLUMNS].astype(object))
+
+    mib = 1024 * 1024
+    print(f"行数: {args.rows}")
+    print(f"  产品类型结果:        object 数组 {legacy_types.nbytes / mib:.1f} MiB -> "
+          f"Categorical 编码 {categorical.codes.nbytes / mib:.1f} MiB")
+    print(f"  添加列+规整内存峰值: {legacy_peak / mib:.1f} MiB -> {compact_peak / mib:.1f} MiB")
+    print(f"  结果列内存占用:      {column_bytes(legacy) / mib:.1f} MiB -> {column_bytes(compact) / mib:.1f} MiB")
+    print(f"  结果表总内存占用:    {legacy.memory_usage(deep=True).sum() / mib:.1f} MiB -> "
+          f"{compact.memory_usage(deep=True).sum() / mib:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+价格类型规整基准测试：逐行 Series.apply 与按不同取值批量规整的对比
+
+用法:
+    python -m benchmarks.bench_price_type --rows 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.data_loader import normalize_price_type, normalize_price_types
+
+# 实际导出文件中常见的价格类型写法（含缺失值）
+PRICE_TYPES = ["核心价格", "总监价格", "优惠价", "常规价格", "VP级", "vp价", "按核心价结算", "其他", np.nan]
+
+
+def make_column(rows: int, seed: int = 0) -> pd.Series:
+    """生成指定行数的价格类型列"""
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.choice(np.array(PRICE_TYPES, dtype=object), size=rows), name="价格类型")
+
+
+def best_of(func, repeat: int) -> float:
+    """多次运行取最短耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="价格类型规整基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="行数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最短耗时）")
+    args = parser.parse_args()
+    
+    column = make_column(args.rows)
+    expected = column.apply(normalize_price_type)
+    actual = normalize_price_types(column)
+    pd.testing.assert_series_equal(actual, expected, check_dtype=False)
+    
+    apply_time = best_of(lambda: column.apply(normalize_price_type), args.repeat)
+    vectorized_time = best_of(lambda: normalize_price_types(column), args.repeat)
+    print(f"行数: {args.rows}")
+    print(f"  Series.apply:          {apply_time:.3f}s")
+    print(f"  normalize_price_types: {vectorized_time:.3f}s")
+    print(f"  加速比: {apply_time / vectorized_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+合成销售数据生成器：按真实分布生成礼包名称，用于基准测试
+
+礼包名称由 CLASSIFICATION_KEYWORDS 和 SALESPERSON_NAMES 组合生成（常规册、生鲜专卡、不核算、定制册），
+另按 unknown_rate 混入规则无法识别、需要 LLM 判断的名称。各类别内名称出现频次服从 Zipf 分布，
+与实际导出文件中少数热门礼包占大多数行的情况一致。
+
+用法:
+    python -m benchmarks.generate_workbook --rows 100000 --unknown-rate 0.02 -o data/input/synthetic_100k.xlsx
+"""
+import argparse
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from src.config import CLASSIFICATION_KEYWORDS, SALESPERSON_NAMES
+
+PREFIXES = ["2025中秋", "2025春节", "2026端午", "2025国庆", "", "奥飞", "盐池"]
+SUFFIXES = ["", "礼盒", "889", "1299", "（新版）", "A款", "礼包"]
+# 规则无法识别的名称：一部分是生鲜（LLM 应判为生鲜专卡），一部分是具体商品（待确认）
+UNKNOWN_FRESH = ["和牛", "三文鱼", "波士顿龙虾", "车厘子", "黑猪肉", "鲍鱼", "阳澄湖蟹", "椰子鸡"]
+UNKNOWN_GOODS = ["空气炸锅", "玻璃餐具8件套", "保温杯", "电动牙刷", "蓝牙音箱", "床品四件套", "茶具", "雨伞"]
+SALES_ORDER_TYPES = ["实物礼包", "实物集采", "费用申请"]
+SALES_ORDER_TYPE_WEIGHTS = [0.85, 0.08, 0.07]
+PRICE_TYPES = ["核心价格", "总监价格", "优惠价", "常规价格", "VP级"]
+PRICE_TYPE_WEIGHTS = [0.5, 0.28, 0.13, 0.05, 0.04]
+# 各类别的行占比（未知名称的占比由 unknown_rate 单独控制）与不同名称数占比
+CATEGORY_ROW_SHARES = {"常规册": 0.75, "生鲜专卡": 0.12, "定制册": 0.08, "不核算": 0.05}
+CATEGORY_NAME_SHARES = {"常规册": 0.35, "生鲜专卡": 0.15, "定制册": 0.3, "不核算": 0.05, "未知": 0.15}
+
+
+def _decorate(rng: np.random.Generator, core: str) -> str:
+    return f"{rng.choice(PREFIXES)}{core}{rng.choice(SUFFIXES)}"
+
+
+def make_distinct_names(distinct_names: int, seed: int = 0) -> Dict[str, List[str]]:
+    """
+    按类别生成不重复的礼包名称表
+
+    Args:
+        distinct_names: 名称总数（按 CATEGORY_NAME_SHARES 分配到各类别）
+        seed: 随机种子
+
+    Returns:
+        {类别: 礼包名称列表}，类别"未知"为规则无法识别的名称
+    """
+    rng = np.random.default_rng(seed)
+    regular = CLASSIFICATION_KEYWORDS["常规册"]
+    fresh = CLASSIFICATION_KEYWORDS["生鲜专卡"]
+    excluded = CLASSIFICATION_KEYWORDS["不核算"]
+    makers = {
+        "常规册": lambda: _decorate(rng, rng.choice(regular)),
+        "生鲜专卡": lambda: _decorate(rng, rng.choice(fresh)),
+        "不核算": lambda: f"{rng.choice(excluded)}{rng.integers(1, 99)}",
+        "定制册": lambda: f"{rng.choice(SALESPERSON_NAMES)}+{_decorate(rng, rng.choice(regular))}",
+        "未知": lambda: f"{rng.choice(['', '进口', '精选', '臻品'])}"
+                        f"{rng.choice(UNKNOWN_FRESH + UNKNOWN_GOODS)}{rng.integers(1, 999)}",
+    }
+
+    names = {}
+    for category, share in CATEGORY_NAME_SHARES.items():
+        target = max(1, int(distinct_names * share))
+        generated = set()
+        # 组合空间有限时可能达不到目标数量，尝试次数设上限
+        for _ in range(target * 20):
+            if len(generated) >= target:
+                break
+            generated.add(makers[category]())
+        names[category] = sorted(generated)
+    return names
+
+
+def generate_sales_frame(
+    rows: int,
+    distinct_names: int = 3000,
+    unknown_rate: float = 0.02,
+    zipf_a: float = 1.1,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    生成合成销售数据
+
+    每行先按类别行占比（未知名称占 unknown_rate，其余按 CATEGORY_ROW_SHARES）选择类别，
+    再在类别内按 Zipf 分布选择礼包名称。
+
+    Args:
+        rows: 行数
+        distinct_names: 不同礼包名称的数量
+        unknown_rate: 规则无法识别的名称所占行比例
+        zipf_a: 类别内名称频次的 Zipf 分布参数（越大越集中）
+        seed: 随机种子
+
+    Returns:
+        包含礼包名称、销售单类型、价格类型等列的 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    names_by_category = make_distinct_names(distinct_names, seed)
+
+    categories = list(CATEGORY_ROW_SHARES) + ["未知"]
+    shares = np.array([CATEGORY_ROW_SHARES[c] for c in CATEGORY_ROW_SHARES] + [0.0])
+    shares = shares / shares.sum() * (1 - unknown_rate)
+    shares[-1] = unknown_rate
+    row_categories = rng.choice(len(categories), size=rows, p=shares)
+
+    gift_names = np.empty(rows, dtype=object)
+    for index, category in enumerate(categories):
+        mask = row_categories == index
+        pool = np.array(names_by_category[category], dtype=object)
+        rng.shuffle(pool)
+        weights = 1.0 / np.arange(1, len(pool) + 1) ** zipf_a
+        gift_names[mask] = pool[rng.choice(len(pool), size=int(mask.sum()), p=weights / weights.sum())]
+
+    quantity = rng.integers(1, 20, size=rows)
+    unit_price = rng.choice([299.0, 499.0, 766.0, 889.0, 1099.0, 1299.0], size=rows)
+    return pd.DataFrame({
+        "订单编号": [f"XS{seed:02d}{i:010d}" for i in range(rows)],
+        "销售员": rng.choice(np.array(SALESPERSON_NAMES, dtype=object), size=rows),
+        "礼包名称": gift_names,
+        "价格类型": rng.choice(np.array(PRICE_TYPES, dtype=object), size=rows, p=PRICE_TYPE_WEIGHTS),
+        "数量": quantity,
+        "折扣价": unit_price,
+        "汇总价": quantity * unit_price,
+        "销售单类型": rng.choice(np.array(SALES_ORDER_TYPES, dtype=object), size=rows, p=SALES_ORDER_TYPE_WEIGHTS),
+    })
+
+
+def write_workbook(df: pd.DataFrame, path: Path) -> Path:
+    """
+    以 openpyxl 只写模式写出 Excel（比 DataFrame.to_excel 快，内存占用低）
+
+    Args:
+        df: 数据
+        path: 输出路径
+
+    Returns:
+        输出路径
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(df.columns.tolist())
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([value.item() if isinstance(value, np.generic) else value for value in row])
+    workbook.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成销售数据 Excel")
+    parser.add_argument("--rows", type=int, default=100_000, help="行数")
+    parser.add_argument("--distinct-names", type=int, default=3000, help="不同礼包名称的数量")
+    parser.add_argument("--unknown-rate", type=float, default=0.02, help="规则无法识别的名称所占行比例")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("-o", "--output", required=True, help="输出 Excel 路径")
+    args = parser.parse_args()
+
+    df = generate_sales_frame(args.rows, args.distinct_names, args.unknown_rate, seed=args.seed)
+    path = write_workbook(df, args.output)
+    print(f"已生成 {len(df)} 行（{df['礼包名称'].nunique()} 个不同礼包名称）: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+本地 OpenAI 兼容 mock 服务：模拟 /chat/completions 接口，可配置延迟与错误率
+
+按 ProductClassifier 的单条/批量 Prompt 格式解析出礼包名称，名称中包含生鲜词汇时判为生鲜专卡，
+否则判为待确认；结果确定，便于对比不同运行的分类结果。
+
+用法:
+    python -m benchmarks.mock_llm_server --port 8765 --latency 0.2 --error-rate 0.05
+    DEEPSEEK_API_KEY=mock DEEPSEEK_BASE_URL=http://127.0.0.1:8765/v1 python -m src.main sales.xlsx
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+FRESH_WORDS = ["牛", "羊", "猪", "鸡", "鸭", "鱼", "虾", "蟹", "贝", "鲍", "海鲜", "生鲜", "水果", "车厘子"]
+
+_BATCH_ITEM = re.compile(r'^(\d+): (".*")$', re.MULTILINE)
+_SINGLE_NAME = re.compile(r"名称：(.*?)\n\n请以", re.DOTALL)
+
+
+def judge(name: str) -> str:
+    """mock 判定规则：包含生鲜词汇即为生鲜专卡"""
+    return "生鲜专卡" if any(word in name for word in FRESH_WORDS) else "待确认"
+
+
+def answer(prompt: str) -> str:
+    """按 Prompt 格式生成回复内容"""
+    items = _BATCH_ITEM.findall(prompt)
+    if items:
+        return json.dumps(
+            [{"序号": int(index), "产品类型": judge(json.loads(name))} for index, name in items],
+            ensure_ascii=False,
+        )
+    match = _SINGLE_NAME.search(prompt)
+    name = match.group(1) if match else prompt
+    return json.dumps({"产品类型": judge(name), "置信度": 0.9, "原因": "mock"}, ensure_ascii=False)
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """OpenAI 兼容 mock 服务"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口（0 表示自动分配）
+            latency: 每次请求的平均延迟（秒）
+            jitter: 延迟的随机波动幅度（秒）
+            error_rate: 随机返回 429/500 错误的比例
+            seed: 随机种子
+        """
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stats: Dict[str, int] = {"requests": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        """在后台线程中启动服务"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def record(self, **counts: int) -> None:
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockLLMServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Dict[str, str] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        with server._lock:
+            delay = max(0.0, server.latency + server.random.uniform(-server.jitter, server.jitter))
+            fail = server.random.random() < server.error_rate
+            status = server.random.choice([429, 500]) if fail else 200
+        time.sleep(delay)
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        if fail:
+            server.record(requests=1, errors=1)
+            self._send_json(status, {"error": {"message": "mock error"}}, {"Retry-After": "0"} if status == 429 else None)
+            return
+
+        messages: List[dict] = request.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        content = answer(prompt)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages)
+        completion_tokens = len(content)
+        server.record(requests=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        self._send_json(200, {
+            "id": "mock",
+            "object": "chat.completion",
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容 mock 服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.2, help="平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.05, help="延迟波动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机错误比例")
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"mock LLM 服务已启动: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+规则匹配一致性检查：KeywordMatcher / ProductClassifier._rule_based_classify 与原来的逐条扫描实现逐个比较
+
+原实现按优先级依次遍历 销售员名字（定制册） > 常规册 > 生鲜专卡 > 不核算 的关键词列表，
+命中第一个即返回，最后用 CUSTOM_BOOK_PATTERN 辅助匹配定制册。检查使用两类名称：
+- 合成名称：generate_workbook 的各类别名称，以及随机拼接多组关键词、销售员名字和干扰字符的名称（覆盖优先级冲突）
+- 示例工作簿：data/input/ 下的 Excel 文件中的全部礼包名称
+
+存在不一致时打印前几个差异并以非零状态退出，可在修改关键词或匹配器后作为回归检查。
+
+用法:
+    python -m benchmarks.rule_parity
+    python -m benchmarks.rule_parity --names 200000 --seed 1
+    python -m benchmarks.rule_parity --workbook sales_jan.xlsx
+"""
+import argparse
+import sys
+from typing import List, Optional, Sequence
+import numpy as np
+from src.config import CLASSIFICATION_KEYWORDS, CUSTOM_BOOK_PATTERN, INPUT_DIR, SALESPERSON_NAMES
+from src.data_loader import DataLoader
+from src.keyword_matcher import get_rule_matcher
+from src.product_classifier import ProductClassifier
+from .generate_workbook import make_distinct_names
+
+# 拼接名称时使用的干扰字符（含正则辅助匹配用到的 "+"）
+NOISE = ["", "2025", "礼盒", "+", "（新版）", "A款", "·", " ", "889"]
+
+
+def legacy_keyword_match(name: str) -> Optional[str]:
+    """原实现的关键词部分：按优先级逐条扫描，命中第一个即返回"""
+    for person in SALESPERSON_NAMES:
+        if person in name:
+            return "定制册"
+    for label in ("常规册", "生鲜专卡", "不核算"):
+        for keyword in CLASSIFICATION_KEYWORDS[label]:
+            if keyword in name:
+                return label
+    return None
+
+
+def legacy_rule_classify(name, sales_order_type: Optional[str] = None) -> Optional[str]:
+    """原实现的 _rule_based_classify"""
+    if not name or not isinstance(name, str):
+        return None
+    if sales_order_type and sales_order_type == "实物集采":
+        return "实物集采"
+    matched = legacy_keyword_match(name)
+    if matched:
+        return matched
+    if CUSTOM_BOOK_PATTERN.search(name):
+        return "定制册"
+    return None
+
+
+def make_mixed_names(count: int, seed: int = 0) -> List[str]:
+    """
+    随机拼接 1-3 个来自不同分组的关键词 / 销售员名字和干扰字符，覆盖多个分组同时命中的情况
+
+    Args:
+        count: 名称数量
+        seed: 随机种子
+    """
+    rng = np.random.default_rng(seed)
+    pools = [list(SALESPERSON_NAMES)] + [list(CLASSIFICATION_KEYWORDS[label]) for label in ("常规册", "生鲜专卡", "不核算")]
+    pools.append(["空气炸锅", "保温杯", "和牛", "三文鱼", "茶具"])
+    names = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.integers(1, 4)):
+            pool = pools[rng.integers(len(pools))]
+            parts.append(str(rng.choice(NOISE)))
+            parts.append(str(rng.choice(pool)))
+        names.append("".join(parts) + str(rng.choice(NOISE)))
+    return names
+
+
+def load_workbook_names(filenames: Sequence[str]) -> List[str]:
+    """读取工作簿中的全部礼包名称（自动检测列名）"""
+    data_loader = DataLoader()
+    names: List[str] = []
+    for filename in filenames:
+        df = data_loader.load_sales_data(filename, use_cache=False)
+        column = data_loader.detect_gift_name_column(df)
+        names.extend(df[column].tolist())
+    return names
+
+
+def compare(title: str, names: Sequence, sales_order_types: Optional[Sequence] = None, show: int = 10) -> int:
+    """
+    比较匹配器、规则分类与原实现
+
+    Returns:
+        不一致的名称数
+    """
+    matcher = get_rule_matcher()
+    classifier = ProductClassifier()
+    if sales_order_types is None:
+        sales_order_types = [None] * len(names)
+    mismatches = []
+    for name, s_type in zip(names, sales_order_types):
+        expected = legacy_rule_classify(name, s_type)
+        actual = classifier._rule_based_classify(name, s_type)
+        if isinstance(name, str) and name:
+            keyword_expected = legacy_keyword_match(name)
+            keyword_actual = matcher.match(name)
+            if keyword_actual != keyword_expected:
+                mismatches.append((name, s_type, "KeywordMatcher", keyword_expected, keyword_actual))
+                continue
+        if actual != expected:
+            mismatches.append((name, s_type, "_rule_based_classify", expected, actual))
+    status = "OK" if not mismatches else "FAIL"
+    print(f"{title}: {len(names)} 个名称，不一致 {len(mismatches)} 个 {status}")
+    for name, s_type, source, expected, actual in mismatches[:show]:
+        print(f"  {source}: {name!r}（{s_type}） 原实现 {expected}，当前 {actual}")
+    return len(mismatches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="规则匹配一致性检查")
+    parser.add_argument("--names", type=int, default=50_000, help="随机拼接的名称数量")
+    parser.add_argument("--distinct-names", type=int, default=3000, help="按类别生成的名称数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--workbook", nargs="*", help="要检查的工作簿（位于 data/input/，默认检查其中全部 xlsx 文件）")
+    args = parser.parse_args()
+
+    failures = 0
+    generated = [name for names in make_distinct_names(args.distinct_names, args.seed).values() for name in names]
+    failures += compare("合成名称", generated)
+    mixed = make_mixed_names(args.names, args.seed)
+    rng = np.random.default_rng(args.seed)
+    failures += compare("拼接名称", mixed, rng.choice(np.array(["实物礼包", "实物集采", None], dtype=object), len(mixed)))
+    failures += compare("边界值", [None, "", float("nan"), "+", "空气炸锅"])
+
+    workbooks = args.workbook
+    if workbooks is None:
+        workbooks = sorted(path.name for path in INPUT_DIR.glob("*.xlsx") if not path.name.startswith("~$"))
+    if workbooks:
+        failures += compare(f"示例工作簿（{len(workbooks)} 个文件）", load_workbook_names(workbooks))
+    else:
+        print(f"示例工作簿: {INPUT_DIR} 中没有 xlsx 文件，跳过")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
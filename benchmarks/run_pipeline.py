@@ -0,0 +1,158 @@
+"""
+分类流程分阶段基准测试：加载、分类、价格类型规整、保存
+
+对每个数据规模生成合成 Excel，LLM 请求发往本地 mock 服务，逐阶段计时，结果以 JSON 输出，
+便于跟踪性能回归。持久化分类缓存和解析缓存在基准测试中关闭，每次都是冷启动。
+--record 把 LLM 响应录制到文件，--replay 从录制文件回放（不启动 mock 服务、不访问网络，
+LLM 阶段全速运行或按 --replay-latency 注入固定延迟）；回放要求与录制时使用相同的规模和参数。
+
+用法:
+    python -m benchmarks.run_pipeline --sizes 10000 100000 1000000 -o bench.json
+    python -m benchmarks.run_pipeline --sizes 100000 --format csv
+    python -m benchmarks.run_pipeline --sizes 100000 --record bench_llm.jsonl
+    python -m benchmarks.run_pipeline --sizes 100000 --replay bench_llm.jsonl
+"""
+import argparse
+import contextlib
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import pandas as pd
+from src.config import CLASSIFICATION_CONFIG, LLM_TRANSPORT_CONFIG
+from src.data_loader import DataLoader
+from src.llm_client import LLMClient
+from src.metrics import RunMetrics
+from src.product_classifier import ProductClassifier
+from .generate_workbook import generate_sales_frame, write_workbook
+from .mock_llm_server import MockLLMServer
+
+
+def run_size(
+    rows: int,
+    workdir: Path,
+    server: Optional[MockLLMServer],
+    distinct_names: int,
+    unknown_rate: float,
+    output_format: str = "xlsx",
+) -> dict:
+    """
+    对一个数据规模运行完整流程并分阶段计时
+
+    Args:
+        rows: 行数
+        workdir: 临时工作目录
+        server: mock LLM 服务（回放录制文件时为 None）
+        distinct_names: 不同礼包名称数量
+        unknown_rate: 规则无法识别的名称所占行比例
+        output_format: 结果文件格式
+
+    Returns:
+        该规模的基准结果
+    """
+    input_name = f"synthetic_{rows}.xlsx"
+    generate_start = time.perf_counter()
+    write_workbook(generate_sales_frame(rows, distinct_names, unknown_rate), workdir / input_name)
+    generate_time = time.perf_counter() - generate_start
+
+    metrics = RunMetrics()
+    data_loader = DataLoader(metrics)
+    data_loader.input_dir = workdir
+    data_loader.output_dir = workdir
+    base_url = server.base_url if server is not None else None
+    llm_client = LLMClient(provider="deepseek", api_key="mock", base_url=base_url, metrics=metrics)
+    classifier = ProductClassifier(llm_client, metrics=metrics)
+
+    df = data_loader.load_sales_data(input_name, use_cache=False)
+    with metrics.stage("classify"):
+        product_types = classifier.classify_batch(df["礼包名称"], sales_order_types=df["销售单类型"])
+    df = data_loader.add_product_type_column(df, product_types)
+    with metrics.stage("normalize"):
+        data_loader.normalize_price_type_column(df)
+    data_loader.save_results(df, f"result_{input_name}", output_format)
+    llm_client.close()
+
+    report = metrics.to_dict()
+    timings: Dict[str, float] = {
+        name: report["stages"][name]["wall_seconds"] for name in ("load", "classify", "normalize", "save")
+    }
+
+    return {
+        "rows": rows,
+        "output_format": output_format,
+        "distinct_names": int(df["礼包名称"].nunique()),
+        "llm_requests": int(report["counters"].get("llm_requests", 0)),
+        "generate_seconds": round(generate_time, 4),
+        "stages": timings,
+        "total_seconds": round(sum(timings.values()), 4),
+        "metrics": report,
+        "product_types": {k: int(v) for k, v in pd.Series(product_types).value_counts().items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分类流程分阶段基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="数据规模（行数）")
+    parser.add_argument("--distinct-names", type=int, default=3000, help="不同礼包名称数量")
+    parser.add_argument("--unknown-rate", type=float, default=0.02, help="规则无法识别的名称所占行比例")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM 平均延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock LLM 随机错误比例")
+    parser.add_argument("--format", dest="output_format", choices=["xlsx", "csv", "parquet"], default="xlsx",
+                        help="结果文件格式")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--record", help="把 mock LLM 的响应录制到该文件（JSON Lines）")
+    transport.add_argument("--replay", help="从该录制文件回放 LLM 响应，不启动 mock 服务")
+    parser.add_argument("--rule-workers", type=int, default=1, help="规则匹配的进程数（0 表示 CPU 核数）")
+    parser.add_argument("--replay-latency", type=float, default=0.0, help="回放时每次请求注入的延迟（秒）")
+    parser.add_argument("-o", "--output", help="JSON 结果输出路径（默认打印到标准输出）")
+    args = parser.parse_args()
+
+    # 基准测试每次都从冷缓存开始
+    CLASSIFICATION_CONFIG["enable_persistent_cache"] = False
+    CLASSIFICATION_CONFIG["rule_workers"] = args.rule_workers
+    if args.replay:
+        LLM_TRANSPORT_CONFIG.update(mode="replay", recording_path=Path(args.replay), replay_latency=args.replay_latency)
+        llm_info = {"replay": args.replay, "latency": args.replay_latency}
+    else:
+        if args.record:
+            LLM_TRANSPORT_CONFIG.update(mode="record", recording_path=Path(args.record))
+        llm_info = {"latency": args.latency, "error_rate": args.error_rate, "record": args.record}
+
+    server = None
+    if not args.replay:
+        server = MockLLMServer(latency=args.latency, jitter=args.latency / 4, error_rate=args.error_rate).start()
+    results: List[dict] = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+            for rows in args.sizes:
+                print(f"运行规模 {rows} 行...", file=sys.stderr)
+                # 分类过程的进度输出转到标准错误，标准输出只保留 JSON
+                with contextlib.redirect_stdout(sys.stderr):
+                    results.append(run_size(
+                        rows, Path(tmp), server, args.distinct_names, args.unknown_rate, args.output_format
+                    ))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "mock_llm": llm_info,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        print(f"基准结果已保存至: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+命令行启动耗时检查：以 python -X importtime 测量模块导入耗时，并与预算比较
+
+- src.main（命令行入口）只应导入 argparse，参数解析完才导入分类流程
+- src.pipeline（分类流程）不应导入 streamlit，openpyxl 只在流式读取时导入
+
+每个模块在新的子进程中导入多次，取最小值；超出预算或导入了禁止的模块时以非零状态退出，
+可在定时任务主机上作为启动耗时的回归检查。
+
+用法:
+    python -m benchmarks.startup_time
+    python -m benchmarks.startup_time --repeat 10 --scale 2
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 模块 -> (导入耗时预算（毫秒）, 不允许被导入的模块)
+STARTUP_BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "src.main": (50, ("pandas", "numpy", "requests", "openpyxl", "streamlit")),
+    "src.pipeline": (1500, ("streamlit", "openpyxl")),
+}
+
+
+def measure_import(module: str) -> Tuple[float, List[str]]:
+    """
+    在新的子进程中导入模块
+
+    Args:
+        module: 模块名
+
+    Returns:
+        (累计导入耗时（毫秒）, 导入过程中加载的全部模块名)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # 每行格式：import time: self [us] | cumulative | imported package
+    total_us = None
+    loaded = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        name = name.strip()
+        loaded.append(name)
+        if name == module:
+            total_us = int(cumulative)
+    if total_us is None:
+        raise RuntimeError(f"未能从 importtime 输出中找到模块 {module}")
+    return total_us / 1000, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命令行启动耗时检查")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块测量次数（取最小值）")
+    parser.add_argument("--scale", type=float, default=1.0, help="预算缩放系数（较慢的机器可调大）")
+    args = parser.parse_args()
+
+    failures = []
+    for module, (budget_ms, forbidden) in STARTUP_BUDGETS.items():
+        timings = []
+        loaded: List[str] = []
+        for _ in range(args.repeat):
+            elapsed, loaded = measure_import(module)
+            timings.append(elapsed)
+        best = min(timings)
+        budget = budget_ms * args.scale
+        imported = sorted({name for name in loaded if name.split(".")[0] in forbidden})
+        status = "OK" if best <= budget and not imported else "FAIL"
+        print(f"{module}: {best:.1f} ms（预算 {budget:.0f} ms） {status}")
+        if best > budget:
+            failures.append(f"{module} 导入耗时 {best:.1f} ms 超出预算 {budget:.0f} ms")
+        if imported:
+            failures.append(f"{module} 导入了不应导入的模块: {', '.join(imported)}")
+
+    for failure in failures:
+        print(f"  错误: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
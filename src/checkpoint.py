@@ -0,0 +1,139 @@
+"""
+分类检查点模块 - 定期把已判断的名称和处理位置保存到磁盘，进程中断后可从检查点继续
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+# 检查点文件格式版本，格式变化后旧检查点作废
+CHECKPOINT_VERSION = 1
+
+
+def input_fingerprint(names: Sequence, sales_order_types: Optional[Sequence] = None, rules_version: str = "") -> str:
+    """
+    计算输入数据的指纹（逐行名称、销售单类型和规则版本），用于判断检查点是否属于同一次输入
+
+    Args:
+        names: 礼包名称序列
+        sales_order_types: 销售单类型序列（可选）
+        rules_version: 规则/Prompt/模型配置的版本哈希
+
+    Returns:
+        十六进制指纹
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{CHECKPOINT_VERSION}|{rules_version}|{len(names)}|".encode("utf-8"))
+    for values in (names, sales_order_types):
+        if values is not None:
+            digest.update(pd.util.hash_array(np.asarray(values, dtype=object)).tobytes())
+    return digest.hexdigest()
+
+
+class ClassificationCheckpoint:
+    """
+    分类检查点
+
+    记录 LLM 阶段已判断的名称（{礼包名称: 产品类型}）和已完成的行数（position）。
+    检查点绑定输入指纹，输入内容或规则变化后自动作废、从头开始。
+    每隔 interval_seconds 秒最多写入一次；写入时先写临时文件再替换，进程在写入中途退出也不会损坏已有检查点。
+    """
+
+    def __init__(self, path: Path, interval_seconds: Optional[float] = None):
+        """
+        Args:
+            path: 检查点文件路径
+            interval_seconds: 两次写入之间的最短间隔（秒，None 或 0 表示每次更新都写入）
+        """
+        self.path = Path(path)
+        self.interval_seconds = interval_seconds
+        self.fingerprint: Optional[str] = None
+        self.position = 0
+        self.resolved: Dict[str, str] = {}
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path, interval_seconds: Optional[float] = None) -> "ClassificationCheckpoint":
+        """
+        读取已有的检查点（文件不存在或无法解析时返回空检查点）
+
+        Args:
+            path: 检查点文件路径
+            interval_seconds: 两次写入之间的最短间隔（秒）
+        """
+        checkpoint = cls(path, interval_seconds)
+        if not checkpoint.path.exists():
+            return checkpoint
+        try:
+            state = json.loads(checkpoint.path.read_text(encoding="utf-8"))
+            if state.get("version") == CHECKPOINT_VERSION:
+                checkpoint.fingerprint = state["fingerprint"]
+                checkpoint.position = int(state["position"])
+                checkpoint.resolved = dict(state["resolved"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"  警告: 无法读取检查点 {checkpoint.path}: {e}")
+        return checkpoint
+
+    def bind(self, fingerprint: str) -> bool:
+        """
+        绑定输入指纹；与已保存的指纹不同时清空进度
+
+        Args:
+            fingerprint: 当前输入的指纹
+
+        Returns:
+            是否沿用了已有进度
+        """
+        with self._lock:
+            has_progress = bool(self.position or self.resolved)
+            if self.fingerprint == fingerprint and has_progress:
+                print(f"  从检查点继续：已完成 {self.position} 行，已判断 {len(self.resolved)} 个名称")
+                return True
+            if has_progress:
+                print("  检查点与当前输入或规则不一致，从头开始")
+            self.fingerprint = fingerprint
+            self.position = 0
+            self.resolved = {}
+            return False
+
+    def record(self, name: str, product_type: str) -> None:
+        """记录一个已判断的名称"""
+        with self._lock:
+            self.resolved[name] = product_type
+        self.maybe_save()
+
+    def advance(self, position: int) -> None:
+        """记录已完成的行数（该位置之前各行需要的名称都已记录）"""
+        with self._lock:
+            self.position = position
+        self.maybe_save()
+
+    def maybe_save(self) -> None:
+        """距离上次写入超过 interval_seconds 时写入"""
+        if not self.interval_seconds or time.monotonic() - self._last_save >= self.interval_seconds:
+            self.save()
+
+    def save(self) -> None:
+        """写入检查点文件"""
+        with self._lock:
+            state = {
+                "version": CHECKPOINT_VERSION,
+                "fingerprint": self.fingerprint,
+                "position": self.position,
+                "resolved": dict(self.resolved),
+            }
+            self._last_save = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.tmp")
+        temp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        os.replace(temp_path, self.path)
+
+    def remove(self) -> None:
+        """运行完成后删除检查点文件"""
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,195 @@
+"""
+分类结果持久化缓存模块 - 基于 SQLite，跨运行复用 LLM 判断结果
+"""
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+class ClassificationCache:
+    """
+    SQLite 分类缓存
+
+    每条记录以 (namespace, 规范化名称) 为键。namespace 为规则/Prompt/模型的版本哈希，
+    配置变化后旧版本的记录不再命中，并在下次清理时删除。
+    数据库使用 WAL 模式，每个线程使用独立连接，可供多个读者并发访问。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        namespace: str,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        """
+        Args:
+            path: SQLite 数据库文件路径
+            namespace: 缓存命名空间（规则版本哈希）
+            ttl_seconds: 记录有效期（秒），None 表示不过期
+            max_entries: 最多保留的记录数，None 表示不限
+        """
+        self.path = Path(path)
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS classification_cache ("
+            " namespace TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " product_type TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, name))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_classification_cache_created"
+            " ON classification_cache (created_at)"
+        )
+        conn.commit()
+        self.evict()
+
+    @staticmethod
+    def normalize_name(name) -> str:
+        """
+        规范化礼包名称（全角/半角统一、去除首尾空白），作为缓存键
+        """
+        return unicodedata.normalize("NFKC", str(name)).strip()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _expiry_cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds else 0.0
+
+    def get_many(self, names: Iterable) -> Dict:
+        """
+        批量查询缓存
+
+        Args:
+            names: 礼包名称列表
+
+        Returns:
+            {原始名称: 产品类型}，只包含命中的名称
+        """
+        keys: Dict[str, list] = {}
+        for name in names:
+            keys.setdefault(self.normalize_name(name), []).append(name)
+        if not keys:
+            return {}
+
+        conn = self._connect()
+        found: Dict[str, str] = {}
+        key_list = list(keys)
+        # SQLite 单条语句的参数数量有限，分段查询
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT name, product_type FROM classification_cache"
+                f" WHERE namespace = ? AND created_at >= ? AND name IN ({placeholders})",
+                [self.namespace, self._expiry_cutoff(), *chunk],
+            ).fetchall()
+            found.update(rows)
+
+        results = {}
+        for key, originals in keys.items():
+            if key in found:
+                for name in originals:
+                    results[name] = found[key]
+        with self._stats_lock:
+            self.hits += len(results)
+            self.misses += sum(len(originals) for originals in keys.values()) - len(results)
+        return results
+
+    def set_many(self, items: Dict) -> None:
+        """
+        批量写入缓存
+
+        Args:
+            items: {礼包名称: 产品类型}
+        """
+        if not items:
+            return
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO classification_cache (namespace, name, product_type, created_at)"
+                " VALUES (?, ?, ?, ?)",
+                [(self.namespace, self.normalize_name(name), product_type, now) for name, product_type in items.items()],
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        清理过期记录、其他版本的记录，并将记录数裁剪到 max_entries 以内（优先删除最早写入的）
+
+        Returns:
+            删除的记录数
+        """
+        conn = self._connect()
+        with conn:
+            deleted = conn.execute(
+                "DELETE FROM classification_cache WHERE namespace != ? OR created_at < ?",
+                (self.namespace, self._expiry_cutoff()),
+            ).rowcount
+            if self.max_entries:
+                deleted += conn.execute(
+                    "DELETE FROM classification_cache WHERE rowid IN ("
+                    " SELECT rowid FROM classification_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+        return deleted
+
+    def items(self) -> Dict[str, str]:
+        """
+        读取当前命名空间下所有未过期的记录
+        
+        Returns:
+            {规范化名称: 产品类型}
+        """
+        rows = self._connect().execute(
+            "SELECT name, product_type FROM classification_cache WHERE namespace = ? AND created_at >= ?",
+            (self.namespace, self._expiry_cutoff()),
+        ).fetchall()
+        return dict(rows)
+    
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM classification_cache").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        缓存命中统计
+
+        Returns:
+            包含 hits / misses / hit_ratio / entries 的字典
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self) -> None:
+        """关闭当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
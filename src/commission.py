@@ -0,0 +1,206 @@
+"""
+提成核算模块 - 按 (产品类型, 价格类型) 费率计算每行提成，并按提成归属人汇总
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .config import COMMISSION_CONFIG, COMMISSION_RATES, PRODUCT_TYPES
+from .keyword_matcher import get_salesperson_matcher
+from .metrics import RunMetrics
+
+# 提成核算添加的结果列
+COMMISSION_RATE_COLUMN = "提成费率"
+COMMISSION_AMOUNT_COLUMN = "提成金额"
+COMMISSION_OWNER_COLUMN = "提成归属人"
+
+# 费率表中表示"该产品类型的任意价格类型"的通配符
+ANY_PRICE_TYPE = "*"
+
+
+class CommissionCalculator:
+    """
+    提成计算器
+
+    每行提成 = 计提金额 × 费率。费率按 (产品类型, 价格类型) 查找：两列先合成组合编码去重，
+    只对不同的组合查一次费率表，再按编码取回各行（不逐行调用 Python 函数）。
+    定制册的提成归属礼包名称中出现的销售员（如"白虹+2025盐池滩羊889"归属白虹），
+    其余行以及名称中没有销售员名字的定制册归属销售员列。
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Dict[Tuple[str, str], float]] = None,
+        metrics: Optional[RunMetrics] = None,
+        amount_column: Optional[str] = None,
+        salesperson_column: Optional[str] = None,
+    ):
+        """
+        Args:
+            rates: 费率表 {(产品类型, 价格类型): 费率}（可选，默认使用 config.COMMISSION_RATES）
+            metrics: 运行指标收集器（可选）
+            amount_column: 计提金额列（可选，默认使用 COMMISSION_CONFIG 中的配置）
+            salesperson_column: 销售员列（可选，默认使用 COMMISSION_CONFIG 中的配置）
+        """
+        self.rates = dict(COMMISSION_RATES if rates is None else rates)
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.amount_column = amount_column or COMMISSION_CONFIG["amount_column"]
+        self.salesperson_column = salesperson_column or COMMISSION_CONFIG["salesperson_column"]
+
+    def lookup_rate(self, product_type, price_type) -> float:
+        """
+        查找单个组合的费率
+
+        Returns:
+            费率；费率表中没有对应条目时为 NaN
+        """
+        rate = self.rates.get((product_type, price_type))
+        if rate is None:
+            rate = self.rates.get((product_type, ANY_PRICE_TYPE))
+        return np.nan if rate is None else float(rate)
+
+    def rates_for(self, product_types: Iterable, price_types: Iterable) -> np.ndarray:
+        """
+        批量查找每行的费率
+
+        Args:
+            product_types: 产品类型列
+            price_types: 价格类型列（已按结算口径规整）
+
+        Returns:
+            float64 费率数组；没有对应条目的行为 NaN
+        """
+        product_codes, product_uniques = pd.factorize(pd.Series(product_types), use_na_sentinel=False)
+        price_codes, price_uniques = pd.factorize(pd.Series(price_types), use_na_sentinel=False)
+        product_uniques = np.asarray(product_uniques, dtype=object)
+        price_uniques = np.asarray(price_uniques, dtype=object)
+        width = max(len(price_uniques), 1)
+        pair_codes, pair_uniques = pd.factorize(product_codes.astype(np.int64) * width + price_codes)
+        unique_rates = np.array(
+            [
+                self.lookup_rate(product_uniques[key // width], price_uniques[key % width])
+                for key in pair_uniques
+            ],
+            dtype=np.float64,
+        )
+        return unique_rates[pair_codes]
+
+    def owners_for(self, df: pd.DataFrame, gift_name_col: str) -> pd.Categorical:
+        """
+        确定每行的提成归属人
+
+        Args:
+            df: 已分类的 DataFrame（包含产品类型列、礼包名称列和销售员列）
+            gift_name_col: 礼包名称列名
+
+        Returns:
+            提成归属人（Categorical）
+        """
+        if self.salesperson_column not in df.columns:
+            raise ValueError(f"输入文件中缺少'{self.salesperson_column}'列，该列是提成归属的必要条件。")
+        owners = df[self.salesperson_column].to_numpy(dtype=object, copy=True)
+        custom = (df["产品类型"] == "定制册").to_numpy()
+        if custom.any():
+            # 每个不同的定制册名称只匹配一次
+            codes, uniques = pd.factorize(df.loc[custom, gift_name_col].to_numpy(dtype=object))
+            matcher = get_salesperson_matcher()
+            matched = np.array(
+                [matcher.match(name) if isinstance(name, str) else None for name in uniques] + [None],
+                dtype=object,
+            )
+            # 缺失名称的编码为 -1，正好取到末尾的 None
+            named = matched[codes]
+            has_name = pd.notna(named)
+            owners[np.flatnonzero(custom)[has_name]] = named[has_name]
+        return pd.Categorical(owners)
+
+    def compute(self, df: pd.DataFrame, gift_name_col: str = "礼包名称") -> pd.DataFrame:
+        """
+        计算每行提成
+
+        返回的 DataFrame 是浅拷贝（与 add_product_type_column 一致），添加提成费率、提成金额、提成归属人三列。
+
+        Args:
+            df: 已分类、已规整价格类型的 DataFrame
+            gift_name_col: 礼包名称列名
+
+        Returns:
+            添加了提成列的 DataFrame
+
+        Raises:
+            ValueError: 如果缺少必要的列
+        """
+        for column in ("产品类型", "价格类型", self.amount_column):
+            if column not in df.columns:
+                raise ValueError(f"输入文件中缺少'{column}'列，该列是提成核算的必要条件。")
+
+        with self.metrics.stage("commission"):
+            rates = self.rates_for(df["产品类型"], df["价格类型"])
+            amounts = pd.to_numeric(df[self.amount_column], errors="coerce").to_numpy(dtype=np.float64)
+            owners = self.owners_for(df, gift_name_col)
+            df = df.copy(deep=False)
+            df[COMMISSION_RATE_COLUMN] = rates
+            df[COMMISSION_AMOUNT_COLUMN] = amounts * rates
+            df[COMMISSION_OWNER_COLUMN] = owners
+        missing = int(np.isnan(rates).sum())
+        self.metrics.incr("commission_rows", len(df))
+        self.metrics.incr("commission_unmatched_rows", missing)
+        return df
+
+    def summarize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        按提成归属人汇总（groupby，不逐行循环）
+
+        Args:
+            df: compute() 返回的 DataFrame
+
+        Returns:
+            以提成归属人为索引的汇总表：行数、计提金额合计、提成金额合计、费率缺失行数，
+            以及各产品类型的提成金额；按提成金额合计从高到低排列
+        """
+        with self.metrics.stage("commission"):
+            frame = pd.DataFrame({
+                COMMISSION_OWNER_COLUMN: df[COMMISSION_OWNER_COLUMN],
+                "产品类型": df["产品类型"],
+                "计提金额": pd.to_numeric(df[self.amount_column], errors="coerce"),
+                COMMISSION_AMOUNT_COLUMN: df[COMMISSION_AMOUNT_COLUMN],
+                "费率缺失行数": df[COMMISSION_RATE_COLUMN].isna(),
+            })
+            # dropna=False：销售员为空的行单独汇总，不丢弃
+            totals = frame.groupby(COMMISSION_OWNER_COLUMN, observed=True, sort=False, dropna=False).agg(
+                行数=(COMMISSION_AMOUNT_COLUMN, "size"),
+                计提金额合计=("计提金额", "sum"),
+                提成金额合计=(COMMISSION_AMOUNT_COLUMN, "sum"),
+                费率缺失行数=("费率缺失行数", "sum"),
+            )
+            by_type = (
+                frame.groupby([COMMISSION_OWNER_COLUMN, "产品类型"], observed=True, sort=False, dropna=False)[COMMISSION_AMOUNT_COLUMN]
+                .sum()
+                .unstack(fill_value=0.0)
+            )
+            return self._finish_summary(totals.join(by_type))
+
+    @classmethod
+    def combine(cls, summaries: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """
+        合并多个汇总表（流式分块或多个文件分别汇总后合并）
+
+        Args:
+            summaries: summarize() 返回的汇总表
+
+        Returns:
+            合并后的汇总表
+        """
+        combined = pd.concat(list(summaries)).fillna(0.0)
+        return cls._finish_summary(combined.groupby(level=0, sort=False, dropna=False).sum())
+
+    @staticmethod
+    def _finish_summary(summary: pd.DataFrame) -> pd.DataFrame:
+        """统一列顺序（各产品类型按 PRODUCT_TYPES 顺序）和类型，按提成金额合计排序"""
+        summary = summary.fillna(0.0)
+        summary.columns = summary.columns.astype(object)
+        leading = ["行数", "计提金额合计", "提成金额合计", "费率缺失行数"]
+        summary = summary[leading + [column for column in PRODUCT_TYPES if column in summary.columns]]
+        summary = summary.astype({"行数": np.int64, "费率缺失行数": np.int64})
+        summary.index = summary.index.astype(object)
+        summary.index.name = COMMISSION_OWNER_COLUMN
+        return summary.sort_values("提成金额合计", ascending=False, kind="stable")
@@ -3,6 +3,7 @@
 """
 import os
 import re
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -18,34 +19,70 @@ load_dotenv(dotenv_path=env_path)
 DATA_DIR = PROJECT_ROOT / "data"
 INPUT_DIR = DATA_DIR / "input"
 OUTPUT_DIR = DATA_DIR / "output"
+CACHE_DIR = DATA_DIR / "cache"
+
+# 持久化分类缓存（SQLite）
+CLASSIFICATION_CACHE_PATH = CACHE_DIR / "classification_cache.sqlite3"
+
+# 输入文件解析缓存（按文件内容哈希，保存解析后的 DataFrame）
+PARSE_CACHE_DIR = CACHE_DIR / "parsed"
+PARSE_CACHE_MAX_ENTRIES = 20
+
+# 分类检查点（已判断的名称和处理位置，中断后用 --resume 继续）
+CHECKPOINT_DIR = CACHE_DIR / "checkpoints"
+
+
+def _get_secret(name: str) -> str:
+    """
+    读取 API Key：运行在 Streamlit 中时优先读取 st.secrets，其次读取环境变量
+    
+    只在 streamlit 已被导入（即由 app.py 启动）时才读取 st.secrets，命令行运行不会导入 streamlit。
+    """
+    default = os.getenv(name, "")
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return default
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
+
 
 # API 配置（优先从 Streamlit Secrets 读取，其次从环境变量读取）
-try:
-    import streamlit as st
-    OPENAI_API_KEY = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY", ""))
-    DEEPSEEK_API_KEY = st.secrets.get("DEEPSEEK_API_KEY", os.getenv("DEEPSEEK_API_KEY", ""))
-except Exception:
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-    DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
+OPENAI_API_KEY = _get_secret("OPENAI_API_KEY")
+DEEPSEEK_API_KEY = _get_secret("DEEPSEEK_API_KEY")
 
 # 默认使用 DeepSeek（如果没有配置 OpenAI）
 DEFAULT_API_PROVIDER = "deepseek" if DEEPSEEK_API_KEY else "openai"
 DEFAULT_API_KEY = DEEPSEEK_API_KEY if DEEPSEEK_API_KEY else OPENAI_API_KEY
 
 # LLM API 配置
+# base_url 可通过环境变量覆盖（例如指向本地的 OpenAI 兼容 mock 服务）
+# rate_limit: 每个服务商的限流配置，requests_per_second / tokens_per_minute 为 None 表示不限
 API_CONFIG = {
     "openai": {
-        "base_url": "https://api.openai.com/v1",
+        "base_url": os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
         "model": "gpt-4o-mini",
         "api_key": OPENAI_API_KEY,
+        "rate_limit": {
+            "requests_per_second": 5,
+            "tokens_per_minute": 200000,
+        },
     },
     "deepseek": {
-        "base_url": "https://api.deepseek.com/v1",
+        "base_url": os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1"),
         "model": "deepseek-chat",
         "api_key": DEEPSEEK_API_KEY,
+        "rate_limit": {
+            "requests_per_second": 10,
+            "tokens_per_minute": None,
+        },
     }
 }
 
+# 全部产品类型（结果列以此为固定类别的 Categorical 存储）
+PRODUCT_TYPES = ("常规册", "生鲜专卡", "不核算", "定制册", "实物集采", "待确认")
+
 # 产品分类配置
 CLASSIFICATION_KEYWORDS = {
     "常规册": [
@@ -90,4 +127,71 @@ CLASSIFICATION_CONFIG = {
     "llm_temperature": 0.1,  # LLM 温度参数
     "llm_max_tokens": 500,  # LLM 最大输出 token 数
     "enable_cache": True,  # 是否启用分类结果缓存
+    "llm_max_workers": 8,  # LLM 并发请求数上限（1 表示串行），同时决定连接池大小
+    "llm_connect_timeout": 10,  # LLM API 连接超时（秒）
+    "llm_read_timeout": 60,  # LLM API 读取超时（秒）
+    "llm_max_retries": 3,  # 连接错误/超时/429/5xx 的最大重试次数
+    "llm_backoff_base": 0.5,  # 指数退避基准等待时间（秒）
+    "llm_backoff_max": 30,  # 单次重试最长等待时间（秒），Retry-After 超过时按此值等待
+    "llm_batch_size": 20,  # 每次 LLM 请求打包判断的名称数量（1 表示逐条请求）
+    "llm_batch_item_tokens": 30,  # 批量请求中每个名称预留的输出 token 数
+    "llm_failure_ttl": 300,  # LLM 判断失败的名称在此时间（秒）内不再重复请求，直接记为待确认
+    "enable_persistent_cache": True,  # 是否启用跨运行的持久化缓存（保存 LLM 判断结果）
+    "persistent_cache_ttl_days": 180,  # 持久化缓存有效期（天），None 表示不过期
+    "persistent_cache_max_entries": 200000,  # 持久化缓存最多保留的记录数
+    "enable_similarity_index": True,  # 规则无法确定时，先在已分类名称中查找相似名称，足够相似则直接沿用其类型
+    "similarity_threshold": 0.9,  # 相似度阈值（0-1，字符 n-gram 余弦相似度，数字视为相同）
+    "similarity_dim": 1024,  # 相似度索引的哈希向量维度
+    "llm_priority": "rows",  # 待 LLM 判断名称的顺序：rows（按出现行数）/ amount（按金额合计）/ None（按出现顺序）
+    "llm_priority_amount_column": "汇总价",  # llm_priority 为 amount 时使用的金额列（不存在时按行数）
+    "llm_budget_calls": None,  # 每次运行最多 LLM 请求次数，None 表示不限
+    "llm_budget_tokens": None,  # 每次运行最多消耗的 token 数，None 表示不限
+    "llm_deadline_seconds": None,  # 每次运行 LLM 阶段最长耗时（秒），None 表示不限；超出预算的名称记为待确认
+    "enable_checkpoint": True,  # 命令行运行时定期保存检查点，中断后可用 --resume 继续
+    "checkpoint_interval_seconds": 30,  # 检查点最短写入间隔（秒）
+    "checkpoint_chunk_rows": 50000,  # classify_iter 每块的行数（检查点位置按块推进）
+    "rule_workers": 1,  # 单个文件规则匹配的进程数（1 表示串行，0 表示 CPU 核数；需要支持 fork 的平台）
+    "rule_parallel_min_names": 50000,  # 不同名称数达到此值才并行匹配（名称较少时进程启动开销大于收益）
+}
+
+# 提成费率：提成金额 = 汇总价 × 费率，按 (产品类型, 价格类型) 查找；
+# 价格类型为 "*" 的条目是该产品类型的默认费率。常规册/生鲜专卡的价格类型为规整后的结算口径。
+# 以下为示例费率，请按实际提成政策修改
+COMMISSION_RATES = {
+    ("常规册", "按常规价结算"): 0.05,
+    ("常规册", "按优惠价结算"): 0.04,
+    ("常规册", "按核心价结算"): 0.03,
+    ("常规册", "按总监价结算"): 0.02,
+    ("常规册", "按vp价结算"): 0.01,
+    ("生鲜专卡", "按常规价结算"): 0.03,
+    ("生鲜专卡", "按优惠价结算"): 0.025,
+    ("生鲜专卡", "按核心价结算"): 0.02,
+    ("生鲜专卡", "按总监价结算"): 0.015,
+    ("生鲜专卡", "按vp价结算"): 0.01,
+    ("定制册", "*"): 0.03,
+    ("实物集采", "*"): 0.01,
+    ("不核算", "*"): 0.0,
+    ("待确认", "*"): 0.0,
+}
+
+# 提成核算配置
+COMMISSION_CONFIG = {
+    "amount_column": "汇总价",  # 计提金额列
+    "salesperson_column": "销售员",  # 销售员列（定制册以外的行按此列归属）
+}
+
+# 分类服务配置（python -m src.service 常驻运行，分类器的缓存和 LLM 连接池在请求之间复用）
+SERVICE_CONFIG = {
+    "host": "127.0.0.1",  # 监听地址
+    "port": 8780,  # 监听端口
+    "max_request_names": 100000,  # 每次 /classify 请求最多的名称数
+    "client_batch_size": 20000,  # 客户端每次请求发送的不同组合数
+    "client_timeout": 600,  # 客户端等待每次请求的超时（秒）
+}
+
+# LLM 请求的传输方式（live 直接请求 API；record 请求 API 并录制响应；replay 从录制文件回放，不访问网络）
+LLM_TRANSPORT_CONFIG = {
+    "mode": os.getenv("LLM_TRANSPORT", "live"),
+    "recording_path": Path(os.getenv("LLM_RECORDING_PATH", CACHE_DIR / "llm_recordings.jsonl")),  # 录制文件（JSON Lines）
+    "replay_latency": float(os.getenv("LLM_REPLAY_LATENCY", "0")),  # 回放时每次请求注入的延迟（秒）
 }
@@ -1,53 +1,622 @@
 """
 Excel 数据加载和处理模块
 """
+import hashlib
+import importlib.util
+import io
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import List, Optional
-from .config import INPUT_DIR, OUTPUT_DIR
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+from .config import INPUT_DIR, OUTPUT_DIR, PARSE_CACHE_DIR, PARSE_CACHE_MAX_ENTRIES
+from .metrics import RunMetrics
+
+# 解析缓存格式版本（解析逻辑变化时递增，使旧缓存失效）
+PARSE_CACHE_VERSION = 1
+
+# Parquet 缓存依赖 pyarrow（可选）
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# 需要按结算口径规整价格类型的产品类型
+SETTLEMENT_PRODUCT_TYPES = ("常规册", "生鲜专卡")
+
+
+def normalize_price_type(val):
+    """
+    将单个价格类型规整为结算口径
+    
+    优先级：vp > 总监 > 核心 > 优惠 > 常规；缺失值原样返回，无法识别时返回原文本。
+    """
+    if pd.isna(val):
+        return val
+    s = str(val)
+    lower = s.lower()
+    if "vp" in lower:
+        return "按vp价结算"
+    if "总监" in s:
+        return "按总监价结算"
+    if "核心" in s:
+        return "按核心价结算"
+    if "优惠" in s:
+        return "按优惠价结算"
+    if "常规" in s:
+        return "按常规价结算"
+    return s
+
+
+def normalize_price_types(values: pd.Series) -> pd.Series:
+    """
+    批量规整价格类型（每个不同的取值只规整一次，再按编码映射回各行；缺失值统一为 NaN）
+    
+    Args:
+        values: 价格类型列
+        
+    Returns:
+        规整后的价格类型列（索引与输入一致）
+    """
+    codes, uniques = pd.factorize(values)
+    # 末尾追加一个缺失值，缺失行的编码 -1 正好映射到它
+    lookup = np.empty(len(uniques) + 1, dtype=object)
+    lookup[:-1] = [normalize_price_type(u) for u in uniques]
+    lookup[-1] = np.nan
+    return pd.Series(lookup[codes], index=values.index, name=values.name, dtype=object)
+
+
+def normalize_price_type_categories(values: pd.Series, mask: np.ndarray) -> pd.Series:
+    """
+    规整 Categorical 价格类型列中 mask 选中的行（每个类别只规整一次，直接改写类别编码）
+    
+    Args:
+        values: Categorical 价格类型列
+        mask: 需要规整的行
+        
+    Returns:
+        规整后的 Categorical 列（索引与输入一致，去掉不再使用的类别）
+    """
+    categories = values.cat.categories
+    normalized = [normalize_price_type(category) for category in categories]
+    all_categories = pd.Index(pd.unique(np.asarray(list(categories) + normalized, dtype=object)))
+    dtype = np.int8 if len(all_categories) < 127 else np.int32
+    remap = all_categories.get_indexer(normalized).astype(dtype)
+    
+    codes = values.cat.codes.to_numpy().astype(dtype)
+    # 缺失值的编码为 -1，保持不变
+    selected = mask & (codes >= 0)
+    codes[selected] = remap[codes[selected]]
+    
+    # 去掉不再使用的类别并重排编码（大列上比 remove_unused_categories 省内存）；末位哨兵对应编码 -1
+    used = np.zeros(len(all_categories) + 1, dtype=bool)
+    used[np.unique(codes)] = True
+    used = used[:-1]
+    table = np.full(len(all_categories) + 1, -1, dtype=dtype)
+    table[:-1][used] = np.arange(used.sum())
+    result = pd.Categorical.from_codes(table[codes], categories=all_categories[used])
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+# 分类及结算规则需要用到的列
+CLASSIFICATION_COLUMNS = ("礼包名称", "销售单类型", "价格类型")
+
+# 取值种类很少的列，加载后转换为 Categorical（每行只存整数编码）
+CATEGORICAL_COLUMNS = ("销售单类型", "价格类型")
+
+# 支持的结果输出格式
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet")
+
+# 网页下载时各输出格式的 MIME 类型
+OUTPUT_MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# 写入 xlsx 时每次转换的行数（控制转换为 Python 对象时的临时内存）
+XLSX_WRITE_CHUNK_ROWS = 10000
+
+# 这些推断类型的 object 列可以直接写入 Parquet，其余（混合类型）转换为字符串
+_PARQUET_SAFE_INFERRED_TYPES = {
+    "string", "empty", "integer", "floating", "mixed-integer-float", "boolean",
+    "datetime", "datetime64", "date", "decimal",
+}
+
+
+def resolve_output_format(filename: str, output_format: Optional[str] = None) -> Tuple[str, str]:
+    """
+    确定输出格式和文件名
+
+    Args:
+        filename: 输出文件名
+        output_format: 输出格式（可选，不指定时按文件扩展名判断）
+
+    Returns:
+        (输出格式, 文件名)：指定了格式时，文件扩展名替换为与格式一致
+
+    Raises:
+        ValueError: 如果格式不受支持
+    """
+    path = Path(filename)
+    if output_format is None:
+        output_format = path.suffix.lstrip(".").lower()
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"无法从文件名判断输出格式: {filename}（支持 {', '.join(OUTPUT_FORMATS)}）")
+        return output_format, filename
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}（支持 {', '.join(OUTPUT_FORMATS)}）")
+    return output_format, str(path.with_suffix(f".{output_format}"))
+
+
+def _parquet_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Parquet 要求每列类型一致：混合类型的 object 列转换为字符串（缺失值保留）"""
+    converted = {}
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in _PARQUET_SAFE_INFERRED_TYPES:
+            converted[column] = values.where(values.isna(), values.astype(str))
+    return df.assign(**converted) if converted else df
+
+
+class ResultWriter:
+    """
+    分块写入结果文件
+    
+    xlsx 使用 openpyxl 只写模式逐行写入（行数据直接写入临时文件，不在内存中保留整个工作簿）；
+    csv 逐块追加。Parquet 需要整个文件的列类型一致，而流式读取得到的数据块都是未推断类型的
+    object 列，因此各块先保留在内存中，关闭时合并、推断列类型后一次写入。
+    
+    先写入 <文件名>.partial，close() 时改名为目标文件；中途出错时调用 abort() 删除临时文件，
+    不会留下写了一半的结果。也可以写入内存缓冲区（此时不做改名）。
+    """
+    
+    def __init__(self, target, output_format: str = "xlsx"):
+        """
+        Args:
+            target: 输出文件路径或可写的二进制缓冲区（如 io.BytesIO）
+            output_format: 输出格式（xlsx / csv / parquet）
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}（支持 {', '.join(OUTPUT_FORMATS)}）")
+        if output_format == "parquet" and not _HAS_PYARROW:
+            raise ValueError("输出 Parquet 格式需要安装 pyarrow")
+        self.output_format = output_format
+        self.rows = 0
+        if isinstance(target, (str, Path)):
+            self.path = Path(target)
+            self._tmp_path = self.path.with_name(f"{self.path.name}.partial")
+            self._file = open(self._tmp_path, "wb")
+        else:
+            self.path = None
+            self._tmp_path = None
+            self._file = target
+        self._columns = None
+        self._workbook = None
+        self._worksheet = None
+        self._parquet_chunks: List[pd.DataFrame] = []
+    
+    def __enter__(self) -> "ResultWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+    
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        写入一块数据（各块的列必须与第一块一致）
+        
+        Args:
+            df: 数据块
+        """
+        columns = [str(column) for column in df.columns]
+        if self._columns is None:
+            self._columns = columns
+            self._write_header()
+        elif columns != self._columns:
+            raise ValueError("数据块的列与第一块不一致")
+        
+        if self.output_format == "xlsx":
+            for start in range(0, len(df), XLSX_WRITE_CHUNK_ROWS):
+                self._append_xlsx_rows(df.iloc[start:start + XLSX_WRITE_CHUNK_ROWS])
+        elif self.output_format == "csv":
+            buffer = io.StringIO()
+            df.to_csv(buffer, index=False, header=False)
+            self._file.write(buffer.getvalue().encode("utf-8"))
+        else:
+            self._parquet_chunks.append(df)
+        self.rows += len(df)
+    
+    def _write_header(self) -> None:
+        if self.output_format == "xlsx":
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+            
+            self._workbook = Workbook(write_only=True)
+            self._worksheet = self._workbook.create_sheet("Sheet1")
+            bold = Font(bold=True)
+            header = []
+            for column in self._columns:
+                cell = WriteOnlyCell(self._worksheet, value=column)
+                cell.font = bold
+                header.append(cell)
+            self._worksheet.append(header)
+        elif self.output_format == "csv":
+            # 带 BOM，Excel 直接打开时中文不乱码
+            buffer = io.StringIO()
+            pd.DataFrame(columns=self._columns).to_csv(buffer, index=False)
+            self._file.write(buffer.getvalue().encode("utf-8-sig"))
+    
+    def _append_xlsx_rows(self, df: pd.DataFrame) -> None:
+        """按列转换为 Python 对象（缺失值为空单元格）后逐行写入"""
+        columns = []
+        for _, values in df.items():
+            array = values.to_numpy(dtype=object)
+            missing = pd.isna(values).to_numpy()
+            if missing.any():
+                # to_numpy 可能返回只读视图，复制后再改写
+                array = array.copy()
+                array[missing] = None
+            columns.append(array)
+        append = self._worksheet.append
+        for row in zip(*columns):
+            append(row)
+    
+    def close(self) -> None:
+        """完成写入（失败时删除临时文件）"""
+        try:
+            if self._columns is None:
+                raise ValueError("没有写入任何数据")
+            if self.output_format == "xlsx":
+                self._workbook.save(self._file)
+            elif self.output_format == "parquet":
+                df = pd.concat(self._parquet_chunks) if len(self._parquet_chunks) > 1 else self._parquet_chunks[0]
+                self._parquet_chunks = []
+                _parquet_frame(compact_columns(df.infer_objects())).to_parquet(self._file, index=False)
+        except Exception:
+            self.abort()
+            raise
+        if self._tmp_path is not None:
+            self._file.close()
+            self._tmp_path.replace(self.path)
+    
+    def abort(self) -> None:
+        """放弃写入并删除临时文件"""
+        self._parquet_chunks = []
+        if self._worksheet is not None and not self._worksheet.closed:
+            # 结束工作表的逐行写入（openpyxl 的行缓存临时文件在进程退出时清理）
+            try:
+                self._worksheet.close()
+            except Exception:
+                pass
+        if self._tmp_path is not None:
+            self._file.close()
+            self._tmp_path.unlink(missing_ok=True)
+
+
+def compact_columns(df: pd.DataFrame, columns: Sequence[str] = CATEGORICAL_COLUMNS) -> pd.DataFrame:
+    """
+    将取值种类很少的列原地转换为 Categorical
+    
+    Args:
+        df: DataFrame
+        columns: 需要转换的列（不存在的列跳过）
+    
+    Returns:
+        转换后的 DataFrame（与输入为同一对象）
+    """
+    for column in columns:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    return df
 
 
 class DataLoader:
     """Excel 数据加载器"""
     
-    def __init__(self):
+    def __init__(self, metrics: Optional[RunMetrics] = None):
+        """
+        Args:
+            metrics: 运行指标收集器（可选，记录加载/保存耗时和解析缓存命中情况）
+        """
         self.input_dir = INPUT_DIR
         self.output_dir = OUTPUT_DIR
+        self.parse_cache_dir = PARSE_CACHE_DIR
+        self.metrics = metrics if metrics is not None else RunMetrics()
         # 确保输出目录存在
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def load_sales_data(self, filename: str) -> pd.DataFrame:
+    def load_sales_data(self, filename: str, use_cache: bool = True) -> pd.DataFrame:
         """
         加载销售数据 Excel 文件
         
+        解析结果按文件内容哈希缓存在 data/cache/parsed 下，同一文件再次加载时直接读取缓存；
+        文件内容变化后哈希随之变化，旧缓存自然失效。
+        
         Args:
             filename: Excel 文件名（如 sales_jan.xlsx）
+            use_cache: 是否使用解析缓存
             
         Returns:
             包含销售数据的 DataFrame
         """
-        file_path = self.input_dir / filename
+        return self._load_excel(self.input_dir / filename, use_cache)
+    
+    def input_digest(self, filename: str) -> str:
+        """
+        输入文件的内容哈希（如用作检查点指纹）
+        
+        Args:
+            filename: Excel 文件名（位于 data/input/）
+        """
+        return self._file_digest(self.input_dir / filename)
+    
+    def load_sales_buffer(self, data: bytes, use_cache: bool = True) -> pd.DataFrame:
+        """
+        从内存中的 Excel 内容加载销售数据（如网页上传的文件），不经过磁盘
+        
+        与 load_sales_data 共用按内容哈希的解析缓存。
+        
+        Args:
+            data: Excel 文件内容
+            use_cache: 是否使用解析缓存
+            
+        Returns:
+            包含销售数据的 DataFrame
+        """
+        with self.metrics.stage("load"):
+            if not use_cache:
+                return compact_columns(pd.read_excel(io.BytesIO(data)))
+            digest = self._new_digest()
+            digest.update(data)
+            return self._load_with_cache(digest.hexdigest(), lambda: pd.read_excel(io.BytesIO(data)))
+    
+    def load_previous_results(self, filename: str, use_cache: bool = True) -> pd.DataFrame:
+        """
+        加载之前输出的分类结果文件（位于 data/output/，支持 xlsx / csv / parquet）
+        
+        Args:
+            filename: 结果文件名（如 result_jan.xlsx）
+            use_cache: 是否使用解析缓存（仅 xlsx）
+            
+        Returns:
+            包含产品类型列的 DataFrame
+            
+        Raises:
+            ValueError: 如果结果文件中缺少产品类型列
+        """
+        file_path = self.output_dir / filename
+        suffix = file_path.suffix.lower()
+        if suffix == ".csv":
+            df = self._load_plain(file_path, lambda: pd.read_csv(file_path, encoding="utf-8-sig"))
+        elif suffix == ".parquet":
+            df = self._load_plain(file_path, lambda: pd.read_parquet(file_path))
+        else:
+            df = self._load_excel(file_path, use_cache)
+        if "产品类型" not in df.columns:
+            raise ValueError(f"结果文件中缺少'产品类型'列: {filename}")
+        return df
+    
+    def _load_excel(self, file_path: Path, use_cache: bool = True) -> pd.DataFrame:
+        """读取 Excel 文件，按需使用解析缓存"""
+        if not file_path.exists():
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        
+        with self.metrics.stage("load"):
+            if not use_cache:
+                return compact_columns(pd.read_excel(file_path))
+            return self._load_with_cache(self._file_digest(file_path), lambda: pd.read_excel(file_path))
+    
+    def _load_plain(self, file_path: Path, parse: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """读取不需要解析缓存的文件（csv / parquet 本身解析很快）"""
         if not file_path.exists():
             raise FileNotFoundError(f"文件不存在: {file_path}")
         
-        df = pd.read_excel(file_path)
+        with self.metrics.stage("load"):
+            return compact_columns(parse())
+    
+    def _load_with_cache(self, digest: str, parse: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """命中解析缓存时直接返回，否则调用 parse 解析并写入缓存（缓存中保存的是转换过 Categorical 列的结果）"""
+        df = self._read_parse_cache(digest)
+        if df is not None:
+            self.metrics.incr("parse_cache_hits")
+            print(f"  使用解析缓存: {digest}")
+            return compact_columns(df)
+        
+        self.metrics.incr("parse_cache_misses")
+        df = compact_columns(parse())
+        self._write_parse_cache(digest, df)
         return df
     
-    def save_results(self, df: pd.DataFrame, filename: str) -> Path:
+    @staticmethod
+    def _new_digest():
+        """内容哈希对象（预先写入缓存格式版本和 pandas 版本）"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{PARSE_CACHE_VERSION}|{pd.__version__}|".encode("utf-8"))
+        return digest
+    
+    @classmethod
+    def _file_digest(cls, file_path: Path) -> str:
+        """计算文件内容哈希"""
+        digest = cls._new_digest()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _read_parse_cache(self, digest: str) -> Optional[pd.DataFrame]:
+        """读取解析缓存，不存在或读取失败时返回 None"""
+        for suffix, reader in ((".parquet", pd.read_parquet), (".pkl", pd.read_pickle)):
+            cache_path = self.parse_cache_dir / f"{digest}{suffix}"
+            if cache_path.exists():
+                try:
+                    df = reader(cache_path)
+                except Exception:
+                    cache_path.unlink(missing_ok=True)
+                    continue
+                # 更新访问时间，供淘汰策略使用
+                cache_path.touch()
+                return df
+        return None
+    
+    def _write_parse_cache(self, digest: str, df: pd.DataFrame) -> None:
+        """
+        写入解析缓存：优先使用 Parquet（需要 pyarrow），列类型无法用 Parquet 表示时退回 pickle
         """
-        保存结果到 Excel
+        self.parse_cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.parse_cache_dir / f"{digest}.tmp"
+        cache_path = None
+        if _HAS_PYARROW:
+            try:
+                df.to_parquet(tmp_path, index=False)
+                cache_path = self.parse_cache_dir / f"{digest}.parquet"
+            except Exception:
+                cache_path = None
+        if cache_path is None:
+            df.to_pickle(tmp_path)
+            cache_path = self.parse_cache_dir / f"{digest}.pkl"
+        # 先写临时文件再改名，避免并发读到写了一半的缓存
+        tmp_path.replace(cache_path)
+        self._evict_parse_cache()
+    
+    def _evict_parse_cache(self) -> None:
+        """解析缓存文件数超过上限时，删除最久未使用的缓存"""
+        entries = sorted(
+            (p for p in self.parse_cache_dir.iterdir() if p.suffix in (".parquet", ".pkl")),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in entries[PARSE_CACHE_MAX_ENTRIES:]:
+            stale.unlink(missing_ok=True)
+    
+    def iter_sales_data(
+        self,
+        filename: str,
+        chunk_size: int = 50000,
+        key_columns: Sequence[str] = CLASSIFICATION_COLUMNS,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        以流式方式分块读取销售数据 Excel 文件（openpyxl 只读模式，内存占用与文件大小无关）
+        
+        只有分类需要的列（key_columns）会被规整为统一的缺失值表示；其余列不做类型推断，
+        按单元格原值透传到输出。
+        
+        Args:
+            filename: Excel 文件名（如 sales_jan.xlsx）
+            chunk_size: 每块的行数
+            key_columns: 需要规整的列
+            
+        Returns:
+            DataFrame 块的迭代器（行索引在各块之间连续）
+        """
+        file_path = self.input_dir / filename
+        if not file_path.exists():
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        
+        # 只统计读取和转换数据块的耗时，不含调用方处理数据块的时间
+        yield from self.metrics.timed_iter("load", self._iter_excel_chunks(file_path, chunk_size, key_columns))
+    
+    def _iter_excel_chunks(self, file_path: Path, chunk_size: int, key_columns: Sequence[str]) -> Iterator[pd.DataFrame]:
+        """逐块读取 Excel 文件（iter_sales_data 的实现）"""
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0]
+            # 部分导出工具写入的表格尺寸信息不准确，重置后按实际内容读取
+            worksheet.reset_dimensions()
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            # 与 pd.read_excel 一致：空表头命名为 "Unnamed: i"
+            columns = [
+                f"Unnamed: {i}" if value is None else str(value)
+                for i, value in enumerate(header)
+            ]
+            width = len(columns)
+            
+            buffer = []
+            start = 0
+            for row in rows:
+                # 跳过空行（与 pd.read_excel 一致）
+                if all(value is None for value in row):
+                    continue
+                if len(row) != width:
+                    row = (tuple(row) + (None,) * width)[:width]
+                buffer.append(row)
+                if len(buffer) >= chunk_size:
+                    yield self._rows_to_frame(buffer, columns, start, key_columns)
+                    start += len(buffer)
+                    buffer = []
+            if buffer:
+                yield self._rows_to_frame(buffer, columns, start, key_columns)
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def _rows_to_frame(rows: list, columns: List[str], start: int, key_columns: Sequence[str]) -> pd.DataFrame:
+        """将一块原始行数据转换为 DataFrame"""
+        df = pd.DataFrame(rows, columns=columns, dtype=object, index=pd.RangeIndex(start, start + len(rows)))
+        for column in key_columns:
+            if column in df.columns:
+                df[column] = df[column].fillna(np.nan)
+        return compact_columns(df)
+    
+    def save_results(self, df: pd.DataFrame, filename: str, output_format: Optional[str] = None) -> Path:
+        """
+        保存结果（xlsx 使用 openpyxl 只写模式逐行写入，比 df.to_excel 快且不在内存中构建整个工作簿）
         
         Args:
             df: 包含结果的 DataFrame
             filename: 输出文件名（如 result_jan.xlsx）
+            output_format: 输出格式 xlsx / csv / parquet（可选，默认按文件扩展名判断）
             
         Returns:
             保存的文件路径
         """
+        output_format, filename = resolve_output_format(filename, output_format)
         output_path = self.output_dir / filename
-        df.to_excel(output_path, index=False)
+        with self.metrics.stage("save"), ResultWriter(output_path, output_format) as writer:
+            writer.write(df)
         return output_path
     
+    def open_result_writer(self, filename: str, output_format: Optional[str] = None) -> ResultWriter:
+        """
+        打开分块结果写入器（流式处理时逐块写入，写入耗时由调用方计入 save 阶段）
+        
+        Args:
+            filename: 输出文件名（如 result_jan.xlsx）
+            output_format: 输出格式 xlsx / csv / parquet（可选，默认按文件扩展名判断）
+            
+        Returns:
+            ResultWriter（写入 output_dir 下的文件）
+        """
+        output_format, filename = resolve_output_format(filename, output_format)
+        return ResultWriter(self.output_dir / filename, output_format)
+    
+    def export_results(self, df: pd.DataFrame, filename: str, output_format: Optional[str] = None) -> Tuple[Path, bytes]:
+        """
+        将结果序列化并保存，同时返回文件内容（供网页下载，避免重复序列化）
+        
+        Args:
+            df: 包含结果的 DataFrame
+            filename: 输出文件名（如 result_jan.xlsx）
+            output_format: 输出格式 xlsx / csv / parquet（可选，默认按文件扩展名判断）
+            
+        Returns:
+            (保存的文件路径, 文件内容)
+        """
+        output_format, filename = resolve_output_format(filename, output_format)
+        output_path = self.output_dir / filename
+        with self.metrics.stage("save"):
+            buffer = io.BytesIO()
+            with ResultWriter(buffer, output_format) as writer:
+                writer.write(df)
+            data = buffer.getvalue()
+            output_path.write_bytes(data)
+        return output_path, data
+    
     def detect_gift_name_column(self, df: pd.DataFrame) -> str:
         """
         自动检测"礼包名称"列
@@ -75,24 +644,52 @@ class DataLoader:
     def add_product_type_column(
         self, 
         df: pd.DataFrame, 
-        product_types: List[str]
+        product_types: Sequence
     ) -> pd.DataFrame:
         """
         添加产品类型列到 DataFrame
         
+        返回的 DataFrame 是浅拷贝：与原 DataFrame 共用各列数据，不复制整个表，原 DataFrame 不受影响。
+        
         Args:
             df: 原始 DataFrame
-            product_types: 产品类型列表（与 DataFrame 行数相同）
+            product_types: 产品类型序列（与 DataFrame 行数相同，通常为 classify_batch 返回的 Categorical）
             
         Returns:
             添加了产品类型列的 DataFrame
         """
-        df = df.copy()
-        
         if len(product_types) != len(df):
             raise ValueError(
                 f"产品类型列表长度 ({len(product_types)}) 与 DataFrame 行数 ({len(df)}) 不匹配"
             )
         
+        df = df.copy(deep=False)
         df["产品类型"] = product_types
         return df
+    
+    def normalize_price_type_column(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        常规册/生鲜专卡按结算口径规整价格类型列
+        
+        Args:
+            df: 已添加产品类型列的 DataFrame
+            
+        Returns:
+            规整后的 DataFrame
+            
+        Raises:
+            ValueError: 如果缺少价格类型列
+        """
+        if "价格类型" not in df.columns:
+            raise ValueError("输入文件中缺少'价格类型'列，该列是结算规则处理的必要条件。")
+        
+        mask = df["产品类型"].isin(SETTLEMENT_PRODUCT_TYPES).to_numpy()
+        price_types = df["价格类型"]
+        # 只替换价格类型这一列（不原地修改），与 add_product_type_column 返回的浅拷贝共用数据的原表不受影响
+        if isinstance(price_types.dtype, pd.CategoricalDtype):
+            df["价格类型"] = normalize_price_type_categories(price_types, mask)
+        else:
+            price_types = price_types.copy()
+            price_types[mask] = normalize_price_types(price_types[mask]).to_numpy()
+            df["价格类型"] = price_types
+        return df
@@ -0,0 +1,111 @@
+"""
+关键词匹配模块 - 基于 Aho-Corasick 自动机的多模式匹配
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .config import CLASSIFICATION_KEYWORDS, SALESPERSON_NAMES
+
+
+class KeywordMatcher:
+    """
+    多模式关键词匹配器
+
+    由多组关键词构建一个 Aho-Corasick 自动机，对每个名称只扫描一遍即可找出全部命中的关键词，
+    并按分组顺序（优先级）返回命中的最高优先级分组标签。
+    """
+
+    def __init__(self, groups: Sequence[Tuple[str, Iterable[str]]]):
+        """
+        Args:
+            groups: 按优先级从高到低排列的 (标签, 关键词列表)
+        """
+        self.labels: List[str] = [label for label, _ in groups]
+        self._no_match = len(self.labels)
+
+        # 构建 trie：goto[state] 为字符到子状态的映射，best[state] 为该状态命中的最高优先级
+        goto: List[Dict[str, int]] = [{}]
+        best: List[int] = [self._no_match]
+        for priority, (_, patterns) in enumerate(groups):
+            for pattern in patterns:
+                if not pattern:
+                    continue
+                state = 0
+                for ch in pattern:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[state][ch] = nxt
+                        goto.append({})
+                        best.append(self._no_match)
+                    state = nxt
+                best[state] = min(best[state], priority)
+
+        # BFS 计算失配指针，并展开为完整的状态转移表（匹配时无需回溯）
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            f = fail[state]
+            # 后缀命中的关键词同样算作命中
+            best[state] = min(best[state], best[f])
+            table = dict(delta[f])
+            for ch, child in goto[state].items():
+                fail[child] = delta[f].get(ch, 0)
+                table[ch] = child
+                queue.append(child)
+            delta[state] = table
+
+        self._delta = delta
+        self._best = best
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        返回文本中命中的最高优先级分组标签
+
+        Args:
+            text: 待匹配文本
+
+        Returns:
+            分组标签，未命中任何关键词时返回 None
+        """
+        delta = self._delta
+        best = self._best
+        found = self._no_match
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            priority = best[state]
+            if priority < found:
+                found = priority
+                if found == 0:
+                    break
+        return self.labels[found] if found < self._no_match else None
+
+
+@lru_cache(maxsize=1)
+def get_rule_matcher() -> KeywordMatcher:
+    """
+    获取由配置构建的规则匹配器（进程内只构建一次）
+
+    优先级与规则分类一致：销售员名字（定制册） > 常规册 > 生鲜专卡 > 不核算
+    """
+    return KeywordMatcher([
+        ("定制册", SALESPERSON_NAMES),
+        ("常规册", CLASSIFICATION_KEYWORDS["常规册"]),
+        ("生鲜专卡", CLASSIFICATION_KEYWORDS["生鲜专卡"]),
+        ("不核算", CLASSIFICATION_KEYWORDS["不核算"]),
+    ])
+
+
+@lru_cache(maxsize=1)
+def get_salesperson_matcher() -> KeywordMatcher:
+    """
+    获取销售员名字匹配器（返回礼包名称中出现的销售员名字，用于定制册的提成归属）
+
+    名字较长的优先：如"西南李帆+..."匹配"西南李帆"而不是"李帆"
+    """
+    names = sorted(dict.fromkeys(SALESPERSON_NAMES), key=len, reverse=True)
+    return KeywordMatcher([(name, [name]) for name in names])
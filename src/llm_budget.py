@@ -0,0 +1,155 @@
+"""
+LLM 预算模块 - 限制一次运行中 LLM 阶段的请求次数、token 用量和耗时
+"""
+import threading
+import time
+from typing import Optional, Set
+from .config import CLASSIFICATION_CONFIG
+from .metrics import RunMetrics
+
+# 因预算用尽而未交给 LLM 判断的名称的结果标记（与判断失败的 None 区分）
+LLM_SKIPPED = object()
+
+
+class LLMBudget:
+    """
+    LLM 阶段的预算
+
+    请求次数和 token 用量从 RunMetrics 中 LLMClient 记录的 llm_requests / total_tokens 计数读取
+    （以 start() 时的值为基准），耗时从 start() 开始计算。每批请求发出之前检查预算：
+    请求次数按已发出的批次数和实际请求数中较大者计算；设置了 token 上限时，按已完成批次的平均 token 数
+    预估进行中的批次，预计会超出时先等待进行中的批次完成。重试和批次拆分可能使用量略超预算；
+    到达截止时间时不再等待未完成的请求。
+    """
+
+    def __init__(
+        self,
+        max_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        deadline_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            max_calls: 最多 LLM 请求次数（None 表示不限）
+            max_tokens: 最多消耗的 token 数（None 表示不限）
+            deadline_seconds: LLM 阶段最长耗时（秒，None 表示不限）
+        """
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.deadline_seconds = deadline_seconds
+        self.skipped: Set[str] = set()
+        self.reason: Optional[str] = None
+        self._metrics: Optional[RunMetrics] = None
+        self._base_calls = 0
+        self._base_tokens = 0
+        self._deadline: Optional[float] = None
+        self._dispatched = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, **overrides) -> "LLMBudget":
+        """
+        按 CLASSIFICATION_CONFIG 创建预算
+
+        Args:
+            overrides: 覆盖配置的参数（max_calls / max_tokens / deadline_seconds，值为 None 时沿用配置）
+        """
+        values = {
+            "max_calls": CLASSIFICATION_CONFIG.get("llm_budget_calls"),
+            "max_tokens": CLASSIFICATION_CONFIG.get("llm_budget_tokens"),
+            "deadline_seconds": CLASSIFICATION_CONFIG.get("llm_deadline_seconds"),
+        }
+        values.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**values)
+
+    @property
+    def limited(self) -> bool:
+        """是否设置了任何限制"""
+        return any(limit is not None for limit in (self.max_calls, self.max_tokens, self.deadline_seconds))
+
+    def start(self, metrics: RunMetrics) -> None:
+        """
+        绑定用量计数来源（只在第一次调用时生效，之后的调用不重置用量和计时）
+
+        Args:
+            metrics: LLMClient 记录请求次数和 token 用量的收集器
+        """
+        with self._lock:
+            if self._metrics is not None:
+                return
+            self._metrics = metrics
+            self._base_calls = metrics.counters.get("llm_requests", 0)
+            self._base_tokens = metrics.counters.get("total_tokens", 0)
+            if self.deadline_seconds is not None:
+                self._deadline = time.monotonic() + self.deadline_seconds
+
+    def calls_used(self) -> int:
+        """已使用的请求次数"""
+        return 0 if self._metrics is None else self._metrics.counters.get("llm_requests", 0) - self._base_calls
+
+    def tokens_used(self) -> int:
+        """已消耗的 token 数"""
+        return 0 if self._metrics is None else self._metrics.counters.get("total_tokens", 0) - self._base_tokens
+
+    def remaining_time(self) -> Optional[float]:
+        """距离截止时间的秒数（未设置截止时间时为 None）"""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def record_dispatch(self) -> None:
+        """记录发出了一个批次"""
+        self._dispatched += 1
+
+    def record_completion(self) -> None:
+        """记录一个批次已完成（用于估算每批的 token 用量）"""
+        self._completed += 1
+
+    def _projected_tokens(self, batches: int) -> Optional[float]:
+        """已用 token 加上再完成 batches 个批次的预计用量；还没有批次完成时无法估计，返回 None"""
+        if not self._completed:
+            return None
+        return self.tokens_used() + batches * self.tokens_used() / self._completed
+
+    def check(self, in_flight: int = 0) -> Optional[str]:
+        """
+        检查预算是否已用尽
+
+        Args:
+            in_flight: 已发出、尚未完成的批次数
+
+        Returns:
+            预算用尽的原因，还有预算时返回 None
+        """
+        reason = None
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            reason = f"达到截止时间 {self.deadline_seconds}s"
+        elif self.max_calls is not None and max(self.calls_used(), self._dispatched) >= self.max_calls:
+            reason = f"达到请求次数上限 {self.max_calls}"
+        elif self.max_tokens is not None:
+            projected = self._projected_tokens(1)
+            if self.tokens_used() >= self.max_tokens or (
+                in_flight == 0 and projected is not None and projected > self.max_tokens
+            ):
+                reason = f"达到 token 上限 {self.max_tokens}"
+        if reason is not None and self.reason is None:
+            self.reason = reason
+        return reason
+
+    def should_wait(self, in_flight: int) -> bool:
+        """
+        设置了 token 上限时，再发出一个批次预计会超出预算（或还无法估计）时，先等待进行中的批次完成
+
+        Args:
+            in_flight: 已发出、尚未完成的批次数
+        """
+        if self.max_tokens is None or in_flight == 0:
+            return False
+        projected = self._projected_tokens(in_flight + 1)
+        return projected is None or projected > self.max_tokens
+
+    def expire(self) -> None:
+        """截止时间已到、仍未完成的请求不再等待"""
+        if self.reason is None:
+            self.reason = f"达到截止时间 {self.deadline_seconds}s"
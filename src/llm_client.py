@@ -1,32 +1,136 @@
 """
 LLM 客户端模块 - 轻量级 LLM API 调用工具
 """
+import copy
 import json
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import requests
-import re
-from typing import Dict, Any, Optional
-from .config import API_CONFIG, DEFAULT_API_PROVIDER, DEFAULT_API_KEY, CLASSIFICATION_CONFIG
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional, Tuple, Union
+from .config import API_CONFIG, DEFAULT_API_PROVIDER, CLASSIFICATION_CONFIG
+from .llm_transport import create_transport
+from .rate_limiter import RateLimiter
+from .metrics import RunMetrics
+
+# 需要退避重试的 HTTP 状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 
 
 class LLMClient:
     """轻量级 LLM 客户端"""
     
-    def __init__(self):
-        self.api_provider = DEFAULT_API_PROVIDER
-        self.api_config = API_CONFIG[self.api_provider]
-        self.api_key = DEFAULT_API_KEY
-        self.available = bool(self.api_key)
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        metrics: Optional[RunMetrics] = None,
+        transport=None,
+    ):
+        """
+        Args:
+            provider: API 服务商（openai / deepseek，默认按配置自动选择）
+            api_key: API Key（可选，默认使用该服务商配置的 Key）
+            base_url: API 地址（可选，用于指向本地 mock 服务等）
+            metrics: 运行指标收集器（可选，记录请求延迟、重试次数和 token 用量）
+            transport: 请求传输（可选，默认按 LLM_TRANSPORT_CONFIG 创建：直接请求、录制或回放）
+        """
+        self.api_provider = provider or DEFAULT_API_PROVIDER
+        self.api_config = dict(API_CONFIG[self.api_provider])
+        if base_url:
+            self.api_config["base_url"] = base_url
+        self.api_key = api_key if api_key is not None else self.api_config["api_key"]
+        self.rate_limiter = RateLimiter(**self.api_config.get("rate_limit", {}))
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        
+        # 复用 keep-alive 连接；连接池大小与 LLM 并发数一致
+        pool_size = max(1, CLASSIFICATION_CONFIG.get("llm_max_workers", 1))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.transport = transport if transport is not None else create_transport(self.session)
+        # 回放不访问 API，不需要 API Key
+        self.available = bool(self.api_key) or not self.transport.remote
+    
+    def with_metrics(self, metrics: RunMetrics) -> "LLMClient":
+        """
+        返回记录到另一个指标收集器的客户端（共用连接池、传输和限流器）
+        
+        Args:
+            metrics: 运行指标收集器
+            
+        Returns:
+            新的 LLMClient（关闭任一客户端都会关闭共用的连接池）
+        """
+        client = copy.copy(self)
+        client.metrics = metrics
+        return client
+    
+    def close(self):
+        """关闭连接池"""
+        self.transport.close()
+        self.session.close()
     
+    @staticmethod
+    def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        计算第 attempt 次重试前的等待时间
+        
+        优先遵循服务端返回的 Retry-After（秒数或 HTTP 日期），否则使用带随机抖动的指数退避；
+        等待时间不超过 llm_backoff_max。
+        
+        Args:
+            attempt: 已失败的次数（从 0 开始）
+            retry_after: 响应头 Retry-After 的值（可选）
+            
+        Returns:
+            等待秒数
+        """
+        backoff_max = CLASSIFICATION_CONFIG.get("llm_backoff_max", 30)
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), backoff_max)
+        
+        base = CLASSIFICATION_CONFIG.get("llm_backoff_base", 0.5)
+        return random.uniform(0, min(backoff_max, base * (2 ** attempt)))
     
-    def call_api(self, prompt: str, system_message: str = None, temperature: float = None, max_tokens: int = None) -> str:
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        粗略估算文本 token 数（中文约 1 字 1 token），用于限流
+        """
+        return len(text or "")
+    
+    def call_api(
+        self,
+        prompt: str,
+        system_message: str = None,
+        temperature: float = None,
+        max_tokens: int = None,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> str:
         """
         调用 LLM API
         
+        连接错误、超时、429 和 5xx 响应按 llm_max_retries 退避重试。
+        
         Args:
             prompt: 用户 Prompt
             system_message: 系统消息（可选）
             temperature: 温度参数（可选，默认使用配置值）
             max_tokens: 最大 token 数（可选，默认使用配置值）
+            timeout: (连接超时, 读取超时) 秒数（可选，默认使用配置值）
             
         Returns:
             LLM 的响应文本
@@ -51,28 +155,103 @@ class LLMClient:
             "max_tokens": max_tokens if max_tokens is not None else CLASSIFICATION_CONFIG["llm_max_tokens"]
         }
         
-        try:
-            response = requests.post(url, headers=headers, json=data, timeout=60)
-            response.raise_for_status()
-            result = response.json()
+        if timeout is None:
+            timeout = (
+                CLASSIFICATION_CONFIG.get("llm_connect_timeout", 10),
+                CLASSIFICATION_CONFIG.get("llm_read_timeout", 60),
+            )
+        estimated_tokens = self.estimate_tokens(system_message) + self.estimate_tokens(prompt) + data["max_tokens"]
+        max_retries = CLASSIFICATION_CONFIG.get("llm_max_retries", 0)
+        
+        for attempt in range(max_retries + 1):
+            # 按预计 token 数（输入 + 最大输出）限流；回放不访问 API，不限流
+            if self.transport.remote:
+                waited = self.rate_limiter.acquire(estimated_tokens)
+                if waited:
+                    self.metrics.incr("llm_rate_limit_wait_seconds", waited)
+            if attempt:
+                self.metrics.incr("llm_retries")
+            self.metrics.incr("llm_requests")
+            start = time.perf_counter()
+            try:
+                response = self.transport.post(url, headers=headers, json=data, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.metrics.observe("llm_latency_seconds", time.perf_counter() - start)
+                if attempt < max_retries:
+                    time.sleep(self._retry_delay(attempt))
+                    continue
+                self.metrics.incr("llm_errors")
+                raise Exception(f"API 调用失败: {e}")
+            self.metrics.observe("llm_latency_seconds", time.perf_counter() - start)
             
-            # 提取回复内容
-            content = result["choices"][0]["message"]["content"]
+            # 限流 (429) 和服务端临时错误 (5xx) 退避后重试
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                time.sleep(self._retry_delay(attempt, response.headers.get("Retry-After")))
+                continue
+            
+            try:
+                response.raise_for_status()
+                result = response.json()
+                
+                # 提取回复内容
+                content = result["choices"][0]["message"]["content"]
+            except requests.exceptions.RequestException as e:
+                self.metrics.incr("llm_errors")
+                raise Exception(f"API 调用失败: {e}")
+            except (KeyError, IndexError, ValueError) as e:
+                self.metrics.incr("llm_errors")
+                raise Exception(f"API 响应格式错误: {e}")
+            self._record_usage(result.get("usage"))
             return content
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"API 调用失败: {e}")
-        except (KeyError, IndexError) as e:
-            raise Exception(f"API 响应格式错误: {e}")
     
-    def parse_json_response(self, response: str) -> Dict[str, Any]:
+    def _record_usage(self, usage: Optional[Dict[str, Any]]) -> None:
+        """记录响应中 usage 字段的 token 用量"""
+        if not isinstance(usage, dict):
+            return
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            value = usage.get(key)
+            if isinstance(value, (int, float)):
+                self.metrics.incr(key, value)
+    
+    @staticmethod
+    def _recover_json_objects(text: str) -> List[Dict[str, Any]]:
+        """
+        从可能被截断或夹杂说明文字的文本中提取所有完整的 JSON 对象
+        
+        Args:
+            text: 待提取文本
+            
+        Returns:
+            按出现顺序排列的 JSON 字典列表
+        """
+        decoder = json.JSONDecoder()
+        objects = []
+        pos = 0
+        while True:
+            start = text.find("{", pos)
+            if start < 0:
+                break
+            try:
+                obj, end = decoder.raw_decode(text, start)
+            except json.JSONDecodeError:
+                pos = start + 1
+                continue
+            if isinstance(obj, dict):
+                objects.append(obj)
+            pos = end
+        return objects
+    
+    def parse_json_response(self, response: str) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
         """
         解析 LLM 响应为 JSON 格式
         
+        支持单个 JSON 对象和 JSON 数组。数组响应被截断或格式不完整时，返回其中能完整解析的元素。
+        
         Args:
             response: LLM 的响应文本
             
         Returns:
-            解析后的 JSON 字典
+            解析后的 JSON 字典（或字典列表）；无法解析时返回空字典 / 空列表
         """
         # 尝试提取 JSON（可能包含在代码块中）
         response = response.strip()
@@ -80,23 +259,27 @@ class LLMClient:
         # 移除可能的 markdown 代码块标记
         if response.startswith("```"):
             lines = response.split("\n")
-            # 移除第一行和最后一行（代码块标记）
-            if len(lines) > 2:
-                response = "\n".join(lines[1:-1])
+            # 移除第一行和最后一行（代码块标记）；响应被截断时可能没有结束标记
+            if lines[-1].strip().startswith("```"):
+                lines = lines[:-1]
+            response = "\n".join(lines[1:])
         
         # 尝试解析 JSON
         try:
             result = json.loads(response)
             return result
         except json.JSONDecodeError:
-            # 如果解析失败，尝试提取 JSON 部分
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response, re.DOTALL)
-            if json_match:
-                try:
-                    result = json.loads(json_match.group())
-                    return result
-                except json.JSONDecodeError:
-                    pass
-            
-            # 如果还是失败，返回空字典
-            return {}
+            pass
+        
+        # 如果解析失败，按响应的外层结构提取能完整解析的 JSON 部分
+        array_start = response.find("[")
+        object_start = response.find("{")
+        if array_start >= 0 and (object_start < 0 or array_start < object_start):
+            return self._recover_json_objects(response[array_start:])
+        
+        objects = self._recover_json_objects(response)
+        if objects:
+            return objects[0]
+        
+        # 如果还是失败，返回空字典
+        return {}
@@ -0,0 +1,201 @@
+"""
+LLM 传输模块 - 直接请求 API、录制请求与响应、从录制文件回放（离线、结果确定）
+
+传输对象提供与 requests.Session.post 相同的 post(url, headers=..., json=..., timeout=...) 接口，
+LLMClient 的重试、状态码处理和 token 统计对三种方式完全一致。
+录制文件为 JSON Lines，每行一条 {"key", "model", "messages", "response"}，按模型和消息内容的哈希查找；
+不保存请求头（不含 API Key）。
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+import requests
+from .config import LLM_TRANSPORT_CONFIG
+
+# 支持的传输方式
+TRANSPORT_MODES = ("live", "record", "replay")
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """
+    计算请求的录制键（模型 + 消息内容的哈希）
+
+    Args:
+        payload: chat/completions 请求体
+
+    Returns:
+        十六进制哈希
+    """
+    identity = {"model": payload.get("model"), "messages": payload.get("messages")}
+    return hashlib.sha256(json.dumps(identity, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LiveTransport:
+    """直接请求 API"""
+
+    # 是否访问远程服务（决定是否按服务商配置限流）
+    remote = True
+
+    def __init__(self, session: requests.Session):
+        """
+        Args:
+            session: 复用 keep-alive 连接的会话
+        """
+        self.session = session
+
+    def post(self, url: str, headers: Dict[str, str], json: Dict[str, Any], timeout=None) -> requests.Response:
+        return self.session.post(url, headers=headers, json=json, timeout=timeout)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class RecordingTransport:
+    """请求 API 并把成功的响应追加到录制文件（已录制过的请求覆盖为最新响应）"""
+
+    remote = True
+
+    def __init__(self, inner: LiveTransport, path: Path):
+        """
+        Args:
+            inner: 实际发出请求的传输
+            path: 录制文件路径
+        """
+        self.inner = inner
+        self.path = Path(path)
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def post(self, url: str, headers: Dict[str, str], json: Dict[str, Any], timeout=None) -> requests.Response:
+        response = self.inner.post(url, headers=headers, json=json, timeout=timeout)
+        if response.status_code == 200:
+            try:
+                body = response.json()
+            except ValueError:
+                return response
+            self._append(json, body)
+        return response
+
+    def _append(self, payload: Dict[str, Any], body: Dict[str, Any]) -> None:
+        """追加一条录制记录"""
+        entry = {
+            "key": request_key(payload),
+            "model": payload.get("model"),
+            "messages": payload.get("messages"),
+            "response": body,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.recorded += 1
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class _ReplayResponse:
+    """回放的响应（requests.Response 中 LLMClient 用到的部分）"""
+
+    def __init__(self, status_code: int, body: Dict[str, Any]):
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self._body = body
+
+    def json(self) -> Dict[str, Any]:
+        return self._body
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} {self._body.get('error', {}).get('message')}")
+
+
+class ReplayTransport:
+    """
+    从录制文件回放响应，不访问网络
+
+    录制文件中没有的请求返回 404（LLMClient 记为调用失败，对应名称为待确认），并统计在 misses 中。
+    同一请求多次录制时使用最后一次的响应。
+    """
+
+    remote = False
+
+    def __init__(self, path: Path, latency: float = 0.0):
+        """
+        Args:
+            path: 录制文件路径
+            latency: 每次请求注入的延迟（秒，0 表示全速回放）
+
+        Raises:
+            FileNotFoundError: 如果录制文件不存在
+        """
+        self.path = Path(path)
+        self.latency = latency
+        self.responses: Dict[str, Dict[str, Any]] = {}
+        self.models = set()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.responses[entry["key"]] = entry["response"]
+                    self.models.add(entry.get("model"))
+
+    def post(self, url: str, headers: Dict[str, str], json: Dict[str, Any], timeout=None) -> _ReplayResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        body = self.responses.get(request_key(json))
+        with self._lock:
+            if body is None:
+                self.misses += 1
+                first_miss = self.misses == 1
+            else:
+                self.hits += 1
+        if body is None:
+            if first_miss and json.get("model") not in self.models:
+                print(
+                    f"  警告: 录制文件 {self.path.name} 中没有模型 {json.get('model')} 的请求"
+                    f"（录制时为 {', '.join(sorted(map(str, self.models)))}，请使用与录制时相同的服务商配置），记为调用失败"
+                )
+            elif first_miss:
+                print(f"  警告: 录制文件 {self.path.name} 中没有该请求，记为调用失败（输入、批次大小或 Prompt 与录制时不同）")
+            return _ReplayResponse(404, {"error": {"message": "请求不在录制文件中"}})
+        return _ReplayResponse(200, body)
+
+    def close(self) -> None:
+        pass
+
+
+def create_transport(
+    session: requests.Session,
+    mode: Optional[str] = None,
+    path: Optional[Path] = None,
+    latency: Optional[float] = None,
+):
+    """
+    按配置创建传输
+
+    Args:
+        session: 直接请求 API 时使用的会话
+        mode: live / record / replay（可选，默认使用 LLM_TRANSPORT_CONFIG 中的配置）
+        path: 录制文件路径（可选，默认使用配置）
+        latency: 回放时注入的延迟（秒，可选，默认使用配置）
+
+    Raises:
+        ValueError: 如果传输方式不支持
+    """
+    mode = mode or LLM_TRANSPORT_CONFIG["mode"]
+    path = Path(path or LLM_TRANSPORT_CONFIG["recording_path"])
+    if mode == "live":
+        return LiveTransport(session)
+    if mode == "record":
+        return RecordingTransport(LiveTransport(session), path)
+    if mode == "replay":
+        return ReplayTransport(path, LLM_TRANSPORT_CONFIG.get("replay_latency", 0.0) if latency is None else latency)
+    raise ValueError(f"不支持的 LLM 传输方式: {mode}（可选 {', '.join(TRANSPORT_MODES)}）")
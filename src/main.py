@@ -3,114 +3,17 @@
 """
 import argparse
 from pathlib import Path
-import pandas as pd
-from .data_loader import DataLoader
-from .product_classifier import ProductClassifier
-from .llm_client import LLMClient
 
+# 分类流程依赖 pandas / openpyxl / requests 等较重的模块，延迟到真正运行时再导入
+_PIPELINE_EXPORTS = ("classify_products", "classify_directory")
 
-def classify_products(input_filename: str, output_filename: str = None, column_name: str = None):
-    """
-    产品类型分类主函数
-    
-    Args:
-        input_filename: 输入 Excel 文件名
-        output_filename: 输出 Excel 文件名（可选，默认自动生成）
-        column_name: 礼包名称列名（可选，默认自动检测）
-    """
-    print("=" * 60)
-    print("产品类型自动分类系统")
-    print("=" * 60)
-    
-    # 初始化组件
-    data_loader = DataLoader()
-    llm_client = LLMClient()
-    product_classifier = ProductClassifier(llm_client)
-    
-    # 1. 加载 Excel
-    print(f"\n[1/4] 加载 Excel 文件: {input_filename}")
-    try:
-        df = data_loader.load_sales_data(input_filename)
-        print(f"  成功加载 {len(df)} 条记录")
-        print(f"  数据列: {', '.join(df.columns.tolist())}")
-    except Exception as e:
-        print(f"  错误: {e}")
-        return
-    
-    # 2. 检测礼包名称列
-    print(f"\n[2/4] 检测礼包名称列...")
-    try:
-        if column_name:
-            if column_name not in df.columns:
-                print(f"  错误: 指定的列名 '{column_name}' 不存在")
-                print(f"  可用列名: {', '.join(df.columns.tolist())}")
-                return
-            gift_name_col = column_name
-        else:
-            gift_name_col = data_loader.detect_gift_name_column(df)
-        print(f"  检测到列名: {gift_name_col}")
-    except Exception as e:
-        print(f"  错误: {e}")
-        return
-    
-    # 3. 产品分类
-    print(f"\n[3/4] 开始产品类型分类...")
-    try:
-        # 准备销售单类型数据 (必须存在)
-        if "销售单类型" not in df.columns:
-            raise ValueError("输入文件中缺少'销售单类型'列，该列是判断实物集采的必要条件。")
-            
-        print(f"  检测到'销售单类型'列，将用于判定实物集采")
-        sales_order_types = df["销售单类型"].astype(str).tolist()
-            
-        product_types = product_classifier.classify_batch(
-            df[gift_name_col].tolist(),
-            sales_order_types=sales_order_types
-        )
-    except Exception as e:
-        print(f"  错误: {e}")
-        return
-    
-    # 4. 添加产品类型列并保存
-    print(f"\n[4/4] 保存结果...")
-    try:
-        df = data_loader.add_product_type_column(df, product_types)
-        
-        if "价格类型" not in df.columns:
-            raise ValueError("输入文件中缺少'价格类型'列，该列是结算规则处理的必要条件。")
-        
-        def normalize_price_type(val):
-            if pd.isna(val):
-                return val
-            s = str(val)
-            lower = s.lower()
-            if "vp" in lower:
-                return "按vp价结算"
-            if "总监" in s:
-                return "按总监价结算"
-            if "核心" in s:
-                return "按核心价结算"
-            if "优惠" in s:
-                return "按优惠价结算"
-            if "常规" in s:
-                return "按常规价结算"
-            return s
-        
-        mask = df["产品类型"].isin(["常规册", "生鲜专卡"])
-        df.loc[mask, "价格类型"] = df.loc[mask, "价格类型"].apply(normalize_price_type)
-        
-        # 生成输出文件名
-        if output_filename is None:
-            input_stem = Path(input_filename).stem
-            output_filename = f"result_{input_stem}.xlsx"
-        
-        output_path = data_loader.save_results(df, output_filename)
-        print(f"\n✓ 分类完成！结果已保存至: {output_path}")
-    except Exception as e:
-        print(f"  错误: {e}")
-        return
-    
-    print("\n" + "=" * 60)
+
+def __getattr__(name):
+    # 兼容 from src.main import classify_products 的用法
+    if name in _PIPELINE_EXPORTS:
+        from . import pipeline
+        return getattr(pipeline, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
@@ -121,20 +24,166 @@ def main():
     
     parser.add_argument(
         "input_file",
-        help="输入 Excel 文件名（位于 data/input/ 目录）"
+        nargs="?",
+        help="输入 Excel 文件名（位于 data/input/ 目录）；使用 --input-dir 时省略"
     )
     parser.add_argument(
         "-o", "--output",
-        help="输出 Excel 文件名（可选，默认自动生成）"
+        help="输出文件名（可选，默认自动生成）"
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=["xlsx", "csv", "parquet"],
+        help="输出格式（可选，默认按 -o 的扩展名判断，否则为 xlsx）；csv / parquet 写入更快、文件更小"
     )
     parser.add_argument(
         "-c", "--column",
         dest="column_name",
         help="礼包名称列名（可选，默认自动检测）"
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="流式读取 Excel，每块的行数（可选，适合超大文件，内存占用与文件大小无关）"
+    )
+    
+    parser.add_argument(
+        "--no-parse-cache",
+        dest="use_parse_cache",
+        action="store_false",
+        help="不使用输入文件解析缓存，强制重新解析 Excel"
+    )
+    
+    parser.add_argument(
+        "--previous",
+        dest="previous_filename",
+        help="上一次的分类结果文件名（位于 data/output/），已分类过的礼包名称直接复用结果"
+    )
+    
+    parser.add_argument(
+        "--commission",
+        action="store_true",
+        help="核算销售提成：结果中添加提成列，并按提成归属人汇总（费率见 config.COMMISSION_RATES）"
+    )
+    
+    parser.add_argument(
+        "--llm-max-calls",
+        type=int,
+        help="LLM 请求次数上限（可选，默认见 config 中的 llm_budget_calls）"
+    )
+    parser.add_argument(
+        "--llm-max-tokens",
+        type=int,
+        help="LLM token 用量上限（可选，默认见 config 中的 llm_budget_tokens）"
+    )
+    parser.add_argument(
+        "--llm-deadline",
+        type=float,
+        help="LLM 阶段最长耗时（秒，可选）；超出预算的名称记为待确认，影响行数多的名称优先判断"
+    )
+    
+    parser.add_argument(
+        "--llm-transport",
+        choices=["live", "record", "replay"],
+        help="LLM 请求方式：live 直接请求 API；record 请求 API 并录制响应；replay 从录制文件回放，不访问网络（默认见 config 中的 LLM_TRANSPORT_CONFIG）"
+    )
+    parser.add_argument(
+        "--llm-recording",
+        help="LLM 录制文件路径（可选，默认 data/cache/llm_recordings.jsonl）"
+    )
+    parser.add_argument(
+        "--llm-replay-latency",
+        type=float,
+        help="回放时每次 LLM 请求注入的延迟（秒，可选，默认 0 即全速回放）"
+    )
+    
+    parser.add_argument(
+        "--rule-workers",
+        type=int,
+        help="单个文件规则匹配的进程数（可选，0 表示 CPU 核数；不同名称数达到 rule_parallel_min_names 时生效）"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="从上一次中断的检查点继续（已判断的名称不再调用 LLM）；检查点按输出文件名保存"
+    )
+    
+    parser.add_argument(
+        "--service-url",
+        help="使用常驻分类服务分类（如 http://127.0.0.1:8780，服务用 python -m src.service 启动）"
+    )
+    
+    parser.add_argument(
+        "--input-dir",
+        help="批量模式：分类该目录下所有匹配的 Excel 文件，每个文件输出一个结果"
+    )
+    parser.add_argument(
+        "--pattern",
+        default="*.xlsx",
+        help="批量模式的文件名匹配模式（默认 *.xlsx）"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="批量模式解析和规则匹配的进程数（默认为 CPU 核数）"
+    )
     
     args = parser.parse_args()
-    classify_products(args.input_file, args.output, args.column_name)
+    # 解析完参数再导入 pandas / requests 等较重的依赖，--help 和参数错误可立即返回
+    from .config import CLASSIFICATION_CONFIG, LLM_TRANSPORT_CONFIG
+    from .llm_budget import LLMBudget
+    from .pipeline import classify_directory, classify_products
+    
+    if args.llm_transport:
+        LLM_TRANSPORT_CONFIG["mode"] = args.llm_transport
+    if args.llm_recording:
+        LLM_TRANSPORT_CONFIG["recording_path"] = Path(args.llm_recording)
+    if args.llm_replay_latency is not None:
+        LLM_TRANSPORT_CONFIG["replay_latency"] = args.llm_replay_latency
+    if args.rule_workers is not None:
+        CLASSIFICATION_CONFIG["rule_workers"] = args.rule_workers
+    if LLM_TRANSPORT_CONFIG["mode"] == "replay" and not Path(LLM_TRANSPORT_CONFIG["recording_path"]).exists():
+        parser.error(f"LLM 录制文件不存在: {LLM_TRANSPORT_CONFIG['recording_path']}（先用 --llm-transport record 录制）")
+    
+    llm_budget = LLMBudget.from_config(
+        max_calls=args.llm_max_calls,
+        max_tokens=args.llm_max_tokens,
+        deadline_seconds=args.llm_deadline,
+    )
+    
+    if args.input_dir:
+        if args.input_file or args.output or args.chunk_size or args.previous_filename or args.service_url or args.resume:
+            parser.error("--input-dir 不能与 input_file、-o/--output、--chunk-size、--previous、--service-url、--resume 同时使用")
+        if args.rule_workers is not None:
+            parser.error("--input-dir 已按文件并行（进程数用 --workers 指定），不能与 --rule-workers 同时使用")
+        classify_directory(
+            args.input_dir,
+            pattern=args.pattern,
+            column_name=args.column_name,
+            use_parse_cache=args.use_parse_cache,
+            max_workers=args.workers,
+            output_format=args.output_format or "xlsx",
+            commission=args.commission,
+            llm_budget=llm_budget,
+        )
+        return
+    if not args.input_file:
+        parser.error("请指定 input_file 或 --input-dir")
+    classify_products(
+        args.input_file,
+        args.output,
+        args.column_name,
+        chunk_size=args.chunk_size,
+        use_parse_cache=args.use_parse_cache,
+        previous_filename=args.previous_filename,
+        output_format=args.output_format,
+        commission=args.commission,
+        llm_budget=llm_budget,
+        service_url=args.service_url,
+        resume=args.resume,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""
+运行指标模块 - 记录各阶段耗时、规则/LLM 命中情况、缓存命中率和 LLM 调用统计
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+
+class RunMetrics:
+    """
+    运行指标收集器（线程安全）
+
+    - stage(): 以上下文管理器记录阶段的墙钟时间和 CPU 时间（同名阶段累加）
+    - incr(): 计数器
+    - observe(): 记录观测值（如 LLM 请求延迟），汇总时输出分位数
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = defaultdict(int)
+        self.observations: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # 锁不能序列化；子进程的指标以 pickle 传回主进程后合并
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def merge(self, other: "RunMetrics") -> None:
+        """
+        合并另一个收集器的指标（如子进程中收集的指标）；同名阶段的耗时和计数器累加
+
+        Args:
+            other: 另一个指标收集器
+        """
+        with other._lock:
+            stages = {name: dict(values) for name, values in other.stages.items()}
+            counters = dict(other.counters)
+            observations = {name: list(values) for name, values in other.observations.items()}
+        with self._lock:
+            for name, values in stages.items():
+                stage = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+                for key in stage:
+                    stage[key] += values[key]
+            for name, value in counters.items():
+                self.counters[name] += value
+            for name, values in observations.items():
+                self.observations[name].extend(values)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        记录一个阶段的耗时
+
+        Args:
+            name: 阶段名称（子阶段用 "." 分隔，如 classify.llm）
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            with self._lock:
+                stage = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+                stage["wall_seconds"] += wall
+                stage["cpu_seconds"] += cpu
+                stage["calls"] += 1
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        逐个取出 iterable 的元素，并将每次取值的耗时计入阶段 name（不含调用方处理元素的时间）
+
+        Args:
+            name: 阶段名称
+            iterable: 被计时的可迭代对象（如流式读取的数据块）
+
+        Returns:
+            与 iterable 相同元素的迭代器
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """计数器累加"""
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """记录一个观测值"""
+        with self._lock:
+            self.observations[name].append(value)
+
+    @staticmethod
+    def _ratio(numerator: float, denominator: float) -> float:
+        return round(numerator / denominator, 4) if denominator else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        汇总为可序列化的字典
+
+        Returns:
+            包含 stages / counters / ratios / latency 的字典
+        """
+        with self._lock:
+            stages = {
+                name: {
+                    "wall_seconds": round(values["wall_seconds"], 4),
+                    "cpu_seconds": round(values["cpu_seconds"], 4),
+                    "calls": values["calls"],
+                }
+                for name, values in self.stages.items()
+            }
+            counters = dict(self.counters)
+            observations = {name: list(values) for name, values in self.observations.items()}
+
+        latency = {}
+        for name, values in observations.items():
+            if not values:
+                continue
+            array = np.asarray(values, dtype=float)
+            p50, p90, p99 = np.percentile(array, [50, 90, 99])
+            latency[name] = {
+                "count": int(array.size),
+                "mean": round(float(array.mean()), 4),
+                "p50": round(float(p50), 4),
+                "p90": round(float(p90), 4),
+                "p99": round(float(p99), 4),
+                "max": round(float(array.max()), 4),
+            }
+
+        ratios = {
+            # 按不同 (礼包名称, 销售单类型) 组合计：规则/内存缓存直接确定 vs 交给 LLM 阶段
+            "rule_hit_ratio": self._ratio(
+                counters.get("rule_resolved", 0),
+                counters.get("rule_resolved", 0) + counters.get("llm_fallback", 0),
+            ),
+            "persistent_cache_hit_ratio": self._ratio(
+                counters.get("persistent_cache_hits", 0),
+                counters.get("persistent_cache_hits", 0) + counters.get("persistent_cache_misses", 0),
+            ),
+            "parse_cache_hit_ratio": self._ratio(
+                counters.get("parse_cache_hits", 0),
+                counters.get("parse_cache_hits", 0) + counters.get("parse_cache_misses", 0),
+            ),
+        }
+        return {"stages": stages, "counters": counters, "ratios": ratios, "latency": latency}
+
+    def write_json(self, path: Path) -> Path:
+        """
+        将指标写入 JSON 文件
+
+        Args:
+            path: 输出路径
+
+        Returns:
+            输出路径
+        """
+        path = Path(path)
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+    @staticmethod
+    def sidecar_path(output_path: Path) -> Path:
+        """结果文件对应的指标文件路径（如 result_jan.xlsx -> result_jan.metrics.json）"""
+        output_path = Path(output_path)
+        return output_path.with_name(f"{output_path.stem}.metrics.json")
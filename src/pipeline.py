@@ -0,0 +1,611 @@
+"""
+分类流程模块 - 加载、分类、规整价格类型、保存（命令行入口见 main.py）
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from .checkpoint import ClassificationCheckpoint, input_fingerprint
+from .commission import CommissionCalculator
+from .config import CHECKPOINT_DIR, CLASSIFICATION_CONFIG, INPUT_DIR, PRODUCT_TYPES
+from .data_loader import DataLoader, ResultWriter, resolve_output_format
+from .product_classifier import PRODUCT_TYPE_DTYPE, ProductClassifier, as_product_type_categorical
+from .llm_budget import LLMBudget
+from .llm_client import LLMClient
+from .metrics import RunMetrics
+from .service import ServiceClassifier
+
+
+def _resolve_gift_name_column(data_loader: DataLoader, df: pd.DataFrame, column_name: str = None) -> str:
+    """确定礼包名称列：优先使用手动指定的列名，否则自动检测"""
+    if column_name:
+        if column_name not in df.columns:
+            raise ValueError(
+                f"指定的列名 '{column_name}' 不存在\n"
+                f"  可用列名: {', '.join(df.columns.tolist())}"
+            )
+        return column_name
+    return data_loader.detect_gift_name_column(df)
+
+
+def _build_previous_lookup(previous: pd.DataFrame, gift_name_col: str) -> pd.Series:
+    """
+    由上一次的分类结果构建 (礼包名称, 销售单类型) -> 产品类型 的查找表
+    
+    待确认和无法识别的类型不复用，会重新分类；同一组合出现多次时以最后一次为准。
+    """
+    missing = [col for col in (gift_name_col, "销售单类型") if col not in previous.columns]
+    if missing:
+        raise ValueError(f"上一次的结果文件中缺少列: {', '.join(missing)}")
+    
+    previous = previous[previous["产品类型"].isin(PRODUCT_TYPES) & (previous["产品类型"] != "待确认")]
+    keys = pd.MultiIndex.from_arrays([previous[gift_name_col], previous["销售单类型"]])
+    lookup = pd.Series(previous["产品类型"].to_numpy(dtype=object), index=keys)
+    return lookup[~lookup.index.duplicated(keep="last")]
+
+
+def _load_previous_lookup(product_classifier: ProductClassifier, previous: pd.DataFrame, gift_name_col: str) -> pd.Series:
+    """构建上一次结果的查找表，并将其中已确定类型的名称加入相似度索引"""
+    lookup = _build_previous_lookup(previous, gift_name_col)
+    added = product_classifier.add_known_names(lookup.index.get_level_values(0), lookup.to_numpy())
+    if added:
+        print(f"  相似度索引载入上一次结果中的 {added} 个名称")
+    return lookup
+
+
+def _priority_weights(df: pd.DataFrame) -> Optional[pd.Series]:
+    """llm_priority 为 amount 且存在金额列时返回金额列（LLM 按名称的金额合计排序），否则按行数排序"""
+    column = CLASSIFICATION_CONFIG.get("llm_priority_amount_column")
+    if CLASSIFICATION_CONFIG.get("llm_priority") == "amount" and column in df.columns:
+        return df[column]
+    return None
+
+
+def _classify_new_rows(
+    product_classifier: ProductClassifier,
+    df: pd.DataFrame,
+    gift_name_col: str,
+    checkpoint: Optional[ClassificationCheckpoint] = None,
+    replay: Optional[bool] = None,
+    llm_budget: Optional[LLMBudget] = None,
+) -> pd.Categorical:
+    """
+    运行规则和 LLM 分类 DataFrame 的每一行
+    
+    提供检查点时：replay 为 None 表示 df 是完整输入，用 classify_iter 分块分类（按输入内容绑定检查点、逐块推进）；
+    否则 df 是流式读取的一块，由调用方绑定和推进检查点，replay 表示该块是否位于检查点位置之前。
+    流式读取的各块由调用方传入同一个 llm_budget，预算按整次运行计算。
+    """
+    kwargs = {"sales_order_types": df["销售单类型"], "priority_weights": _priority_weights(df), "llm_budget": llm_budget}
+    if checkpoint is None:
+        return product_classifier.classify_batch(df[gift_name_col], **kwargs)
+    if replay is None:
+        chunks = [
+            product_types.codes
+            for _, product_types in product_classifier.classify_iter(df[gift_name_col], checkpoint=checkpoint, **kwargs)
+        ]
+        codes = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int8)
+        return pd.Categorical.from_codes(codes, dtype=PRODUCT_TYPE_DTYPE)
+    return product_classifier.classify_batch(df[gift_name_col], checkpoint=checkpoint, replay=replay, **kwargs)
+
+
+def _classify_rows(
+    product_classifier: ProductClassifier,
+    df: pd.DataFrame,
+    gift_name_col: str,
+    previous_lookup: Optional[pd.Series] = None,
+    checkpoint: Optional[ClassificationCheckpoint] = None,
+    replay: Optional[bool] = None,
+    llm_budget: Optional[LLMBudget] = None,
+) -> Tuple[pd.Categorical, int]:
+    """
+    分类 DataFrame 的每一行；提供上一次的结果时，已分类过的组合直接复用，只对新组合运行规则和 LLM
+    
+    Returns:
+        (产品类型 Categorical, 复用的行数)
+    """
+    if previous_lookup is None or previous_lookup.empty:
+        return _classify_new_rows(product_classifier, df, gift_name_col, checkpoint, replay, llm_budget), 0
+    
+    keys = pd.MultiIndex.from_arrays([df[gift_name_col], df["销售单类型"]])
+    positions = previous_lookup.index.get_indexer(keys)
+    reused = positions >= 0
+    
+    # 直接拼接类别编码，不生成逐行的字符串
+    codes = np.empty(len(df), dtype=np.int8)
+    codes[reused] = as_product_type_categorical(previous_lookup.to_numpy()).codes[positions[reused]]
+    if not reused.all():
+        remaining = df.loc[~reused]
+        codes[~reused] = _classify_new_rows(
+            product_classifier, remaining, gift_name_col, checkpoint, replay, llm_budget
+        ).codes
+    return pd.Categorical.from_codes(codes, dtype=PRODUCT_TYPE_DTYPE), int(reused.sum())
+
+
+def _classify_products_streaming(
+    data_loader: DataLoader,
+    product_classifier: ProductClassifier,
+    input_filename: str,
+    column_name: str,
+    chunk_size: int,
+    writer: ResultWriter,
+    previous: Optional[pd.DataFrame] = None,
+    commission_calculator: Optional[CommissionCalculator] = None,
+    commission_summaries: Optional[list] = None,
+    checkpoint: Optional[ClassificationCheckpoint] = None,
+    llm_budget: Optional[LLMBudget] = None,
+) -> Optional[int]:
+    """
+    流式分块读取并分类（分类缓存在各块之间共享），每块处理完立即写入结果文件，不在内存中合并
+    
+    指定 commission_calculator 时逐块计算提成，各块的提成汇总追加到 commission_summaries。
+    提供检查点时按输入文件内容绑定，检查点位置之前的块只用规则和检查点重建（不调用 LLM），之后每块完成时推进位置。
+    各块共用 llm_budget（预算按整个文件计算）。
+    
+    Returns:
+        处理的记录数，出错时返回 None
+    """
+    print(f"\n[1/4] 流式加载 Excel 文件: {input_filename}（每块 {chunk_size} 行）")
+    gift_name_col = None
+    previous_lookup = None
+    reused_rows = 0
+    try:
+        for chunk in data_loader.iter_sales_data(input_filename, chunk_size):
+            if gift_name_col is None:
+                print(f"  数据列: {', '.join(chunk.columns.tolist())}")
+                print(f"\n[2/4] 检测礼包名称列...")
+                gift_name_col = _resolve_gift_name_column(data_loader, chunk, column_name)
+                print(f"  检测到列名: {gift_name_col}")
+                if "销售单类型" not in chunk.columns:
+                    raise ValueError("输入文件中缺少'销售单类型'列，该列是判断实物集采的必要条件。")
+                print(f"\n[3/4] 开始产品类型分类...")
+                if previous is not None:
+                    previous_lookup = _load_previous_lookup(product_classifier, previous, gift_name_col)
+                if checkpoint is not None:
+                    checkpoint.bind(_streaming_fingerprint(data_loader, product_classifier, input_filename, previous_lookup))
+            
+            print(f"\n  分块: 第 {chunk.index[0] + 1}-{chunk.index[-1] + 1} 行")
+            end = int(chunk.index[-1]) + 1
+            replay = checkpoint.position >= end if checkpoint is not None else None
+            with product_classifier.metrics.stage("classify"):
+                product_types, reused = _classify_rows(
+                    product_classifier, chunk, gift_name_col, previous_lookup, checkpoint, replay, llm_budget
+                )
+            if checkpoint is not None and not replay:
+                checkpoint.advance(end)
+            reused_rows += reused
+            chunk = data_loader.add_product_type_column(chunk, product_types)
+            with data_loader.metrics.stage("normalize"):
+                chunk = data_loader.normalize_price_type_column(chunk)
+            if commission_calculator is not None:
+                chunk = commission_calculator.compute(chunk, gift_name_col)
+                commission_summaries.append(commission_calculator.summarize(chunk))
+            with data_loader.metrics.stage("save"):
+                writer.write(chunk)
+    except Exception as e:
+        print(f"  错误: {e}")
+        return None
+    finally:
+        if checkpoint is not None and checkpoint.fingerprint is not None:
+            checkpoint.save()
+    
+    if writer.rows == 0:
+        print("  错误: 输入文件中没有数据")
+        return None
+    
+    print(f"\n  共处理 {writer.rows} 条记录")
+    if previous is not None:
+        product_classifier.metrics.incr("previous_reused_rows", reused_rows)
+        print(f"  复用上一次结果 {reused_rows} 条，新分类 {writer.rows - reused_rows} 条")
+    return writer.rows
+
+
+def _streaming_fingerprint(
+    data_loader: DataLoader,
+    product_classifier: ProductClassifier,
+    input_filename: str,
+    previous_lookup: Optional[pd.Series] = None,
+) -> str:
+    """流式模式的检查点指纹：输入文件内容、规则版本，以及上一次结果中可复用的组合"""
+    parts = [data_loader.input_digest(input_filename), product_classifier.rules_version()]
+    if previous_lookup is not None:
+        parts.append(input_fingerprint(previous_lookup.index.get_level_values(0), previous_lookup.index.get_level_values(1)))
+    return "|".join(parts)
+
+
+def _prepare_workbook(input_dir: Path, filename: str, column_name: Optional[str], use_parse_cache: bool) -> dict:
+    """
+    批量模式的子进程任务：解析一个 Excel 文件并只用规则分类
+    
+    Returns:
+        {"filename", "df", "gift_name_col", "product_types", "metrics"}，
+        product_types 中规则无法确定的行为 None
+    """
+    # 批量模式已按文件并行，文件内的规则匹配不再另开进程
+    CLASSIFICATION_CONFIG["rule_workers"] = 1
+    metrics = RunMetrics()
+    data_loader = DataLoader(metrics)
+    data_loader.input_dir = Path(input_dir)
+    df = data_loader.load_sales_data(filename, use_cache=use_parse_cache)
+    gift_name_col = _resolve_gift_name_column(data_loader, df, column_name)
+    if "销售单类型" not in df.columns:
+        raise ValueError("输入文件中缺少'销售单类型'列，该列是判断实物集采的必要条件。")
+    
+    product_classifier = ProductClassifier(metrics=metrics)
+    with metrics.stage("classify"):
+        product_types = product_classifier.classify_rules(df[gift_name_col], df["销售单类型"])
+    return {
+        "filename": filename,
+        "df": df,
+        "gift_name_col": gift_name_col,
+        "product_types": product_types,
+        "metrics": metrics,
+    }
+
+
+def classify_directory(
+    input_dir: Optional[str] = None,
+    pattern: str = "*.xlsx",
+    column_name: str = None,
+    use_parse_cache: bool = True,
+    max_workers: Optional[int] = None,
+    output_format: str = "xlsx",
+    commission: bool = False,
+    llm_budget: Optional[LLMBudget] = None,
+):
+    """
+    批量模式：分类目录下所有匹配的 Excel 文件
+    
+    各文件的解析和规则匹配在进程池中并行执行；规则无法确定的名称在所有文件之间去重后，
+    由主进程的一个 LLM 阶段统一判断（共用持久化缓存），同一名称只判断一次。
+    每个输入文件输出一个 result_<文件名>.<格式>，并输出各文件产品类型统计的汇总表 batch_summary.xlsx。
+    
+    Args:
+        input_dir: 输入目录（可选，默认 data/input/）
+        pattern: 文件名匹配模式
+        column_name: 礼包名称列名（可选，默认自动检测）
+        use_parse_cache: 是否使用输入文件解析缓存
+        max_workers: 进程数（可选，默认为 CPU 核数）
+        output_format: 结果文件格式（xlsx / csv / parquet）
+        commission: 是否核算提成（各结果文件添加提成列，所有文件的提成按归属人合并汇总到 batch_commission.<格式>）
+        llm_budget: LLM 阶段的预算（可选，默认按 CLASSIFICATION_CONFIG 中的 llm_budget_* 配置）
+    """
+    print("=" * 60)
+    print("产品类型自动分类系统（批量模式）")
+    print("=" * 60)
+    
+    input_dir = Path(input_dir) if input_dir else INPUT_DIR
+    filenames = sorted(
+        path.name for path in input_dir.glob(pattern)
+        # 跳过 Excel 打开文件时生成的临时锁文件
+        if path.is_file() and not path.name.startswith("~$")
+    )
+    if not filenames:
+        print(f"  错误: 目录 {input_dir} 中没有匹配 {pattern} 的文件")
+        return
+    
+    metrics = RunMetrics()
+    data_loader = DataLoader(metrics)
+    
+    # 1. 并行解析 + 规则匹配
+    print(f"\n[1/4] 并行加载并规则匹配 {len(filenames)} 个文件...")
+    prepared = []
+    with metrics.stage("batch.prepare"), ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_prepare_workbook, input_dir, filename, column_name, use_parse_cache)
+            for filename in filenames
+        ]
+        for filename, future in zip(filenames, futures):
+            try:
+                item = future.result()
+            except Exception as e:
+                print(f"  错误: {filename}: {e}")
+                continue
+            metrics.merge(item.pop("metrics"))
+            unresolved = int(pd.isna(item["product_types"]).sum())
+            print(f"  {filename}: {len(item['df'])} 条记录，规则无法确定 {unresolved} 条")
+            prepared.append(item)
+    if not prepared:
+        return
+    
+    # 2. 所有文件共用一个 LLM 阶段
+    print(f"\n[2/4] LLM 判断规则无法确定的名称...")
+    pending_names, pending_weights = [], []
+    for item in prepared:
+        mask = pd.isna(item["product_types"])
+        pending_names.extend(item["df"].loc[mask, item["gift_name_col"]])
+        weights = _priority_weights(item["df"])
+        pending_weights.extend(weights[mask] if weights is not None else np.ones(int(mask.sum())))
+    llm_client = LLMClient(metrics=metrics)
+    product_classifier = ProductClassifier(llm_client, metrics=metrics)
+    resolved = product_classifier.resolve_pending(pending_names, pending_weights, llm_budget)
+    commission_calculator = CommissionCalculator(metrics=metrics) if commission else None
+    commission_summaries = []
+    print(f"  共 {len(resolved)} 个不同名称")
+    
+    # 3. 逐个文件补全结果并保存
+    print(f"\n[3/4] 保存结果...")
+    summary = {}
+    for item in prepared:
+        filename, df, product_types = item["filename"], item["df"], item["product_types"]
+        try:
+            mask = pd.isna(product_types)
+            if mask.any():
+                # 名称为空的行不在 resolved 中，与 classify_batch 一致记为待确认
+                product_types[mask] = df.loc[mask, item["gift_name_col"]].map(resolved).fillna("待确认").to_numpy()
+            df = data_loader.add_product_type_column(df, as_product_type_categorical(product_types))
+            counts = df["产品类型"].value_counts()
+            if counts.sum() != len(df):
+                raise ValueError(f"产品类型统计共 {counts.sum()} 行，与记录数 {len(df)} 不一致")
+            with metrics.stage("normalize"):
+                df = data_loader.normalize_price_type_column(df)
+            if commission_calculator is not None:
+                df = commission_calculator.compute(df, item["gift_name_col"])
+                file_commission = commission_calculator.summarize(df)
+            output_path = data_loader.save_results(df, f"result_{Path(filename).stem}.{output_format}", output_format)
+        except Exception as e:
+            print(f"  错误: {filename}: {e}")
+            continue
+        summary[filename] = counts
+        if commission_calculator is not None:
+            commission_summaries.append(file_commission)
+        print(f"  {filename} -> {output_path}")
+    if not summary:
+        return
+    
+    # 4. 汇总统计
+    print(f"\n[4/4] 汇总统计:")
+    summary_df = pd.DataFrame(summary).T.fillna(0).astype(int)
+    summary_df.loc["合计"] = summary_df.sum()
+    summary_df.index.name = "文件"
+    print(summary_df.to_string())
+    summary_path = data_loader.output_dir / "batch_summary.xlsx"
+    summary_df.to_excel(summary_path)
+    print(f"\n✓ 批量分类完成！汇总表已保存至: {summary_path}")
+    if commission_summaries:
+        _save_commission_summary(
+            data_loader,
+            CommissionCalculator.combine(commission_summaries),
+            f"batch_commission.{output_format}",
+            output_format,
+        )
+    metrics_path = metrics.write_json(RunMetrics.sidecar_path(summary_path))
+    
+    _print_metrics_summary(metrics)
+    print(f"  运行指标已保存至: {metrics_path}")
+    print("\n" + "=" * 60)
+
+
+def _print_metrics_summary(metrics: RunMetrics) -> None:
+    """打印运行指标摘要"""
+    report = metrics.to_dict()
+    print("\n运行指标:")
+    for name, stage in report["stages"].items():
+        print(f"  {name}: 耗时 {stage['wall_seconds']:.2f}s（CPU {stage['cpu_seconds']:.2f}s）")
+    ratios = report["ratios"]
+    print(f"  规则命中率: {ratios['rule_hit_ratio']:.1%}，持久化缓存命中率: {ratios['persistent_cache_hit_ratio']:.1%}")
+    counters = report["counters"]
+    if counters.get("llm_requests"):
+        latency = report["latency"].get("llm_latency_seconds", {})
+        print(
+            f"  LLM 请求 {counters['llm_requests']} 次（重试 {counters.get('llm_retries', 0)} 次），"
+            f"延迟 p50 {latency.get('p50', 0):.2f}s / p99 {latency.get('p99', 0):.2f}s，"
+            f"token 用量 {counters.get('total_tokens', 0)}"
+        )
+    if counters.get("llm_budget_uncovered_rows"):
+        print(
+            f"  LLM 预算未覆盖: {counters.get('llm_budget_skipped_names', 0)} 个名称、"
+            f"{counters['llm_budget_uncovered_rows']} 行记为待确认"
+        )
+
+
+def _open_checkpoint(output_filename: str, resume: bool = False) -> Optional[ClassificationCheckpoint]:
+    """
+    创建本次运行的检查点（enable_checkpoint 未启用时返回 None）
+    
+    检查点按输出文件名保存；resume 为 True 时读取已有进度，否则从头开始并覆盖旧的检查点。
+    """
+    if not CLASSIFICATION_CONFIG.get("enable_checkpoint"):
+        return None
+    path = CHECKPOINT_DIR / f"{output_filename}.json"
+    interval = CLASSIFICATION_CONFIG.get("checkpoint_interval_seconds")
+    if not resume:
+        return ClassificationCheckpoint(path, interval)
+    checkpoint = ClassificationCheckpoint.load(path, interval)
+    if checkpoint.fingerprint is None:
+        print(f"  没有找到检查点 {path.name}，从头开始")
+    return checkpoint
+
+
+def _save_commission_summary(
+    data_loader: DataLoader, summary: pd.DataFrame, filename: str, output_format: str = "xlsx"
+) -> Optional[Path]:
+    """打印并保存提成汇总表，出错时返回 None"""
+    print(f"\n提成汇总（前 10 名）:")
+    print(summary.head(10).to_string())
+    try:
+        output_path = data_loader.save_results(summary.reset_index(), filename, output_format)
+    except Exception as e:
+        print(f"  错误: {e}")
+        return None
+    print(f"  提成汇总已保存至: {output_path}")
+    return output_path
+
+
+def classify_products(
+    input_filename: str,
+    output_filename: str = None,
+    column_name: str = None,
+    chunk_size: Optional[int] = None,
+    use_parse_cache: bool = True,
+    previous_filename: Optional[str] = None,
+    output_format: Optional[str] = None,
+    commission: bool = False,
+    llm_budget: Optional[LLMBudget] = None,
+    service_url: Optional[str] = None,
+    resume: bool = False,
+):
+    """
+    产品类型分类主函数
+    
+    运行结束后将各阶段耗时、规则/LLM 命中情况、缓存命中率和 LLM 调用统计写入结果文件旁的
+    <结果文件名>.metrics.json。
+    
+    Args:
+        input_filename: 输入 Excel 文件名
+        output_filename: 输出文件名（可选，默认自动生成）
+        column_name: 礼包名称列名（可选，默认自动检测）
+        chunk_size: 流式读取的每块行数（可选，不指定时一次性读取整个文件）
+        use_parse_cache: 是否使用输入文件解析缓存（流式读取时不使用）
+        previous_filename: 上一次的分类结果文件名（可选，位于 data/output/）；
+            其中已出现的 (礼包名称, 销售单类型) 组合直接复用产品类型，只对新组合重新分类
+        output_format: 输出格式 xlsx / csv / parquet（可选，默认按输出文件扩展名判断，未指定文件名时为 xlsx）
+        commission: 是否核算提成（结果文件中添加提成费率 / 提成金额 / 提成归属人列，
+            另存按提成归属人汇总的 <结果文件名>_commission 表）
+        llm_budget: LLM 阶段的预算（可选，默认按 CLASSIFICATION_CONFIG 中的 llm_budget_* 配置）；
+            预算用尽后未判断的名称记为待确认，运行指标中记录未覆盖的行数
+        service_url: 分类服务地址（可选，如 http://127.0.0.1:8780）；指定时由常驻的分类服务分类
+            （复用服务端的缓存和 LLM 连接），LLM 预算由服务端控制
+        resume: 是否从上一次中断的检查点继续（enable_checkpoint 启用时，运行中定期将已判断的名称和
+            处理位置保存到 data/cache/checkpoints/<输出文件名>.json，运行完成后删除）
+    """
+    print("=" * 60)
+    print("产品类型自动分类系统")
+    print("=" * 60)
+    
+    # 初始化组件
+    metrics = RunMetrics()
+    data_loader = DataLoader(metrics)
+    if service_url:
+        product_classifier = ServiceClassifier(service_url, metrics=metrics)
+        try:
+            product_classifier.health()
+        except Exception as e:
+            print(f"  错误: 无法连接分类服务 {service_url}: {e}")
+            return
+        if llm_budget is not None and llm_budget.limited:
+            print("  提示: 使用分类服务时 LLM 预算由服务端控制，本地设置的预算不生效")
+    else:
+        llm_client = LLMClient(metrics=metrics)
+        product_classifier = ProductClassifier(llm_client, metrics=metrics)
+        # 流式读取的各块共用同一个预算
+        if llm_budget is None:
+            llm_budget = LLMBudget.from_config()
+    commission_calculator = CommissionCalculator(metrics=metrics) if commission else None
+    commission_summaries = []
+    
+    # 生成输出文件名（流式模式边处理边写入，需要先确定）
+    if output_filename is None:
+        output_filename = f"result_{Path(input_filename).stem}.{output_format or 'xlsx'}"
+    try:
+        output_format, output_filename = resolve_output_format(output_filename, output_format)
+    except ValueError as e:
+        print(f"  错误: {e}")
+        return
+    
+    checkpoint = _open_checkpoint(output_filename, resume) if not service_url else None
+    if resume and checkpoint is None:
+        print("  提示: 未启用检查点（或使用分类服务），--resume 不生效")
+    
+    previous = None
+    if previous_filename:
+        print(f"\n加载上一次的分类结果: {previous_filename}")
+        try:
+            previous = data_loader.load_previous_results(previous_filename, use_cache=use_parse_cache)
+            print(f"  成功加载 {len(previous)} 条记录")
+        except Exception as e:
+            print(f"  错误: {e}")
+            return
+    
+    if chunk_size:
+        try:
+            writer = data_loader.open_result_writer(output_filename, output_format)
+        except Exception as e:
+            print(f"  错误: {e}")
+            return
+        rows = _classify_products_streaming(
+            data_loader, product_classifier, input_filename, column_name, chunk_size, writer, previous,
+            commission_calculator, commission_summaries, checkpoint, llm_budget,
+        )
+        if rows is None:
+            writer.abort()
+            return
+    else:
+        # 1. 加载 Excel
+        print(f"\n[1/4] 加载 Excel 文件: {input_filename}")
+        try:
+            df = data_loader.load_sales_data(input_filename, use_cache=use_parse_cache)
+            print(f"  成功加载 {len(df)} 条记录")
+            print(f"  数据列: {', '.join(df.columns.tolist())}")
+        except Exception as e:
+            print(f"  错误: {e}")
+            return
+        
+        # 2. 检测礼包名称列
+        print(f"\n[2/4] 检测礼包名称列...")
+        try:
+            gift_name_col = _resolve_gift_name_column(data_loader, df, column_name)
+            print(f"  检测到列名: {gift_name_col}")
+        except Exception as e:
+            print(f"  错误: {e}")
+            return
+        
+        # 3. 产品分类
+        print(f"\n[3/4] 开始产品类型分类...")
+        try:
+            # 准备销售单类型数据 (必须存在)
+            if "销售单类型" not in df.columns:
+                raise ValueError("输入文件中缺少'销售单类型'列，该列是判断实物集采的必要条件。")
+                
+            print(f"  检测到'销售单类型'列，将用于判定实物集采")
+            
+            previous_lookup = (
+                _load_previous_lookup(product_classifier, previous, gift_name_col) if previous is not None else None
+            )
+            with metrics.stage("classify"):
+                product_types, reused_rows = _classify_rows(
+                    product_classifier, df, gift_name_col, previous_lookup, checkpoint, llm_budget=llm_budget
+                )
+            if previous is not None:
+                metrics.incr("previous_reused_rows", reused_rows)
+                print(f"  复用上一次结果 {reused_rows} 条，新分类 {len(df) - reused_rows} 条")
+            df = data_loader.add_product_type_column(df, product_types)
+            with metrics.stage("normalize"):
+                df = data_loader.normalize_price_type_column(df)
+            if commission_calculator is not None:
+                df = commission_calculator.compute(df, gift_name_col)
+                commission_summaries.append(commission_calculator.summarize(df))
+        except Exception as e:
+            print(f"  错误: {e}")
+            return
+    
+    # 4. 保存结果
+    print(f"\n[4/4] 保存结果...")
+    try:
+        if chunk_size:
+            # 各块已写入，完成文件
+            with metrics.stage("save"):
+                writer.close()
+            output_path = writer.path
+        else:
+            output_path = data_loader.save_results(df, output_filename, output_format)
+        print(f"\n✓ 分类完成！结果已保存至: {output_path}")
+        if commission_summaries:
+            _save_commission_summary(
+                data_loader,
+                CommissionCalculator.combine(commission_summaries),
+                f"{output_path.stem}_commission.{output_format}",
+                output_format,
+            )
+        metrics_path = metrics.write_json(RunMetrics.sidecar_path(output_path))
+    except Exception as e:
+        print(f"  错误: {e}")
+        return
+    if checkpoint is not None:
+        checkpoint.remove()
+    
+    _print_metrics_summary(metrics)
+    print(f"  运行指标已保存至: {metrics_path}")
+    
+    print("\n" + "=" * 60)
@@ -1,17 +1,212 @@
 """
 产品类型分类模块 - 根据礼包名称自动识别产品类型
 """
-from typing import List, Dict, Optional
-from .config import CLASSIFICATION_KEYWORDS, CUSTOM_BOOK_PATTERN, CLASSIFICATION_CONFIG, SALESPERSON_NAMES
+import copy
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .config import (
+    CLASSIFICATION_CACHE_PATH,
+    CLASSIFICATION_CONFIG,
+    CLASSIFICATION_KEYWORDS,
+    CUSTOM_BOOK_PATTERN,
+    PRODUCT_TYPES,
+    SALESPERSON_NAMES,
+)
+from .checkpoint import ClassificationCheckpoint, input_fingerprint
 from .llm_client import LLMClient
+from .classification_cache import ClassificationCache
+from .keyword_matcher import get_rule_matcher
+from .llm_budget import LLM_SKIPPED, LLMBudget
+from .metrics import RunMetrics
+from .single_flight import SingleFlight
+from .similarity_index import SimilarityIndex
+
+
+LLM_SYSTEM_MESSAGE = "你是一个产品分类专家，擅长识别生鲜食品类礼包。请始终以 JSON 格式输出结果。"
+
+# 产品类型结果列的类型：固定 6 个类别，每行只存 int8 编码
+PRODUCT_TYPE_DTYPE = pd.CategoricalDtype(PRODUCT_TYPES)
+
+# LLM 阶段可能给出的产品类型；相似度索引只收录和沿用这些类型
+# （常规册 / 定制册 / 不核算只由关键词和销售员名字决定，缺少关键词的相似名称不能沿用）
+LLM_PRODUCT_TYPES = ("生鲜专卡", "待确认")
+
+
+def as_product_type_categorical(values: Sequence) -> pd.Categorical:
+    """
+    将产品类型序列转换为固定类别的 Categorical
+    
+    Args:
+        values: 产品类型序列（缺失值保留为缺失）
+        
+    Returns:
+        dtype 为 PRODUCT_TYPE_DTYPE 的 Categorical
+        
+    Raises:
+        ValueError: 如果包含 PRODUCT_TYPES 以外的值
+    """
+    result = pd.Categorical(values, dtype=PRODUCT_TYPE_DTYPE)
+    invalid = result.isna() & pd.notna(np.asarray(values, dtype=object))
+    if invalid.any():
+        unknown = pd.unique(np.asarray(values, dtype=object)[invalid])
+        raise ValueError(f"未知的产品类型: {', '.join(map(str, unknown))}")
+    return result
+
+
+# 并行规则匹配时由 fork 出的子进程继承的 (分类函数, 名称数组, 销售单类型数组)：
+# 已构建的匹配器、缓存和名称不随每个任务序列化，任务只传递分片的起止位置
+_RULE_SHARD_STATE: Optional[Tuple[Callable, np.ndarray, np.ndarray]] = None
+_RULE_SHARD_LOCK = threading.Lock()
+
+
+def _match_rule_shard(start: int, end: int) -> np.ndarray:
+    """在子进程中分类第 start 到 end 个组合，返回产品类型编码（int8，-1 表示需要 LLM 判断）"""
+    classify, names, sales_order_types = _RULE_SHARD_STATE
+    results = [classify(name, s_type) for name, s_type in zip(names[start:end], sales_order_types[start:end])]
+    return pd.Categorical(results, dtype=PRODUCT_TYPE_DTYPE).codes
+
+
+def _rule_worker_count(unique_total: int) -> int:
+    """按配置和组合数决定规则匹配的进程数（1 表示在当前进程中串行匹配）"""
+    workers = CLASSIFICATION_CONFIG.get("rule_workers", 1)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if (
+        not workers
+        or workers <= 1
+        or unique_total < CLASSIFICATION_CONFIG.get("rule_parallel_min_names", 0)
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        return 1
+    return min(workers, unique_total)
 
 
 class ProductClassifier:
     """产品类型分类器"""
     
-    def __init__(self, llm_client: Optional[LLMClient] = None):
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        persistent_cache: Optional[ClassificationCache] = None,
+        metrics: Optional[RunMetrics] = None,
+        similarity_index: Optional[SimilarityIndex] = None,
+    ):
+        """
+        Args:
+            llm_client: LLM 客户端（可选，不提供时使用关键词启发式兜底）
+            persistent_cache: 跨运行的持久化缓存（可选，默认在 LLM 可用且配置启用时自动创建）
+            metrics: 运行指标收集器（可选，默认沿用 LLM 客户端的收集器）
+            similarity_index: 已分类名称的相似度索引（可选，默认在配置启用时自动创建，
+                并载入持久化缓存中的记录）
+        """
         self.llm_client = llm_client
+        if metrics is None:
+            metrics = getattr(llm_client, "metrics", None) or RunMetrics()
+        self.metrics = metrics
         self.cache = {} if CLASSIFICATION_CONFIG.get("enable_cache", True) else None
+        self.matcher = get_rule_matcher()
+        # 多个线程 / Streamlit 会话同时判断同一名称时只发出一次 LLM 请求
+        self.single_flight = SingleFlight(failure_ttl=CLASSIFICATION_CONFIG.get("llm_failure_ttl"))
+        
+        if (
+            persistent_cache is None
+            and self._llm_available()
+            and CLASSIFICATION_CONFIG.get("enable_persistent_cache", False)
+        ):
+            ttl_days = CLASSIFICATION_CONFIG.get("persistent_cache_ttl_days")
+            persistent_cache = ClassificationCache(
+                CLASSIFICATION_CACHE_PATH,
+                namespace=self.rules_version(),
+                ttl_seconds=ttl_days * 86400 if ttl_days else None,
+                max_entries=CLASSIFICATION_CONFIG.get("persistent_cache_max_entries"),
+            )
+        self.persistent_cache = persistent_cache
+        
+        if similarity_index is None and CLASSIFICATION_CONFIG.get("enable_similarity_index", False):
+            similarity_index = SimilarityIndex(dim=CLASSIFICATION_CONFIG.get("similarity_dim", 1024))
+            if persistent_cache is not None:
+                known = {
+                    name: product_type
+                    for name, product_type in persistent_cache.items().items()
+                    if product_type in LLM_PRODUCT_TYPES
+                }
+                similarity_index.add(list(known), list(known.values()))
+        self.similarity_index = similarity_index
+    
+    def for_run(self, metrics: RunMetrics) -> "ProductClassifier":
+        """
+        返回按本次运行收集指标的分类器
+        
+        新分类器与当前分类器共用分类缓存、持久化缓存、相似度索引、请求合并和 LLM 连接池，
+        只有运行指标独立，适合在多个会话共用的分类器（如 Streamlit 的 cache_resource）之上按次运行使用。
+        
+        Args:
+            metrics: 本次运行的指标收集器
+            
+        Returns:
+            新的 ProductClassifier
+        """
+        classifier = copy.copy(self)
+        classifier.metrics = metrics
+        if self.llm_client is not None:
+            classifier.llm_client = self.llm_client.with_metrics(metrics)
+        return classifier
+    
+    def add_known_names(self, names: Sequence, product_types: Sequence) -> int:
+        """
+        将已分类的名称加入相似度索引（如上一次的结果文件）
+        
+        只收录 LLM 阶段可能给出的类型（生鲜专卡 / 待确认）：实物集采由销售单类型决定，
+        常规册 / 定制册 / 不核算由关键词和销售员名字决定，都不能沿用到相似名称；名称或类型缺失的记录跳过。
+        
+        Args:
+            names: 礼包名称序列
+            product_types: 对应的产品类型序列
+            
+        Returns:
+            加入索引的名称数
+        """
+        if self.similarity_index is None:
+            return 0
+        known = {}
+        for name, product_type in zip(names, product_types):
+            if isinstance(name, str) and product_type in LLM_PRODUCT_TYPES:
+                known[name] = product_type
+        self.similarity_index.add(list(known), list(known.values()))
+        return len(known)
+    
+    def rules_version(self) -> str:
+        """
+        计算当前规则/Prompt/模型配置的版本哈希
+        
+        关键词、销售员名单、Prompt 或模型任一变化都会得到新的版本号，使旧的持久化缓存失效。
+        
+        Returns:
+            版本哈希字符串
+        """
+        api_config = getattr(self.llm_client, "api_config", None) or {}
+        payload = {
+            "keywords": CLASSIFICATION_KEYWORDS,
+            "salesperson_names": SALESPERSON_NAMES,
+            "custom_book_pattern": CUSTOM_BOOK_PATTERN.pattern,
+            "system_message": LLM_SYSTEM_MESSAGE,
+            "prompt": self._build_prompt("{name}"),
+            "batch_prompt": self._build_batch_prompt(["{name}"]),
+            "provider": getattr(self.llm_client, "api_provider", None),
+            "model": api_config.get("model"),
+            "temperature": CLASSIFICATION_CONFIG.get("llm_temperature"),
+        }
+        digest = hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()[:16]
     
     def _rule_based_classify(self, name: str, sales_order_type: Optional[str] = None) -> Optional[str]:
         """
@@ -31,28 +226,11 @@ class ProductClassifier:
         if sales_order_type and sales_order_type == "实物集采":
             return "实物集采"
             
-        name_lower = name.lower()
-        
-        # 1. 检查定制册 (优先级: 销售员名字 > 正则)
-        # 检查销售员名字
-        for person in SALESPERSON_NAMES:
-            if person in name:
-                return "定制册"
-        
-        # 2. 检查常规册关键词
-        for keyword in CLASSIFICATION_KEYWORDS["常规册"]:
-            if keyword in name:
-                return "常规册"
-        
-        # 3. 检查生鲜专卡关键词
-        for keyword in CLASSIFICATION_KEYWORDS["生鲜专卡"]:
-            if keyword in name:
-                return "生鲜专卡"
-        
-        # 4. 检查不核算关键词
-        for keyword in CLASSIFICATION_KEYWORDS["不核算"]:
-            if keyword in name:
-                return "不核算"
+        # 1-4. 一次扫描匹配全部关键词，按优先级取结果：
+        # 销售员名字（定制册） > 常规册 > 生鲜专卡 > 不核算
+        matched = self.matcher.match(name)
+        if matched:
+            return matched
         
         # 5. 检查定制册格式（人名+礼包名）- 辅助匹配
         if CUSTOM_BOOK_PATTERN.search(name):
@@ -61,6 +239,57 @@ class ProductClassifier:
         # 规则无法确定
         return None
     
+    def _build_prompt(self, name: str) -> str:
+        """
+        构建单个名称判断的 Prompt
+        
+        Args:
+            name: 礼包名称
+            
+        Returns:
+            Prompt 文本
+        """
+        return f"""请判断以下礼包名称是否属于“生鲜专卡”类别。
+        
+判定标准：
+如果名称中包含肉类（如牛肉、羊肉、猪肉、鸡肉、鸭肉等）、海鲜类（如鱼、虾、蟹、贝等）、水果类等生鲜食品，则属于“生鲜专卡”。
+注意：
+1. 不要把具体的电器、家居用品判定为生鲜。
+2. 实物集采已经由其他规则处理，这里只关注生鲜食品。
+
+名称：{name}
+
+请以 JSON 格式输出：
+{{
+    "产品类型": "生鲜专卡" 或 "待确认",
+    "置信度": 0-1之间的小数,
+    "原因": "简要说明判定原因"
+}}"""
+    
+    def _llm_request(self, name: str) -> Optional[str]:
+        """
+        调用 LLM 判断单个名称是否为生鲜专卡
+        
+        Args:
+            name: 礼包名称
+            
+        Returns:
+            产品类型（生鲜专卡 或 待确认）；调用失败或响应无法解析时返回 None
+        """
+        try:
+            response = self.llm_client.call_api(self._build_prompt(name), system_message=LLM_SYSTEM_MESSAGE)
+            result = self.llm_client.parse_json_response(response)
+        except Exception:
+            return None
+        if not isinstance(result, dict):
+            return None
+        
+        product_type = result.get("产品类型", "待确认")
+        # 确保返回的是有效的产品类型
+        if product_type not in ["生鲜专卡", "待确认"]:
+            product_type = "待确认"
+        return product_type
+    
     def _llm_classify(self, name: str) -> str:
         """
         使用 LLM 判断是否为生鲜专卡
@@ -71,7 +300,7 @@ class ProductClassifier:
         Returns:
             产品类型（生鲜专卡 或 待确认）
         """
-        if self.llm_client is None or getattr(self.llm_client, "available", False) is False:
+        if not self._llm_available():
             s = (name or "").lower()
             heuristics = ["牛肉", "羊肉", "猪肉", "鸡", "鸭", "鱼", "虾", "蟹", "贝", "海鲜", "生鲜", "水果", "和牛"]
             for kw in heuristics:
@@ -79,112 +308,794 @@ class ProductClassifier:
                     return "生鲜专卡"
             return "待确认"
         
-        prompt = f"""请判断以下礼包名称是否属于“生鲜专卡”类别。
+        # LLM 调用失败，返回待确认
+        return self._llm_request(name) or "待确认"
+    
+    def _build_batch_prompt(self, names: Sequence[str]) -> str:
+        """
+        构建多名称批量判断的 Prompt（判定标准只出现一次，结果按序号返回）
         
+        Args:
+            names: 礼包名称列表
+            
+        Returns:
+            Prompt 文本
+        """
+        numbered = "\n".join(
+            f"{i}: {json.dumps(str(name), ensure_ascii=False)}" for i, name in enumerate(names)
+        )
+        return f"""请逐个判断以下礼包名称是否属于“生鲜专卡”类别。
+
 判定标准：
 如果名称中包含肉类（如牛肉、羊肉、猪肉、鸡肉、鸭肉等）、海鲜类（如鱼、虾、蟹、贝等）、水果类等生鲜食品，则属于“生鲜专卡”。
 注意：
 1. 不要把具体的电器、家居用品判定为生鲜。
 2. 实物集采已经由其他规则处理，这里只关注生鲜食品。
 
-名称：{name}
+名称列表（序号: 名称）：
+{numbered}
 
-请以 JSON 格式输出：
-{{
-    "产品类型": "生鲜专卡" 或 "待确认",
-    "置信度": 0-1之间的小数,
-    "原因": "简要说明判定原因"
-}}"""
+请以 JSON 数组格式输出，每个名称一个元素，按序号顺序排列，不要输出其他内容：
+[
+    {{"序号": 0, "产品类型": "生鲜专卡" 或 "待确认"}},
+    ...
+]"""
+    
+    @staticmethod
+    def _match_batch_items(parsed, size: int) -> List[Optional[str]]:
+        """
+        将批量响应按序号对应回各名称
         
-        system_message = "你是一个产品分类专家，擅长识别生鲜食品类礼包。请始终以 JSON 格式输出结果。"
+        Args:
+            parsed: parse_json_response 的解析结果
+            size: 本批名称数量
+            
+        Returns:
+            与名称一一对应的产品类型列表，响应中缺失的名称为 None
+        """
+        if isinstance(parsed, dict):
+            # 兼容 {"结果": [...]} 这类包了一层的响应
+            parsed = next((v for v in parsed.values() if isinstance(v, list)), [])
         
+        results: List[Optional[str]] = [None] * size
+        for item in parsed if isinstance(parsed, list) else []:
+            if not isinstance(item, dict):
+                continue
+            index = item.get("序号")
+            if isinstance(index, str) and index.strip().isdigit():
+                index = int(index)
+            if not isinstance(index, int) or not 0 <= index < size:
+                continue
+            product_type = item.get("产品类型", "待确认")
+            # 确保返回的是有效的产品类型
+            results[index] = product_type if product_type in ("生鲜专卡", "待确认") else "待确认"
+        return results
+    
+    def _llm_classify_batch(self, names: Sequence[str]) -> List[Optional[str]]:
+        """
+        使用一次 LLM 请求判断多个名称是否为生鲜专卡
+        
+        响应格式错误时将批次对半拆分重试，响应中个别名称缺失时只对缺失部分重试；
+        API 调用本身失败时整批返回 None。
+        
+        Args:
+            names: 礼包名称列表
+            
+        Returns:
+            产品类型列表（生鲜专卡 或 待确认，判断失败为 None），与 names 一一对应
+        """
+        if len(names) <= 1:
+            return [self._llm_request(name) for name in names]
+        
+        max_tokens = max(
+            CLASSIFICATION_CONFIG["llm_max_tokens"],
+            CLASSIFICATION_CONFIG.get("llm_batch_item_tokens", 30) * len(names),
+        )
         try:
-            response = self.llm_client.call_api(prompt, system_message=system_message)
-            result = self.llm_client.parse_json_response(response)
+            response = self.llm_client.call_api(
+                self._build_batch_prompt(names), system_message=LLM_SYSTEM_MESSAGE, max_tokens=max_tokens
+            )
+        except Exception:
+            return [None] * len(names)
+        
+        results = self._match_batch_items(self.llm_client.parse_json_response(response), len(names))
+        missing = [i for i, result in enumerate(results) if result is None]
+        if len(missing) == len(names):
+            # 整批响应无法解析：拆成两半分别重试
+            middle = len(names) // 2
+            return self._llm_classify_batch(names[:middle]) + self._llm_classify_batch(names[middle:])
+        if missing:
+            retried = self._llm_classify_batch([names[i] for i in missing])
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results
+    
+    def _llm_available(self) -> bool:
+        """LLM 客户端是否可用"""
+        return self.llm_client is not None and getattr(self.llm_client, "available", False) is not False
+    
+    def _llm_classify_iter(self, names: Sequence[str], llm_budget: Optional[LLMBudget] = None) -> Iterator[Optional[str]]:
+        """
+        对多个礼包名称执行 LLM 判断，按输入顺序逐个产出结果
+        
+        名称按 llm_batch_size 打包成批量 Prompt，最多 llm_max_workers 个批次同时请求（请求速率由
+        LLMClient 的限流器控制），结果顺序始终与输入一致。每个批次发出前检查 LLM 预算，
+        预算用尽后剩余批次不再请求；到达截止时间时不再等待未完成的批次。
+        
+        Args:
+            names: 礼包名称列表
+            llm_budget: 本次运行的 LLM 预算（可选，不提供或未设限制时不限制）
             
-            product_type = result.get("产品类型", "待确认")
-            # 确保返回的是有效的产品类型
-            if product_type not in ["生鲜专卡", "待确认"]:
-                product_type = "待确认"
+        Returns:
+            产品类型迭代器（生鲜专卡 或 待确认，LLM 判断失败为 None，未在预算内判断的为 LLM_SKIPPED）
+        """
+        if not self._llm_available():
+            for name in names:
+                yield self._llm_classify(name)
+            return
+        
+        batch_size = max(1, CLASSIFICATION_CONFIG.get("llm_batch_size", 1))
+        batches = deque(names[i:i + batch_size] for i in range(0, len(names), batch_size))
+        if not batches:
+            return
+        budget = llm_budget if llm_budget is not None and llm_budget.limited else None
+        if budget is not None:
+            budget.start(self.metrics)
+        max_workers = max(1, min(CLASSIFICATION_CONFIG.get("llm_max_workers", 1), len(batches)))
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        # 按批次顺序排队的 (批次, Future)；Future 为 None 表示该批次因预算用尽未请求
+        window = deque()
+        try:
+            while batches or window:
+                in_flight = sum(future is not None and not future.done() for _, future in window)
+                while batches and len(window) < max_workers:
+                    if budget is not None:
+                        if budget.check(in_flight):
+                            window.append((batches.popleft(), None))
+                            continue
+                        if budget.should_wait(in_flight):
+                            break
+                        budget.record_dispatch()
+                    batch = batches.popleft()
+                    window.append((batch, executor.submit(self._llm_classify_batch, batch)))
+                    in_flight += 1
+                
+                batch, future = window.popleft()
+                if future is None:
+                    yield from [LLM_SKIPPED] * len(batch)
+                    continue
+                try:
+                    results = future.result(timeout=budget.remaining_time() if budget is not None else None)
+                except FutureTimeoutError:
+                    budget.expire()
+                    results = [LLM_SKIPPED] * len(batch)
+                else:
+                    if budget is not None:
+                        budget.record_completion()
+                yield from results
+        finally:
+            # 截止时间已到或调用方提前结束时不等待未完成的请求
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _llm_classify_shared(self, names: Sequence, llm_budget: Optional[LLMBudget] = None) -> Iterator[Optional[str]]:
+        """
+        经 single-flight 合并后执行 LLM 判断，按输入顺序逐个产出结果
+        
+        其他调用方正在判断的名称不再重复请求，等待其结果；最近判断失败的名称在 llm_failure_ttl 内
+        直接返回 None。本调用方负责的名称（leader）照常按批次并发请求。
+        
+        Args:
+            names: 礼包名称列表（不含重复）
+            llm_budget: 本次运行的 LLM 预算（可选）
             
-            return product_type
-        except Exception as e:
-            # LLM 调用失败，返回待确认
-            return "待确认"
+        Returns:
+            产品类型迭代器（生鲜专卡 或 待确认，LLM 判断失败为 None）
+        """
+        if not self._llm_available():
+            yield from self._llm_classify_iter(names, llm_budget)
+            return
+        
+        claims = [self.single_flight.acquire(name) for name in names]
+        leader_names = [name for name, (_, is_leader) in zip(names, claims) if is_leader]
+        self.metrics.incr("llm_single_flight_shared", len(names) - len(leader_names))
+        leader_results = zip(leader_names, self._llm_classify_iter(leader_names, llm_budget))
+        
+        def resolve_next_leader() -> bool:
+            item = next(leader_results, None)
+            if item is None:
+                return False
+            name, result = item
+            self.single_flight.resolve(name, result, failed=result is None)
+            return True
+        
+        try:
+            for future, _ in claims:
+                # 等待其他调用方之前先把自己负责的名称推进完，避免互相等待
+                while not future.done() and resolve_next_leader():
+                    pass
+                yield future.result()
+        finally:
+            # 提前结束（异常或调用方不再迭代）时释放仍未完成的名称，不让其他调用方一直等待
+            for name, (future, is_leader) in zip(names, claims):
+                if is_leader and not future.done():
+                    self.single_flight.resolve(name, None)
     
-    def classify_product_type(self, name: str, sales_order_type: Optional[str] = None) -> str:
+    def _similar_labels(self, names: Sequence) -> Dict:
         """
-        分类单个产品类型
+        在相似度索引中查找足够相似的已分类名称
+        
+        Args:
+            names: 礼包名称列表
+            
+        Returns:
+            {礼包名称: 相似名称的产品类型}，只包含相似度达到 similarity_threshold、
+            且相似名称的类型为 LLM 阶段可能给出的类型（生鲜专卡 / 待确认）的名称
+        """
+        if self.similarity_index is None or not len(self.similarity_index):
+            return {}
+        candidates = [name for name in names if isinstance(name, str)]
+        if not candidates:
+            return {}
+        with self.metrics.stage("classify.similarity"):
+            labels = self.similarity_index.lookup(candidates, CLASSIFICATION_CONFIG.get("similarity_threshold", 0.9))
+        similar = {name: label for name, label in zip(candidates, labels) if label in LLM_PRODUCT_TYPES}
+        self.metrics.incr("similarity_hits", len(similar))
+        return similar
+    
+    def _resolve_with_llm(self, names: Sequence, llm_budget: LLMBudget) -> Iterator[str]:
+        """
+        规则无法确定的名称：依次查持久化缓存、相似度索引，仍无法确定的再交给 LLM，按输入顺序产出结果
+        
+        LLM 成功判断的结果写回持久化缓存并加入相似度索引；调用失败和超出 LLM 预算的名称记为待确认且不写入，
+        下次运行会重试（超出预算的名称记录在 llm_budget.skipped）。由相似名称得到的结果不写回，
+        避免误差沿相似链传播。
+        
+        Args:
+            names: 礼包名称列表（不含重复）
+            llm_budget: 本次运行的 LLM 预算
+            
+        Returns:
+            产品类型迭代器（生鲜专卡 或 待确认）
+        """
+        persisted = self.persistent_cache.get_many(names) if self.persistent_cache is not None else {}
+        if self.persistent_cache is not None:
+            self.metrics.incr("persistent_cache_hits", len(persisted))
+            self.metrics.incr("persistent_cache_misses", len(names) - len(persisted))
+        if persisted:
+            print(f"  持久化缓存命中 {len(persisted)}/{len(names)} 个名称")
+        
+        similar = self._similar_labels([name for name in names if name not in persisted])
+        if similar:
+            print(f"  相似名称命中 {len(similar)} 个名称")
+        
+        llm_results = self._llm_classify_shared(
+            [name for name in names if name not in persisted and name not in similar], llm_budget
+        )
+        new_entries = {}
+        try:
+            for name in names:
+                llm_budget.skipped.discard(name)
+                if name in persisted:
+                    yield persisted[name]
+                    continue
+                if name in similar:
+                    yield similar[name]
+                    continue
+                result = next(llm_results)
+                if result is LLM_SKIPPED:
+                    llm_budget.skipped.add(name)
+                    self.metrics.incr("llm_budget_skipped_names")
+                    yield "待确认"
+                    continue
+                if result is None:
+                    self.metrics.incr("llm_failed_names")
+                    yield "待确认"
+                    continue
+                if self._llm_available():
+                    new_entries[name] = result
+                yield result
+        finally:
+            if new_entries:
+                if self.persistent_cache is not None:
+                    self.persistent_cache.set_many(new_entries)
+                self.add_known_names(list(new_entries), list(new_entries.values()))
+    
+    def _resolve_with_checkpoint(
+        self,
+        names: Sequence,
+        llm_budget: LLMBudget,
+        checkpoint: Optional[ClassificationCheckpoint] = None,
+        replay: bool = False,
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        规则无法确定的名称：检查点中已记录的直接沿用，其余交给 _resolve_with_llm，新结果记入检查点
+        
+        Args:
+            names: 礼包名称列表（不含重复）
+            llm_budget: 本次运行的 LLM 预算
+            checkpoint: 检查点（可选）
+            replay: 是否只用检查点（重建检查点位置之前的行，不调用 LLM；检查点中没有的名称记为待确认）
+            
+        Returns:
+            (礼包名称, 产品类型) 迭代器，按输入顺序
+        """
+        if checkpoint is None:
+            yield from zip(names, self._resolve_with_llm(names, llm_budget))
+            return
+        
+        known = checkpoint.resolved
+        remaining = [] if replay else [name for name in names if name not in known]
+        if len(remaining) < len(names):
+            self.metrics.incr("checkpoint_reused_names", len(names) - len(remaining))
+        llm_results = self._resolve_with_llm(remaining, llm_budget)
+        for name in names:
+            if name in known:
+                yield name, known[name]
+            elif replay:
+                yield name, "待确认"
+            else:
+                result = next(llm_results)
+                # 超出预算的名称不记入检查点，继续运行时重新判断
+                if isinstance(name, str) and name not in llm_budget.skipped:
+                    checkpoint.record(name, result)
+                yield name, result
+    
+    def _cache_key(self, name: str, sales_order_type: Optional[str] = None) -> str:
+        """生成分类缓存 key"""
+        return f"{name}|{sales_order_type}" if sales_order_type else name
+    
+    def _classify_without_llm(self, name: str, sales_order_type: Optional[str] = None) -> Optional[str]:
+        """
+        仅使用缓存和规则分类
         
         Args:
             name: 礼包名称
             sales_order_type: 销售单类型
             
         Returns:
-            产品类型：常规册、生鲜专卡、不核算、定制册、实物集采、待确认
+            产品类型，需要 LLM 判断时返回 None
         """
-        # 注意：如果引入了 sales_order_type，缓存 key 应该包含它，或者只在 sales_order_type 为空时使用简单缓存
-        # 为简单起见，如果提供了 sales_order_type 且为实物集采，直接处理不查缓存
+        # 实物集采由销售单类型直接决定，不查缓存
         if sales_order_type == "实物集采":
             return "实物集采"
-
-        # 检查缓存 (仅当没有特殊销售单类型或类型不影响规则时)
-        # 这里的简化处理：如果 sales_order_type 存在，可能会影响结果，所以暂时跳过缓存或组合 key
-        # 为了安全，如果有 sales_order_type，先跳过缓存，或者 key = f"{name}|{sales_order_type}"
-        cache_key = f"{name}|{sales_order_type}" if sales_order_type else name
         
+        cache_key = self._cache_key(name, sales_order_type)
         if self.cache is not None and cache_key in self.cache:
             return self.cache[cache_key]
         
-        # 先尝试规则匹配
         rule_result = self._rule_based_classify(name, sales_order_type)
-        if rule_result:
-            result = rule_result
-        else:
-            # 规则无法确定，使用 LLM 判断是否为生鲜专卡
-            result = self._llm_classify(name)
+        if rule_result and self.cache is not None:
+            self.cache[cache_key] = rule_result
+        return rule_result
+    
+    def classify_product_type(
+        self,
+        name: str,
+        sales_order_type: Optional[str] = None,
+        llm_budget: Optional[LLMBudget] = None,
+    ) -> str:
+        """
+        分类单个产品类型
         
-        # 缓存结果
-        if self.cache is not None:
-            self.cache[cache_key] = result
+        Args:
+            name: 礼包名称
+            sales_order_type: 销售单类型
+            llm_budget: LLM 预算（可选，默认按配置新建）
+            
+        Returns:
+            产品类型：常规册、生鲜专卡、不核算、定制册、实物集采、待确认
+        """
+        result = self._classify_without_llm(name, sales_order_type)
+        if result:
+            return result
         
+        # 规则无法确定，使用 LLM 判断是否为生鲜专卡
+        if llm_budget is None:
+            llm_budget = LLMBudget.from_config()
+        result = list(self._resolve_with_llm([name], llm_budget))[0]
+        if self.cache is not None and name not in llm_budget.skipped:
+            self.cache[self._cache_key(name, sales_order_type)] = result
         return result
     
-    def classify_batch(self, names: List[str], sales_order_types: Optional[List[str]] = None) -> List[str]:
+    @staticmethod
+    def _factorize_pairs(names: Sequence, sales_order_types: Optional[Sequence] = None):
+        """
+        将 (礼包名称, 销售单类型) 组合去重编码
+        
+        Args:
+            names: 礼包名称序列
+            sales_order_types: 销售单类型序列（可选）
+            
+        Returns:
+            (codes, unique_names, unique_types)：codes 为每行对应的组合编号，
+            unique_names/unique_types 为去重后的组合（按首次出现顺序）
+        """
+        name_codes, name_uniques = pd.factorize(np.asarray(names, dtype=object), use_na_sentinel=False)
+        name_uniques = np.asarray(name_uniques, dtype=object)
+        if sales_order_types is None:
+            return name_codes, name_uniques, np.full(len(name_uniques), None, dtype=object)
+        
+        type_codes, type_uniques = pd.factorize(np.asarray(sales_order_types, dtype=object), use_na_sentinel=False)
+        type_uniques = np.asarray(type_uniques, dtype=object)
+        # 两列编码合成一个整数键后再去重一次
+        width = max(len(type_uniques), 1)
+        pair_keys = name_codes.astype(np.int64) * width + type_codes
+        codes, pair_uniques = pd.factorize(pair_keys)
+        return codes, name_uniques[pair_uniques // width], type_uniques[pair_uniques % width]
+    
+    def _classify_unique_pairs(self, unique_names: np.ndarray, unique_types: np.ndarray):
+        """
+        用缓存和规则分类去重后的组合
+        
+        Returns:
+            (unique_results, pending)：unique_results 中规则无法确定的位置为 None，
+            pending 为 {礼包名称: 对应的组合下标列表}
+        """
+        unique_results = np.empty(len(unique_names), dtype=object)
+        pending: Dict[str, List[int]] = {}
+        with self.metrics.stage("classify.rules"):
+            codes = self._parallel_rule_codes(unique_names, unique_types)
+            if codes is None:
+                for i, (name, s_type) in enumerate(zip(unique_names, unique_types)):
+                    result = self._classify_without_llm(name, s_type)
+                    if result:
+                        unique_results[i] = result
+                    else:
+                        pending.setdefault(name, []).append(i)
+            else:
+                unique_results = self._apply_rule_codes(unique_names, unique_types, codes)
+                for i in np.flatnonzero(codes < 0):
+                    pending.setdefault(unique_names[i], []).append(i)
+        
+        resolved = len(unique_names) - sum(len(indices) for indices in pending.values())
+        self.metrics.incr("unique_pairs", len(unique_names))
+        self.metrics.incr("rule_resolved", resolved)
+        self.metrics.incr("llm_fallback", len(unique_names) - resolved)
+        return unique_results, pending
+    
+    def _parallel_rule_codes(self, unique_names: np.ndarray, unique_types: np.ndarray) -> Optional[np.ndarray]:
+        """
+        在多个进程中用缓存和规则分类去重后的组合（rule_workers 大于 1 且组合数达到 rule_parallel_min_names 时）
+        
+        组合按 rule_workers × 4 个分片分发，结果按分片顺序合并。子进程由 fork 创建，直接继承已构建的
+        关键词匹配器、当前的缓存和组合数组，不随任务序列化；不支持 fork 的平台在当前进程中串行分类。
+        
+        Returns:
+            产品类型编码数组（与 unique_names 等长，-1 表示需要 LLM 判断），不并行时返回 None
+        """
+        total = len(unique_names)
+        workers = _rule_worker_count(total)
+        if workers > 1 and self.cache:
+            # 已在缓存中的组合（如 classify_iter 预先并行写入的）只需查缓存，按其余的组合数决定是否并行
+            missing = sum(self._cache_key(name, s_type) not in self.cache for name, s_type in zip(unique_names, unique_types))
+            workers = _rule_worker_count(missing)
+        if workers <= 1:
+            return None
+        
+        global _RULE_SHARD_STATE
+        shard_size = -(-total // (workers * 4))
+        starts = list(range(0, total, shard_size))
+        ends = [min(start + shard_size, total) for start in starts]
+        with _RULE_SHARD_LOCK:
+            _RULE_SHARD_STATE = (self._classify_without_llm, unique_names, unique_types)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+                    codes = np.concatenate(list(executor.map(_match_rule_shard, starts, ends)))
+            finally:
+                _RULE_SHARD_STATE = None
+        self.metrics.incr("rule_parallel_runs")
+        self.metrics.incr("rule_shards", len(starts))
+        return codes
+    
+    def _apply_rule_codes(self, unique_names: np.ndarray, unique_types: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        将并行分类的编码转换为产品类型数组，并把结果写回缓存（子进程中写入的缓存不会带回）
+        
+        Returns:
+            产品类型数组（与 unique_names 等长），需要 LLM 判断的位置为 None
+        """
+        # 编码 -1 取到末尾的 None
+        unique_results = np.append(np.asarray(PRODUCT_TYPE_DTYPE.categories, dtype=object), None)[codes]
+        if self.cache is not None:
+            # 实物集采不写入缓存，与串行一致
+            cached = (codes >= 0) & (unique_types != "实物集采")
+            self.cache.update(
+                (self._cache_key(name, s_type), result)
+                for name, s_type, result in zip(unique_names[cached], unique_types[cached], unique_results[cached])
+            )
+        return unique_results
+    
+    def _prefill_rule_cache(self, names: np.ndarray, sales_order_types: Optional[np.ndarray] = None) -> None:
+        """
+        分块分类前先对整个输入并行运行规则分类并写入缓存
+        
+        每块只有 checkpoint_chunk_rows 行，块内的组合数通常达不到并行的门槛；预先写入缓存后，
+        各块的规则阶段只需查缓存。未启用缓存或不需要并行时不做任何事。
+        """
+        if self.cache is None or _rule_worker_count(len(names)) <= 1:
+            return
+        with self.metrics.stage("classify.dedupe"):
+            _, unique_names, unique_types = self._factorize_pairs(names, sales_order_types)
+        with self.metrics.stage("classify.rules"):
+            codes = self._parallel_rule_codes(unique_names, unique_types)
+            if codes is not None:
+                self._apply_rule_codes(unique_names, unique_types, codes)
+    
+    def classify_rules(self, names: Sequence, sales_order_types: Optional[Sequence] = None) -> np.ndarray:
+        """
+        只用缓存和规则批量分类（不调用 LLM），可在多个进程中并行执行
+        
+        Args:
+            names: 礼包名称序列
+            sales_order_types: 销售单类型序列 (与 names 对应)
+            
+        Returns:
+            产品类型数组（与 names 等长），规则无法确定的行为 None
+        """
+        with self.metrics.stage("classify.dedupe"):
+            codes, unique_names, unique_types = self._factorize_pairs(names, sales_order_types)
+        unique_results, _ = self._classify_unique_pairs(unique_names, unique_types)
+        self.metrics.incr("rows", len(codes))
+        return unique_results[codes]
+    
+    def resolve_pending(
+        self,
+        names: Sequence,
+        priority_weights: Optional[Sequence] = None,
+        llm_budget: Optional[LLMBudget] = None,
+    ) -> Dict[str, str]:
+        """
+        对规则无法确定的名称执行持久化缓存查询和 LLM 判断（同名只判断一次）
+        
+        名称按 llm_priority 排序后再判断（出现行数或金额合计高的优先），LLM 预算用尽时剩余名称记为待确认。
+        
+        Args:
+            names: 礼包名称列表（可含重复，如多个文件汇总而来，每个元素对应一行）
+            priority_weights: 与 names 对应的每行权重（可选，如金额；不提供时按行数）
+            llm_budget: LLM 预算（可选，默认按配置新建）
+            
+        Returns:
+            {礼包名称: 产品类型}
+        """
+        if llm_budget is None:
+            llm_budget = LLMBudget.from_config()
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        unique_names = list(uniques)
+        row_counts = np.bincount(codes[codes >= 0], minlength=len(unique_names))
+        weights = self._priority_weights(codes, len(unique_names), priority_weights)
+        if weights is not None:
+            unique_names = self._order_by_priority(unique_names, weights)
+        self.metrics.incr("llm_pending_names", len(unique_names))
+        with self.metrics.stage("classify.llm"):
+            resolved = dict(zip(unique_names, self._resolve_with_llm(unique_names, llm_budget)))
+        self._report_budget_skipped(
+            {name: count for name, count in zip(uniques, row_counts) if name in llm_budget.skipped}, llm_budget
+        )
+        return resolved
+    
+    @staticmethod
+    def _priority_weights(codes: np.ndarray, size: int, priority_weights: Optional[Sequence] = None) -> Optional[np.ndarray]:
+        """
+        按 llm_priority 计算每个编码（组合或名称）的优先级权重
+        
+        Args:
+            codes: 每行对应的编码（-1 表示缺失，不计入）
+            size: 编码总数
+            priority_weights: 每行权重（可选，不提供时按行数）
+            
+        Returns:
+            长度为 size 的权重数组；llm_priority 为 None 时返回 None（保持原顺序）
+        """
+        if not CLASSIFICATION_CONFIG.get("llm_priority"):
+            return None
+        valid = codes >= 0
+        weights = None
+        if priority_weights is not None:
+            weights = pd.to_numeric(pd.Series(np.asarray(priority_weights, dtype=object)), errors="coerce")
+            weights = weights.fillna(0).to_numpy(dtype=np.float64)[valid]
+        return np.bincount(codes[valid], weights=weights, minlength=size).astype(np.float64)
+    
+    @staticmethod
+    def _order_by_priority(names: Sequence, weights: Sequence) -> list:
+        """按权重从高到低排序（权重相同时保持原顺序）"""
+        order = np.argsort(-np.asarray(weights, dtype=np.float64), kind="stable")
+        return [names[i] for i in order]
+    
+    def _report_budget_skipped(self, skipped_rows: Dict[str, int], llm_budget: LLMBudget) -> None:
+        """
+        打印并记录因 LLM 预算用尽而未判断的名称和行数
+        
+        Args:
+            skipped_rows: {未判断的名称: 对应的行数}
+            llm_budget: 本次运行的 LLM 预算（用于说明用尽的原因）
+        """
+        if not skipped_rows:
+            return
+        rows = int(sum(skipped_rows.values()))
+        self.metrics.incr("llm_budget_uncovered_rows", rows)
+        print(
+            f"  LLM 预算用尽（{llm_budget.reason}）：{len(skipped_rows)} 个名称、{rows} 行未判断，记为待确认"
+        )
+    
+    def classify_batch(
+        self,
+        names: Sequence,
+        sales_order_types: Optional[Sequence] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        priority_weights: Optional[Sequence] = None,
+        checkpoint: Optional[ClassificationCheckpoint] = None,
+        replay: bool = False,
+        llm_budget: Optional[LLMBudget] = None,
+    ) -> pd.Categorical:
         """
         批量分类产品类型
         
+        相同的 (礼包名称, 销售单类型) 组合只分类一次，再按行广播回结果。结果为固定类别的
+        Categorical（每行一个 int8 编码），不为每行创建字符串对象。
+        规则无法确定的名称按 llm_priority 排序后交给 LLM（影响行数或金额大的优先），
+        LLM 预算用尽时剩余名称记为待确认，并报告未覆盖的行数。
+        
         Args:
-            names: 礼包名称列表
-            sales_order_types: 销售单类型列表 (与 names 对应)
+            names: 礼包名称序列（list / Series / ndarray）
+            sales_order_types: 销售单类型序列 (与 names 对应)
+            progress_callback: 进度回调 callback(已完成组合数, 组合总数)（可选）
+            priority_weights: 与 names 对应的每行权重（可选，如金额；不提供时按行数排序）
+            checkpoint: 检查点（可选）：已记录的名称直接沿用，LLM 新判断的名称记入检查点
+            replay: 只用规则和检查点分类、不调用 LLM（重建检查点位置之前的行）
+            llm_budget: LLM 预算（可选，默认按配置新建；多次调用共用同一预算时由调用方传入）
             
         Returns:
-            产品类型列表
+            产品类型 Categorical（与 names 等长，dtype 为 PRODUCT_TYPE_DTYPE）
         """
-        results = []
         total = len(names)
+        if llm_budget is None:
+            llm_budget = LLMBudget.from_config()
         
-        if sales_order_types and len(sales_order_types) != total:
+        if sales_order_types is not None and len(sales_order_types) != total:
             print(f"警告: 销售单类型列表长度 ({len(sales_order_types)}) 与礼包名称列表长度 ({total}) 不匹配，将忽略销售单类型")
             sales_order_types = None
         
         print(f"开始批量分类，共 {total} 条记录...")
         
-        for i, name in enumerate(names, 1):
-            if i % 100 == 0 or i == total:
-                print(f"  处理进度: {i}/{total}")
-            
-            s_type = sales_order_types[i-1] if sales_order_types else None
-            product_type = self.classify_product_type(name, s_type)
-            results.append(product_type)
+        with self.metrics.stage("classify.dedupe"):
+            codes, unique_names, unique_types = self._factorize_pairs(names, sales_order_types)
+        unique_total = len(unique_names)
+        print(f"  去重后共 {unique_total} 个不同的礼包名称/销售单类型组合")
+        
+        # 先用缓存和规则分类，规则无法确定的名称汇总后统一交给 LLM（同名只请求一次）
+        unique_results, pending = self._classify_unique_pairs(unique_names, unique_types)
+        done = unique_total - sum(len(indices) for indices in pending.values())
+        self.metrics.incr("rows", total)
+        self.metrics.incr("llm_pending_names", len(pending))
+        print(f"  规则匹配完成: {done}/{unique_total}，待 LLM 判断 {len(pending)} 个名称")
+        if progress_callback is not None:
+            progress_callback(done, unique_total)
+        
+        pending_names = list(pending)
+        pair_weights = self._priority_weights(codes, unique_total, priority_weights)
+        if pair_weights is not None:
+            pending_names = self._order_by_priority(
+                pending_names, [pair_weights[pending[name]].sum() for name in pending_names]
+            )
+        with self.metrics.stage("classify.llm"):
+            for j, (name, result) in enumerate(self._resolve_with_checkpoint(pending_names, llm_budget, checkpoint, replay), 1):
+                # 超出预算的名称不写入分类缓存，之后（如新的预算）还可以再判断
+                cacheable = self.cache is not None and name not in llm_budget.skipped
+                for i in pending[name]:
+                    unique_results[i] = result
+                    if cacheable:
+                        self.cache[self._cache_key(name, unique_types[i])] = result
+                done += len(pending[name])
+                if j % 100 == 0 or j == len(pending):
+                    print(f"  LLM 判断进度: {j}/{len(pending)}")
+                if progress_callback is not None:
+                    progress_callback(done, unique_total)
+        
+        skipped = [name for name in pending if name in llm_budget.skipped]
+        if skipped:
+            pair_rows = np.bincount(codes, minlength=unique_total)
+            self._report_budget_skipped({name: int(pair_rows[pending[name]].sum()) for name in skipped}, llm_budget)
         
+        unique_codes = as_product_type_categorical(unique_results).codes
+        results = pd.Categorical.from_codes(unique_codes[codes], dtype=PRODUCT_TYPE_DTYPE)
         print(f"批量分类完成，共处理 {len(results)} 条记录")
         
+        if self.persistent_cache is not None:
+            cache_stats = self.persistent_cache.stats()
+            print(
+                f"持久化缓存: 命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次，"
+                f"共 {cache_stats['entries']} 条记录"
+            )
+        
         # 统计分类结果
-        from collections import Counter
-        stats = Counter(results)
+        stats = pd.Series(results).value_counts(sort=False)
         print("\n分类统计:")
-        for product_type, count in stats.items():
+        for product_type, count in stats[stats > 0].items():
             print(f"  {product_type}: {count} 条")
         
         return results
+    
+    def classify_iter(
+        self,
+        names: Sequence,
+        sales_order_types: Optional[Sequence] = None,
+        chunk_size: Optional[int] = None,
+        checkpoint: Optional[ClassificationCheckpoint] = None,
+        priority_weights: Optional[Sequence] = None,
+        llm_budget: Optional[LLMBudget] = None,
+    ) -> Iterator[Tuple[int, pd.Categorical]]:
+        """
+        分块分类，每块完成后立即按行顺序产出结果（不必等全部行完成）
+        
+        每块调用一次 classify_batch（分类缓存在各块之间共享，LLM 判断顺序按块内的影响行数排序）。
+        提供检查点时先按输入指纹绑定：已记录的名称直接沿用；检查点位置之前的块只用规则和检查点重建、
+        不调用 LLM，与中断前的结果一致；之后每块完成时推进检查点位置。
+        LLM 预算设置了限制时，先对整个输入调用一次 classify_batch（待判断的名称按全部行的影响排序、
+        预算按整个输入分配，未覆盖的行只报告一次），再按块产出结果；判断过程中已判断的名称仍记入检查点。
+        
+        Args:
+            names: 礼包名称序列
+            sales_order_types: 销售单类型序列 (与 names 对应)
+            chunk_size: 每块的行数（可选，默认使用 checkpoint_chunk_rows 配置）
+            checkpoint: 检查点（可选）
+            priority_weights: 与 names 对应的每行权重（可选，如金额；不提供时按行数排序）
+            llm_budget: LLM 预算（可选，默认按配置新建；所有块共用）
+            
+        Returns:
+            (块的起始行号, 该块的产品类型 Categorical) 迭代器
+        """
+        total = len(names)
+        if sales_order_types is not None and len(sales_order_types) != total:
+            print(f"警告: 销售单类型列表长度 ({len(sales_order_types)}) 与礼包名称列表长度 ({total}) 不匹配，将忽略销售单类型")
+            sales_order_types = None
+        names = np.asarray(names, dtype=object)
+        if sales_order_types is not None:
+            sales_order_types = np.asarray(sales_order_types, dtype=object)
+        if priority_weights is not None:
+            priority_weights = np.asarray(priority_weights)
+        chunk_size = max(1, chunk_size or CLASSIFICATION_CONFIG.get("checkpoint_chunk_rows") or total)
+        if llm_budget is None:
+            llm_budget = LLMBudget.from_config()
+        
+        if checkpoint is not None:
+            checkpoint.bind(input_fingerprint(names, sales_order_types, self.rules_version()))
+        
+        try:
+            if llm_budget.limited and total > chunk_size:
+                # 逐块排序时靠前的块会先用完预算，影响更大的名称可能在后面的块中
+                product_types = self.classify_batch(
+                    names,
+                    sales_order_types=sales_order_types,
+                    priority_weights=priority_weights,
+                    checkpoint=checkpoint,
+                    replay=checkpoint is not None and total <= checkpoint.position,
+                    llm_budget=llm_budget,
+                )
+                for start in range(0, total, chunk_size):
+                    end = min(start + chunk_size, total)
+                    if checkpoint is not None:
+                        checkpoint.advance(end)
+                    yield start, product_types[start:end]
+                return
+            
+            if total > chunk_size:
+                self._prefill_rule_cache(names, sales_order_types)
+            for start in range(0, total, chunk_size):
+                end = min(start + chunk_size, total)
+                replay = checkpoint is not None and end <= checkpoint.position
+                product_types = self.classify_batch(
+                    names[start:end],
+                    sales_order_types=sales_order_types[start:end] if sales_order_types is not None else None,
+                    priority_weights=priority_weights[start:end] if priority_weights is not None else None,
+                    checkpoint=checkpoint,
+                    replay=replay,
+                    llm_budget=llm_budget,
+                )
+                if checkpoint is not None and not replay:
+                    checkpoint.advance(end)
+                yield start, product_types
+        finally:
+            # 正常结束、出错或被中断时都写入最新进度
+            if checkpoint is not None:
+                checkpoint.save()
@@ -0,0 +1,78 @@
+"""
+限流模块 - 按请求数/秒与 token 数/分钟限制 LLM API 调用速率
+"""
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    令牌桶限流器（线程安全）
+
+    同时维护两个令牌桶：请求桶（requests_per_second）和 token 桶（tokens_per_minute），
+    两者都有余量时才放行。未配置的限制视为不限。
+    """
+
+    def __init__(self, requests_per_second: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        Args:
+            requests_per_second: 每秒最多请求数（可选）
+            tokens_per_minute: 每分钟最多 token 数（可选）
+        """
+        self.requests_per_second = requests_per_second or None
+        self.tokens_per_minute = tokens_per_minute or None
+        # 桶容量：请求桶允许 1 秒的突发，token 桶允许 1 分钟的突发
+        self._request_allowance = float(self.requests_per_second or 0)
+        self._token_allowance = float(self.tokens_per_minute or 0)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        self._last = now
+        if self.requests_per_second:
+            self._request_allowance = min(
+                float(self.requests_per_second),
+                self._request_allowance + elapsed * self.requests_per_second,
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        阻塞直到允许发出一次请求
+
+        Args:
+            tokens: 本次请求预计消耗的 token 数
+
+        Returns:
+            因限流等待的秒数
+        """
+        if not self.requests_per_second and not self.tokens_per_minute:
+            return 0.0
+
+        if self.tokens_per_minute:
+            # 单次请求超过桶容量时按容量计，避免永远等待
+            tokens = min(tokens, self.tokens_per_minute)
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                wait = 0.0
+                if self.requests_per_second and self._request_allowance < 1:
+                    wait = max(wait, (1 - self._request_allowance) / self.requests_per_second)
+                if self.tokens_per_minute and self._token_allowance < tokens:
+                    wait = max(wait, (tokens - self._token_allowance) * 60.0 / self.tokens_per_minute)
+                if wait <= 0:
+                    if self.requests_per_second:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    return waited
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,297 @@
+"""
+分类服务模块 - 常驻进程提供 HTTP 分类接口
+
+命令行每次运行都要启动解释器、加载配置、从冷缓存开始；服务常驻运行，分类器的内存缓存、
+相似度索引、持久化缓存连接和 LLM keep-alive 连接池在请求之间复用。
+
+接口（JSON）:
+    POST /classify  {"names": [...], "sales_order_types": [...]} -> {"product_types": [...]}
+    GET  /health    服务状态（运行时长、LLM 是否可用、缓存条数）
+    GET  /metrics   累计运行指标（与 <结果文件名>.metrics.json 格式相同）
+
+用法:
+    python -m src.service --port 8780
+    python -m src.main sales_jan.xlsx --service-url http://127.0.0.1:8780
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+import requests
+from .config import SERVICE_CONFIG
+from .llm_budget import LLMBudget
+from .llm_client import LLMClient
+from .metrics import RunMetrics
+from .product_classifier import PRODUCT_TYPE_DTYPE, ProductClassifier, as_product_type_categorical
+
+
+def _json_values(values: Sequence) -> List[Any]:
+    """转换为可 JSON 序列化的列表（缺失值为 None，numpy 标量转为 Python 类型）"""
+    series = pd.Series(np.asarray(values, dtype=object), dtype=object)
+    return series.where(series.notna(), None).tolist()
+
+
+class ClassificationService:
+    """
+    常驻的分类服务
+
+    所有请求共用一个 ProductClassifier：内存缓存、相似度索引和 LLM 连接池跨请求保持，
+    同一名称被并发请求时由 SingleFlight 合并为一次 LLM 请求。运行指标在服务生命周期内累计。
+    LLM 预算（llm_budget_*）按一次运行计算，不适用于常驻服务，服务端不设预算。
+    """
+
+    def __init__(self, product_classifier: Optional[ProductClassifier] = None):
+        """
+        Args:
+            product_classifier: 分类器（可选，默认创建带 LLM 客户端的分类器）
+        """
+        if product_classifier is None:
+            metrics = RunMetrics()
+            product_classifier = ProductClassifier(LLMClient(metrics=metrics), metrics=metrics)
+        self.product_classifier = product_classifier
+        self.metrics = product_classifier.metrics
+        self.started_at = time.time()
+
+    def classify(self, names: Sequence, sales_order_types: Optional[Sequence] = None) -> List[str]:
+        """
+        批量分类
+
+        Args:
+            names: 礼包名称列表
+            sales_order_types: 销售单类型列表（与 names 对应，可选）
+
+        Returns:
+            产品类型列表（与 names 等长）
+
+        Raises:
+            ValueError: 如果请求的名称数超过上限或两个列表长度不一致
+        """
+        max_names = SERVICE_CONFIG.get("max_request_names")
+        if max_names and len(names) > max_names:
+            raise ValueError(f"每次请求最多 {max_names} 个名称，实际 {len(names)} 个")
+        if sales_order_types is not None and len(sales_order_types) != len(names):
+            raise ValueError(f"sales_order_types 长度 ({len(sales_order_types)}) 与 names 长度 ({len(names)}) 不一致")
+        with self.metrics.stage("service.classify"):
+            product_types = self.product_classifier.classify_batch(names, sales_order_types, llm_budget=LLMBudget())
+        self.metrics.incr("service_requests")
+        self.metrics.incr("service_names", len(names))
+        return np.asarray(product_types, dtype=object).tolist()
+
+    def health(self) -> Dict[str, Any]:
+        """服务状态"""
+        classifier = self.product_classifier
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "llm_available": classifier.llm_client is not None and bool(classifier.llm_client.available),
+            "memory_cache_entries": len(classifier.cache) if classifier.cache is not None else 0,
+            "persistent_cache_entries": (
+                classifier.persistent_cache.stats()["entries"] if classifier.persistent_cache is not None else 0
+            ),
+            "similarity_index_entries": len(classifier.similarity_index) if classifier.similarity_index is not None else 0,
+            "requests": int(self.metrics.counters.get("service_requests", 0)),
+        }
+
+
+class ClassificationServer(ThreadingHTTPServer):
+    """分类服务的 HTTP 服务器（每个请求一个线程）"""
+
+    daemon_threads = True
+
+    def __init__(self, service: ClassificationService, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            service: 分类服务
+            host: 监听地址
+            port: 监听端口（0 表示自动分配）
+        """
+        super().__init__((host, port), _Handler)
+        self.service = service
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ClassificationServer":
+        """在后台线程中启动服务"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: ClassificationServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send_json(200, self.server.service.health())
+        elif path == "/metrics":
+            self._send_json(200, self.server.service.metrics.to_dict())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") != "/classify":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("请求体必须是 JSON 对象")
+            names = request.get("names")
+            if not isinstance(names, list):
+                raise ValueError("请求中缺少 names 列表")
+            product_types = self.server.service.classify(names, request.get("sales_order_types"))
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            print(f"  错误: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"product_types": product_types})
+
+
+class ServiceClassifier:
+    """
+    分类服务的客户端
+
+    提供与 ProductClassifier.classify_batch 相同的接口，可作为分类流程的后端（classify_products 的 service_url）。
+    相同的 (礼包名称, 销售单类型) 组合在本地去重后只发送一次，再按行广播回结果；
+    规则、缓存、相似度索引和 LLM 判断都在服务端完成，LLM 预算由服务端控制。
+    """
+
+    def __init__(self, base_url: str, metrics: Optional[RunMetrics] = None, timeout: Optional[float] = None):
+        """
+        Args:
+            base_url: 服务地址（如 http://127.0.0.1:8780）
+            metrics: 运行指标收集器（可选）
+            timeout: 每次请求的超时（秒，可选，默认使用 SERVICE_CONFIG 中的配置）
+        """
+        self.base_url = base_url.rstrip("/")
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.timeout = timeout or SERVICE_CONFIG.get("client_timeout")
+        self.session = requests.Session()
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+    def health(self) -> Dict[str, Any]:
+        """查询服务状态"""
+        response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def add_known_names(self, names: Sequence, product_types: Sequence) -> int:
+        """服务端维护自己的相似度索引，本地不载入已分类名称"""
+        return 0
+
+    def _request(self, names: List[Any], sales_order_types: List[Any]) -> List[str]:
+        """发送一次分类请求"""
+        started = time.perf_counter()
+        response = self.session.post(
+            f"{self.base_url}/classify",
+            json={"names": names, "sales_order_types": sales_order_types},
+            timeout=self.timeout,
+        )
+        self.metrics.observe("service_latency_seconds", time.perf_counter() - started)
+        self.metrics.incr("service_requests")
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error")
+            except ValueError:
+                message = response.text
+            raise RuntimeError(f"分类服务返回错误 ({response.status_code}): {message}")
+        return response.json()["product_types"]
+
+    def classify_batch(
+        self,
+        names: Sequence,
+        sales_order_types: Optional[Sequence] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        priority_weights: Optional[Sequence] = None,
+        llm_budget: Optional[LLMBudget] = None,
+    ) -> pd.Categorical:
+        """
+        通过分类服务批量分类产品类型
+
+        Args:
+            names: 礼包名称序列
+            sales_order_types: 销售单类型序列 (与 names 对应)
+            progress_callback: 进度回调 callback(已完成组合数, 组合总数)（可选）
+            priority_weights: 不使用（LLM 判断顺序由服务端决定），仅为与 ProductClassifier 接口一致
+            llm_budget: 不使用（服务端不设预算），仅为与 ProductClassifier 接口一致
+
+        Returns:
+            产品类型 Categorical（与 names 等长，dtype 为 PRODUCT_TYPE_DTYPE）
+        """
+        total = len(names)
+        if sales_order_types is not None and len(sales_order_types) != total:
+            print(f"警告: 销售单类型列表长度 ({len(sales_order_types)}) 与礼包名称列表长度 ({total}) 不匹配，将忽略销售单类型")
+            sales_order_types = None
+
+        print(f"开始批量分类（分类服务 {self.base_url}），共 {total} 条记录...")
+        with self.metrics.stage("classify.dedupe"):
+            codes, unique_names, unique_types = ProductClassifier._factorize_pairs(names, sales_order_types)
+        unique_total = len(unique_names)
+        print(f"  去重后共 {unique_total} 个不同的礼包名称/销售单类型组合")
+
+        batch_size = max(1, SERVICE_CONFIG.get("client_batch_size") or unique_total)
+        unique_results: List[str] = []
+        with self.metrics.stage("classify.service"):
+            for start in range(0, unique_total, batch_size):
+                end = start + batch_size
+                unique_results.extend(
+                    self._request(_json_values(unique_names[start:end]), _json_values(unique_types[start:end]))
+                )
+                if progress_callback is not None:
+                    progress_callback(len(unique_results), unique_total)
+        self.metrics.incr("rows", total)
+
+        unique_codes = as_product_type_categorical(unique_results).codes
+        results = pd.Categorical.from_codes(unique_codes[codes], dtype=PRODUCT_TYPE_DTYPE)
+        print(f"批量分类完成，共处理 {len(results)} 条记录")
+        return results
+
+
+def main():
+    """命令行入口：启动分类服务"""
+    parser = argparse.ArgumentParser(description="产品类型分类服务 - 常驻运行，复用缓存和 LLM 连接")
+    parser.add_argument("--host", default=SERVICE_CONFIG["host"], help="监听地址")
+    parser.add_argument("--port", type=int, default=SERVICE_CONFIG["port"], help="监听端口")
+    args = parser.parse_args()
+
+    server = ClassificationServer(ClassificationService(), args.host, args.port)
+    print(f"分类服务已启动: {server.base_url}（POST /classify，GET /health，GET /metrics）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        llm_client = server.service.product_classifier.llm_client
+        if llm_client is not None:
+            llm_client.close()
+
+
+if __name__ == "__main__":
+    main()
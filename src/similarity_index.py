@@ -0,0 +1,157 @@
+"""
+相似名称索引模块 - 基于字符 n-gram 哈希向量的近邻查询，用已分类的名称判断相近的新名称
+"""
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# 规整名称时去掉的空白和常见分隔符
+_SEPARATORS = re.compile(r"[\s()（）\[\]【】<>《》+\-_/\\·.,，、:：;；'\"“”‘’]+")
+# 连续数字统一为一个占位符，规格 / 价位不同的同款礼包视为同一名称
+_DIGITS = re.compile(r"\d+")
+
+
+class SimilarityIndex:
+    """
+    礼包名称相似度索引
+
+    名称规整后切分为字符 n-gram，哈希到固定维度的向量并做 L2 归一化，相似度为向量余弦值。
+    向量按行存放在 NumPy 矩阵中，批量查询为一次矩阵乘法；支持增量插入（容量不足时成倍扩容），
+    同一规整名称再次插入时覆盖原标签。
+    """
+
+    def __init__(self, dim: int = 1024, ngram_sizes: Sequence[int] = (2, 3)):
+        """
+        Args:
+            dim: 哈希向量维度
+            ngram_sizes: 使用的 n-gram 长度
+        """
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.labels: List[str] = []
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @staticmethod
+    def normalize(name) -> str:
+        """规整名称：全角/半角统一、小写、去分隔符、数字归一"""
+        text = unicodedata.normalize("NFKC", str(name)).lower()
+        return _DIGITS.sub("0", _SEPARATORS.sub("", text))
+
+    def _ngram_buckets(self, text: str) -> List[int]:
+        grams = [text[i:i + n] for n in self.ngram_sizes for i in range(len(text) - n + 1)]
+        if not grams and text:
+            grams = [text]
+        # crc32 在不同进程间稳定（内置 hash 对字符串是随机化的）
+        return [zlib.crc32(gram.encode("utf-8")) % self.dim for gram in grams]
+
+    def vectorize(self, names: Iterable) -> np.ndarray:
+        """
+        将名称转换为归一化的哈希 n-gram 向量
+
+        Args:
+            names: 礼包名称列表
+
+        Returns:
+            形状为 (名称数, dim) 的 float32 矩阵；空名称为零向量
+        """
+        rows, cols = [], []
+        count = 0
+        for row, name in enumerate(names):
+            buckets = self._ngram_buckets(self.normalize(name))
+            rows.extend([row] * len(buckets))
+            cols.extend(buckets)
+            count = row + 1
+        vectors = np.zeros((count, self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def add(self, names: Sequence, labels: Sequence[str]) -> None:
+        """
+        插入已分类的名称（规整后相同的名称覆盖原标签）
+
+        Args:
+            names: 礼包名称列表
+            labels: 与 names 对应的产品类型
+        """
+        if len(names) != len(labels):
+            raise ValueError(f"名称数量 ({len(names)}) 与标签数量 ({len(labels)}) 不匹配")
+        keys = [self.normalize(name) for name in names]
+        vectors = self.vectorize(names)
+        with self._lock:
+            for key, vector, label in zip(keys, vectors, labels):
+                position = self._positions.get(key)
+                if position is None:
+                    position = len(self.labels)
+                    if position >= len(self._vectors):
+                        grown = np.zeros((max(1024, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+                        grown[:position] = self._vectors[:position]
+                        self._vectors = grown
+                    self._positions[key] = position
+                    self.labels.append(label)
+                else:
+                    self.labels[position] = label
+                self._vectors[position] = vector
+
+    def query(self, names: Sequence, k: int = 1, block_size: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量查询每个名称最相似的 k 个已知名称
+
+        Args:
+            names: 待查询的名称列表
+            k: 返回的近邻数
+            block_size: 每次矩阵乘法处理的查询数（控制内存占用）
+
+        Returns:
+            (indices, scores)：形状均为 (名称数, k)，按相似度从高到低排列；
+            近邻不足 k 个时 indices 为 -1、scores 为 0
+        """
+        with self._lock:
+            size = len(self.labels)
+            matrix = self._vectors[:size]
+        indices = np.full((len(names), k), -1, dtype=np.int64)
+        scores = np.zeros((len(names), k), dtype=np.float32)
+        if size == 0 or len(names) == 0:
+            return indices, scores
+
+        top = min(k, size)
+        for start in range(0, len(names), block_size):
+            block = self.vectorize(names[start:start + block_size])
+            similarity = block @ matrix.T
+            if top < size:
+                candidates = np.argpartition(-similarity, top - 1, axis=1)[:, :top]
+            else:
+                candidates = np.broadcast_to(np.arange(size), similarity.shape)
+            candidate_scores = np.take_along_axis(similarity, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1)[:, :top]
+            end = start + len(block)
+            indices[start:end, :top] = np.take_along_axis(candidates, order, axis=1)
+            scores[start:end, :top] = np.take_along_axis(candidate_scores, order, axis=1)
+        return indices, scores
+
+    def lookup(self, names: Sequence, threshold: float) -> List[Optional[str]]:
+        """
+        最近邻相似度不低于 threshold 时返回其标签
+
+        Args:
+            names: 待查询的名称列表
+            threshold: 相似度阈值（0-1）
+
+        Returns:
+            与 names 对应的标签列表，没有足够相似的名称时为 None
+        """
+        indices, scores = self.query(names, k=1)
+        labels = self.labels
+        return [
+            labels[index] if index >= 0 and score >= threshold else None
+            for index, score in zip(indices[:, 0], scores[:, 0])
+        ]
@@ -0,0 +1,91 @@
+"""
+Single-flight 模块 - 合并相同 key 的并发请求，失败结果短时间内复用
+"""
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    相同 key 同时只执行一次
+
+    第一个调用方（leader）负责执行并通过 resolve() 写入结果，同一时间的其他调用方（follower）
+    共享同一个 Future。标记为失败的结果在 failure_ttl 秒内继续返回给后来的调用方，
+    避免持续失败的 key 反复请求外部服务。
+    """
+
+    def __init__(self, failure_ttl: Optional[float] = None):
+        """
+        Args:
+            failure_ttl: 失败结果的复用时间（秒），None 或 0 表示不复用
+        """
+        self.failure_ttl = failure_ttl
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._failures: Dict[Hashable, Tuple[float, Future]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        登记一次对 key 的请求
+
+        Args:
+            key: 请求的键
+
+        Returns:
+            (future, is_leader)：is_leader 为 True 时调用方必须负责执行并调用 resolve()
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+
+            failure = self._failures.get(key)
+            if failure is not None:
+                expires_at, future = failure
+                if time.monotonic() < expires_at:
+                    return future, False
+                del self._failures[key]
+
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+
+    def resolve(self, key: Hashable, value: Any, failed: bool = False) -> None:
+        """
+        写入 key 的执行结果并唤醒等待的调用方
+
+        Args:
+            key: 请求的键
+            value: 执行结果
+            failed: 是否为失败结果（失败结果在 failure_ttl 内复用）
+        """
+        with self._lock:
+            future = self._in_flight.pop(key, None)
+            if future is None:
+                return
+            if failed and self.failure_ttl:
+                self._failures[key] = (time.monotonic() + self.failure_ttl, future)
+        future.set_result(value)
+
+    def do(self, key: Hashable, func: Callable[[], Any], is_failure: Callable[[Any], bool] = lambda value: value is None) -> Any:
+        """
+        执行 func 并返回结果；相同 key 的并发调用共享一次执行
+
+        Args:
+            key: 请求的键
+            func: 实际执行的函数
+            is_failure: 判断结果是否为失败的函数（默认 None 为失败）
+
+        Returns:
+            func 的返回值
+        """
+        future, is_leader = self.acquire(key)
+        if is_leader:
+            value = None
+            try:
+                value = func()
+            finally:
+                self.resolve(key, value, failed=is_failure(value))
+        return future.result()